@@ -0,0 +1,38 @@
+"""
+Compares the estimated build time of random DAGs when ready tasks start in
+topological order (FIFO) vs. critical path first
+"""
+import random
+
+from dstools.pipeline import estimate
+
+
+def random_dag(n_tasks, p_edge, seed):
+    rng = random.Random(seed)
+    order = ['t{}'.format(i) for i in range(n_tasks)]
+    upstream = {name: [up for up in order[:i] if rng.random() < p_edge]
+                for i, name in enumerate(order)}
+    # a few long tasks, most of them short
+    durations = {name: rng.paretovariate(1.5) for name in order}
+    return order, upstream, durations
+
+
+print('{:>8} {:>8} {:>12} {:>12} {:>12}'
+      .format('tasks', 'workers', 'FIFO (s)', 'critical (s)', 'speedup'))
+
+for n_tasks in [50, 200]:
+    for workers in [2, 4, 8]:
+        fifo, critical = 0, 0
+
+        for seed in range(20):
+            order, upstream, durations = random_dag(n_tasks, 2 / n_tasks,
+                                                    seed)
+            priority = estimate.critical_path(order, upstream, durations)
+
+            fifo += estimate.makespan(order, upstream, durations, workers)
+            critical += estimate.makespan(order, upstream, durations,
+                                          workers, priority=priority)
+
+        print('{:>8} {:>8} {:>12.1f} {:>12.1f} {:>11.2f}x'
+              .format(n_tasks, workers, fifo / 20, critical / 20,
+                      fifo / critical))
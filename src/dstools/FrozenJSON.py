@@ -3,8 +3,6 @@ from collections import Mapping, MutableSequence
 import keyword
 import logging
 
-import yaml
-
 
 class FrozenJSON(object):
     """A facade for navigating a JSON-like object
@@ -12,6 +10,8 @@ class FrozenJSON(object):
     """
     @classmethod
     def from_yaml(cls, path_to_file, *args, **kwargs):
+        import yaml
+
         # load config file
         with open(path_to_file) as f:
             mapping = yaml.load(f)
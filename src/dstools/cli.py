@@ -23,3 +23,17 @@ def env(path):
         current = getattr(current, element)
 
     click.echo(current)
+
+
+@cli.command()
+@click.argument('address', type=str)
+@click.option('--authkey', type=str, required=True,
+              help='Key to connect to the coordinator')
+@click.option('--once', is_flag=True,
+              help='Exit after the first build')
+def worker(address, authkey, once):
+    """Run tasks sent by a Distributed executor listening on HOST:PORT
+    """
+    from dstools.pipeline.executors.Distributed import worker
+
+    worker(address, authkey, once=once)
@@ -16,9 +16,6 @@ from dstools.FrozenJSON import FrozenJSON
 from dstools.path import PathManager
 from dstools import repo
 
-import yaml
-from jinja2 import Template
-
 
 class Env:
     """
@@ -148,6 +145,9 @@ class Env:
                 params['git_location'] = (repo
                                           .get_env_metadata(home)['git_location'])
 
+        from jinja2 import Template
+        import yaml
+
         s = Template(env_content).render(**params)
 
         with StringIO(s) as f:
@@ -179,6 +179,8 @@ class Env:
 
     @classmethod
     def from_dict(cls, d):
+        import yaml
+
         _, file = tempfile.mkstemp(prefix='env.', suffix='.yaml')
 
         with open(file, 'w') as f:
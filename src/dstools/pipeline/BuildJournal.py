@@ -0,0 +1,96 @@
+"""
+On-disk record of what happened during a build
+"""
+import json
+import threading
+from datetime import datetime
+from pathlib import Path
+
+
+class BuildJournal:
+    """
+    Appends task events to a JSON lines file while a DAG is built, if the
+    build is interrupted (e.g. the process is killed), the next build can
+    use it to skip tasks that already finished (see the resume parameter in
+    DAG.build)
+
+    Each line has the event ('start', 'finish' or 'fail'), the task name,
+    the task key (a hash of its source, params and upstream products, see
+    Task._render_key) and a timestamp
+
+    Parameters
+    ----------
+    path: str or pathlib.Path
+        JSON lines file location, created the first time an event is
+        recorded
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    def record(self, event, task_name, key=None):
+        """Append an event
+        """
+        line = json.dumps({'event': event, 'task': task_name, 'key': key,
+                           'timestamp': datetime.now().timestamp()})
+
+        # open and close the file on each event so every line reaches the
+        # OS before the task continues, even if the process dies later
+        with self._lock, open(str(self.path), 'a') as f:
+            f.write(line + '\n')
+
+    def clear(self):
+        """Delete all events
+        """
+        with self._lock:
+            if self.path.exists():
+                self.path.unlink()
+
+    def events(self):
+        """List with all recorded events, in order
+        """
+        if not self.path.exists():
+            return []
+
+        events = []
+
+        for line in self.path.read_text().splitlines():
+            try:
+                events.append(json.loads(line))
+            except ValueError:
+                # the last line is incomplete if the process died while
+                # writing it
+                pass
+
+        return events
+
+    def last_events(self):
+        """Task name -> last event recorded for the task
+        """
+        return {event['task']: event for event in self.events()}
+
+    def completed(self):
+        """Task name -> key, for tasks whose last event is 'finish'
+        """
+        return {name: event['key']
+                for name, event in self.last_events().items()
+                if event['event'] == 'finish'}
+
+    def interrupted(self):
+        """Names of the tasks that started but did not finish or fail
+        """
+        return [name for name, event in self.last_events().items()
+                if event['event'] == 'start']
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return '{}({!r})'.format(type(self).__name__, str(self.path))
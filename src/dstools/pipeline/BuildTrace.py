@@ -0,0 +1,183 @@
+"""
+Timing spans for each phase of a build
+"""
+import os
+import json
+import time
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+
+
+class BuildTrace:
+    """
+    Records how long each phase of a build takes: rendering, fetching
+    metadata, checking data and code dependencies, waiting for a worker,
+    running, saving metadata and callbacks. Each span has the task name,
+    the process and thread where it happened and its start and end time,
+    spans can be exported in the Chrome trace format, which can be opened
+    with Perfetto (https://ui.perfetto.dev) or chrome://tracing
+
+    Parameters
+    ----------
+    path: str or pathlib.Path, optional
+        Where DAG.build saves the trace (see BuildTrace.save) after each
+        build, if None, spans are only kept in memory
+
+    Notes
+    -----
+    Spans are recorded in the process that builds the DAG, tasks that run
+    in another process (e.g. using the Parallel executor) report when they
+    started and finished, "wait" is the time between sending a task to the
+    pool and the moment it started running. Timestamps come from the system
+    clock, spans from workers in other machines (Distributed) are only
+    comparable if the clocks are in sync
+    """
+
+    def __init__(self, path=None):
+        self.path = None if path is None else Path(path)
+        self._spans = []
+        self._lock = threading.Lock()
+
+    def record(self, phase, task_name, start, end, pid=None, tid=None):
+        """
+        Add a span, start and end are timestamps in seconds (time.time()),
+        pid and tid default to the current process and thread
+        """
+        span = {'phase': phase, 'task': task_name, 'start': start,
+                'end': end, 'pid': os.getpid() if pid is None else pid,
+                'tid': threading.get_ident() if tid is None else tid}
+
+        with self._lock:
+            self._spans.append(span)
+
+    @contextmanager
+    def span(self, phase, task_name=None):
+        """
+        Context manager that records a span with the time it takes to run
+        the block (also recorded if the block raises an exception)
+        """
+        start = time.time()
+
+        try:
+            yield
+        finally:
+            self.record(phase, task_name, start, time.time())
+
+    def clear(self):
+        """Delete all spans
+        """
+        with self._lock:
+            self._spans = []
+
+    @property
+    def spans(self):
+        """List with all spans, in the order they were recorded
+        """
+        with self._lock:
+            return list(self._spans)
+
+    def totals(self):
+        """Phase -> total seconds, adding up all tasks
+        """
+        totals = {}
+
+        for span in self.spans:
+            totals[span['phase']] = (totals.get(span['phase'], 0)
+                                     + span['end'] - span['start'])
+
+        return totals
+
+    def busy(self):
+        """
+        (pid, tid) -> seconds spent running tasks, shows how busy each
+        worker was
+        """
+        busy = {}
+
+        for span in self.spans:
+            if span['phase'] == 'run':
+                key = (span['pid'], span['tid'])
+                busy[key] = busy.get(key, 0) + span['end'] - span['start']
+
+        return busy
+
+    def to_chrome(self):
+        """
+        Spans in the Chrome trace format, timestamps are in microseconds
+        since the first span started
+        """
+        spans = self.spans
+
+        if not spans:
+            return {'traceEvents': []}
+
+        origin = min(span['start'] for span in spans)
+        main = os.getpid()
+        events = []
+
+        for pid in sorted({span['pid'] for span in spans}):
+            name = 'main' if pid == main else 'worker {}'.format(pid)
+            events.append({'name': 'process_name', 'ph': 'M', 'pid': pid,
+                           'tid': 0, 'args': {'name': name}})
+
+        for i, span in enumerate(spans):
+            name = (span['phase'] if span['task'] is None
+                    else '{}: {}'.format(span['task'], span['phase']))
+            event = {'name': name, 'cat': span['phase'],
+                     'ts': (span['start'] - origin) * 1e6,
+                     'pid': span['pid'], 'tid': span['tid'],
+                     'args': {'task': span['task']}}
+
+            if span['phase'] == 'wait':
+                # tasks wait at the same time, async events can overlap
+                events.append(dict(event, ph='b', id=i))
+                events.append(dict(event, ph='e', id=i,
+                                   ts=(span['end'] - origin) * 1e6))
+            else:
+                events.append(dict(event, ph='X',
+                                   dur=(span['end'] - span['start']) * 1e6))
+
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def save(self, path=None):
+        """
+        Save spans in the Chrome trace format (see BuildTrace.to_chrome) to
+        path, defaults to the path passed in the constructor
+        """
+        path = path or self.path
+
+        if path is None:
+            raise ValueError('This trace does not have a path, pass one to '
+                             'save it')
+
+        Path(path).write_text(json.dumps(self.to_chrome()))
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return '{}({!r})'.format(type(self).__name__,
+                                 None if self.path is None
+                                 else str(self.path))
+
+
+@contextmanager
+def _nothing():
+    # contextlib.nullcontext requires Python 3.7
+    yield
+
+
+def _span(trace, phase, task_name=None):
+    """Record a span if there is a trace (see BuildTrace.span)
+    """
+    if trace is None:
+        return _nothing()
+
+    return trace.span(phase, task_name)
@@ -6,22 +6,8 @@ import tokenize
 import warnings
 from difflib import Differ
 
-try:
-    import sqlparse
-except ImportError:
-    sqlparse = None
-
-
-try:
-    import autopep8
-except ImportError:
-    autopep8 = None
-
-
-try:
-    import parso
-except ImportError:
-    parso = None
+# sqlparse, autopep8 and parso are imported in the normalizers, they are only
+# needed when comparing code
 
 
 def normalize_null(code):
@@ -29,8 +15,11 @@ def normalize_null(code):
 
 
 def normalize_sql(code):
-    if not sqlparse:
-        raise ImportError('sqlparse is required for normalizing SQL code')
+    try:
+        import sqlparse
+    except ImportError as e:
+        raise ImportError('sqlparse is required for normalizing SQL '
+                          'code') from e
 
     return None if code is None else sqlparse.format(code,
                                                      keyword_case='upper',
@@ -56,9 +45,12 @@ def normalize_python(code):
 
     code = _delete_python_comments(code)
 
-    if not autopep8 or not parso:
+    try:
+        import autopep8
+        import parso
+    except ImportError as e:
         raise ImportError('autopep8 and parso are required for normalizing '
-                          'Python code: pip install autopep8 parso')
+                          'Python code: pip install autopep8 parso') from e
 
     try:
         doc_node = parso.parse(code).children[0].get_doc_node()
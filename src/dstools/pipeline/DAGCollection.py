@@ -0,0 +1,135 @@
+"""
+Build many DAGs at the same time
+"""
+import collections
+
+from dstools.exceptions import TaskBuildError
+from dstools.pipeline import executors
+
+
+class DAGCollection(collections.abc.Mapping):
+    """
+    A collection of independent DAGs (e.g. one per client or region) that
+    are built at the same time sharing one executor, ready tasks from all
+    DAGs are interleaved in the same pool so small DAGs do not leave
+    workers idle
+
+    Parameters
+    ----------
+    dags: iterable
+        DAGs in the collection, names must be unique
+    executor: str or executors.Parallel, optional
+        'parallel', 'hybrid', 'async' or an instance of an executor that
+        runs tasks at the same time (Parallel, Hybrid, Async, Distributed).
+        Defaults to 'parallel'. The executors in the DAGs are not used
+    weights: dict, optional
+        DAG name -> weight, workers are shared between DAGs with ready tasks
+        in proportion to their weights (a DAG with weight 2 gets twice as
+        many workers as one with weight 1). Missing DAGs have weight 1
+
+    Notes
+    -----
+    Each DAG keeps its own clients (closed as soon as the DAG finishes),
+    callbacks, durations, journal and trace. Resources with limited
+    capacity (see executors.Parallel) are shared by all DAGs
+    """
+
+    def __init__(self, dags, executor='parallel', weights=None):
+        self._dags = collections.OrderedDict()
+
+        for dag in dags:
+            if dag.name in self._dags:
+                raise ValueError('DAG names must be unique, "{}" appears '
+                                 'more than once'.format(dag.name))
+
+            self._dags[dag.name] = dag
+
+        if executor == 'parallel':
+            executor = executors.Parallel()
+        elif executor == 'hybrid':
+            executor = executors.Hybrid()
+        elif executor == 'async':
+            executor = executors.Async()
+        elif not isinstance(executor, executors.Parallel):
+            raise TypeError('executor must be "parallel", "hybrid", '
+                            '"async" or an instance of executors.Parallel '
+                            '(or a subclass), got: {!r}'.format(executor))
+
+        self.executor = executor
+        self.weights = weights or {}
+
+        unknown = set(self.weights) - set(self._dags)
+
+        if unknown:
+            raise ValueError('weights has DAGs that are not in the '
+                             'collection: {}'.format(sorted(unknown)))
+
+        if any(weight <= 0 for weight in self.weights.values()):
+            raise ValueError('weights must be positive, got: {}'
+                             .format(self.weights))
+
+    def build(self, force=False, clear_cached_status=False, resume=False,
+              profile=False):
+        """
+        Build all DAGs, see DAG.build for details on the parameters
+
+        Returns
+        -------
+        collections.OrderedDict
+            DAG name -> BuildReport
+
+        Raises
+        ------
+        TaskBuildError
+            If any task failed, raised after all DAGs finish, includes the
+            errors for each DAG that failed
+        """
+        dags = list(self._dags.values())
+        # tasks check the DAG's executor to know how they are being run
+        # (e.g. PythonCallable), use the shared one while building
+        original = [dag._executor for dag in dags]
+
+        try:
+            for dag in dags:
+                dag._executor = self.executor
+                dag._prepare_build(force, clear_cached_status, resume,
+                                   profile)
+
+            results = self.executor._execute(
+                dags, dict(force=force),
+                weights=[self.weights.get(dag.name, 1) for dag in dags])
+        finally:
+            for dag, executor in zip(dags, original):
+                dag._executor = executor
+                dag._save_trace()
+
+        reports = collections.OrderedDict()
+        errors = collections.OrderedDict()
+
+        for dag, result in zip(dags, results):
+            if isinstance(result, Exception):
+                errors[dag.name] = result
+            else:
+                dag._record_durations(result)
+                reports[dag.name] = result
+
+        if errors:
+            details = '\n\n'.join('DAG "{}": {}'.format(name, e)
+                                  for name, e in errors.items())
+            raise TaskBuildError('{} DAG(s) failed: {}, succeeded: {}\n\n{}'
+                                 .format(len(errors), list(errors),
+                                         list(reports), details))
+
+        return reports
+
+    def __getitem__(self, key):
+        return self._dags[key]
+
+    def __iter__(self):
+        return iter(self._dags)
+
+    def __len__(self):
+        return len(self._dags)
+
+    def __repr__(self):
+        return '{}({})'.format(type(self).__name__, list(self._dags))
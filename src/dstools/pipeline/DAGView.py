@@ -0,0 +1,137 @@
+"""
+Read-only views over a subset of tasks in a DAG
+"""
+import collections
+
+from dstools.pipeline.Table import Table
+from dstools.pipeline import outdated
+
+
+class DAGView(collections.abc.Mapping):
+    """
+    A read-only view of a subset of tasks in a DAG, it can be rendered,
+    built and its status checked without copying or modifying the DAG, use
+    DAG.view to create one
+
+    Parameters
+    ----------
+    dag: DAG
+        The DAG that contains the tasks
+    task_names: iterable
+        Names of the tasks in the view
+
+    Notes
+    -----
+    Tasks are the same objects that the DAG has (running a task from the
+    view updates the task in the DAG) and rendering uses the DAG's render
+    cache. Adding or removing tasks from the DAG invalidates the view
+    """
+
+    def __init__(self, dag, task_names):
+        self._dag = dag
+        G = dag._G
+        self._version = G.version
+        order = G.sub_topological_order(G.index(name) for name in task_names)
+        self._tasks = [G.task(i) for i in order]
+        self._names = {G.name(i): i for i in order}
+
+    @property
+    def name(self):
+        return self._dag.name
+
+    @property
+    def clients(self):
+        return self._dag.clients
+
+    @property
+    def _on_task_finish(self):
+        return self._dag._on_task_finish
+
+    @property
+    def _on_task_failure(self):
+        return self._dag._on_task_failure
+
+    def render(self, show_progress=True, force=False):
+        """
+        Render the tasks in the view, upstream dependencies declared in
+        other DAGs are rendered first (only their lineage, not the whole
+        DAG)
+        """
+        self._check_version()
+
+        self._dag._render_lineage(self._tasks, show_progress, force)
+
+        return self
+
+    def build(self, force=False, clear_cached_status=False, resume=False,
+              profile=False):
+        """Build the tasks in the view, see DAG.build for details
+        """
+        self._check_version()
+
+        try:
+            self._dag._prepare_build(force, clear_cached_status, resume,
+                                     profile, tasks=self._tasks)
+            report = self._dag._executor(dag=self, force=force)
+        finally:
+            self._dag._save_trace()
+
+        self._dag._record_durations(report)
+
+        return report
+
+    def status(self, clear_cached_status=False, max_workers=None,
+               **kwargs):
+        """Returns a table with the status of the tasks in the view, see
+        DAG.status for details
+        """
+        self._check_version()
+
+        if clear_cached_status:
+            self._clear_cached_outdated_status()
+
+        self.render()
+        self._evaluate_outdated_status(max_workers=max_workers)
+
+        return Table([t.status(**kwargs) for t in self._tasks])
+
+    def _topological_sort(self):
+        return list(self._tasks)
+
+    def _evaluate_outdated_status(self, max_workers=None):
+        outdated.evaluate(self._tasks, max_workers=max_workers)
+
+    def _critical_path(self, tasks):
+        return self._dag._critical_path(tasks)
+
+    def _estimated_durations(self, tasks):
+        return self._dag._estimated_durations(tasks)
+
+    def _clear_cached_outdated_status(self):
+        for task in self._tasks:
+            task.product._clear_cached_outdated_status()
+
+    def _check_version(self):
+        if self._dag._G.version != self._version:
+            raise ValueError('{} was modified after creating this view, '
+                             'create a new one'.format(self._dag))
+
+    def __getitem__(self, key):
+        if key not in self._names:
+            raise KeyError(key)
+
+        return self._dag._G.task(self._names[key])
+
+    def __iter__(self):
+        for name in self._names:
+            yield name
+
+    def __len__(self):
+        return len(self._names)
+
+    def __repr__(self):
+        return '{}({!r}, {})'.format(type(self).__name__, self._dag,
+                                     list(self._names))
+
+    def _short_repr(self):
+        return repr(self)
@@ -0,0 +1,75 @@
+"""
+Keeps track of how long tasks took to run in previous builds
+"""
+import os
+import json
+from pathlib import Path
+
+
+class DurationHistory:
+    """
+    Stores the last durations (in seconds) of each task in a JSON file, used
+    to estimate how long a build will take (see DAG.plan_build)
+
+    Parameters
+    ----------
+    path: str or pathlib.Path
+        JSON file location, created the first time durations are recorded
+    max_records: int, optional
+        Number of durations to keep per task, defaults to 5
+    """
+
+    def __init__(self, path, max_records=5):
+        self.path = Path(path)
+        self.max_records = max_records
+
+        if self.path.exists():
+            self._durations = json.loads(self.path.read_text())
+        else:
+            self._durations = {}
+
+    def estimate(self, task_name):
+        """
+        Estimated duration for a task (mean of the recorded durations),
+        None if there are no records
+        """
+        records = self._durations.get(task_name)
+
+        if not records:
+            return None
+
+        return sum(records) / len(records)
+
+    def record(self, durations):
+        """Record durations and save them
+
+        Parameters
+        ----------
+        durations: dict
+            Task name -> elapsed time in seconds
+        """
+        for name, elapsed in durations.items():
+            records = self._durations.setdefault(name, [])
+            records.append(elapsed)
+            del records[:-self.max_records]
+
+        self.save()
+
+    def record_report(self, report):
+        """Record durations for the tasks that ran in a BuildReport
+        """
+        self.record({row['name']: row['Elapsed (s)'] for row in report
+                     if row['Ran?']})
+
+    def save(self):
+        # write to a temporary file first so an interrupted write does not
+        # leave a corrupted file
+        tmp = self.path.with_name(self.path.name + '.tmp')
+        tmp.write_text(json.dumps(self._durations))
+        os.replace(str(tmp), str(self.path))
+
+    def __contains__(self, task_name):
+        return bool(self._durations.get(task_name))
+
+    def __repr__(self):
+        return '{}({!r})'.format(type(self).__name__, str(self.path))
@@ -90,3 +90,51 @@ class BuildReport(Table):
             row['Percentage'] = compute_pct(row['Elapsed (s)'], total)
 
         return data
+
+
+class BuildPlan(Table):
+    """
+    A Table with the tasks that a build would run, the reason for each one
+    and their estimated duration (see DAG.plan_build)
+
+    Parameters
+    ----------
+    data: list
+        Row objects
+    estimated_time: float
+        Estimated build time in seconds
+    workers: int
+        Number of tasks that the executor runs at the same time
+    """
+
+    def __init__(self, data, estimated_time, workers):
+        super().__init__(data)
+        self.estimated_time = estimated_time
+        self.workers = workers
+
+    @property
+    def to_run(self):
+        """Names of the tasks that would run
+        """
+        return [row['name'] for row in self._data if row['Will run?']]
+
+    @property
+    def without_history(self):
+        """
+        Names of tasks that would run but have no recorded durations, they
+        are not included in the estimated time
+        """
+        return [row['name'] for row in self._data
+                if row['Will run?'] and row['Estimated (s)'] is None]
+
+    def __repr__(self):
+        summary = ('{} out of {} tasks will run, estimated time: {:.1f} '
+                   'seconds ({} worker(s))'
+                   .format(len(self.to_run), len(self._data),
+                           self.estimated_time, self.workers))
+
+        if self.without_history:
+            summary += ('\nNo recorded durations for: {}'
+                        .format(', '.join(self.without_history)))
+
+        return '{}\n\n{}'.format(self._repr, summary)
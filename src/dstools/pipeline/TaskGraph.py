@@ -0,0 +1,252 @@
+"""
+Graph store used by DAG to keep track of tasks and their dependencies
+
+Tasks are assigned an integer index when added, predecessors and successors
+are kept in per-index containers so upstream/downstream lookups do not
+depend on the number of tasks in the graph. The topological order is
+computed once and cached until the graph changes, the same applies to
+ancestors and descendants, which are stored as bitsets (Python ints, bit i
+is set if the task with index i is in the set)
+"""
+from collections import deque
+
+
+class TaskGraph:
+    """
+    A directed graph of tasks, identified by name and stored by integer
+    index
+
+    Notes
+    -----
+    Removing a task leaves an empty slot (indexes are never re-used), so
+    indexes from a previous version of the graph remain valid for the tasks
+    that were not removed. Every modification increments ``version``
+    """
+
+    def __init__(self):
+        # name -> index, insertion order is preserved
+        self._index = {}
+        # index -> task/name, None if the task was removed
+        self._tasks = []
+        self._names = []
+        # index -> {index: None}, dicts are used as ordered sets
+        self._pred = []
+        self._succ = []
+
+        self._order = None
+        # index -> bitset, filled on demand
+        self._ancestors = {}
+        self._descendants = {}
+        self.version = 0
+
+    def add_node(self, name, task):
+        """Add a task, re-adding an existing name replaces the task
+        """
+        if name in self._index:
+            self._tasks[self._index[name]] = task
+        else:
+            self._index[name] = len(self._tasks)
+            self._tasks.append(task)
+            self._names.append(name)
+            self._pred.append({})
+            self._succ.append({})
+
+        self._changed()
+
+    def add_edge(self, name_from, name_to):
+        """Add an edge between two existing tasks (no-op if it exists)
+        """
+        i, j = self._index[name_from], self._index[name_to]
+
+        if i not in self._pred[j]:
+            self._pred[j][i] = None
+            self._succ[i][j] = None
+            self._changed()
+
+    def remove_node(self, name):
+        """Remove a task and all its edges, returns the task
+        """
+        i = self._index.pop(name)
+
+        for j in self._pred[i]:
+            del self._succ[j][i]
+
+        for j in self._succ[i]:
+            del self._pred[j][i]
+
+        task = self._tasks[i]
+        self._tasks[i] = None
+        self._names[i] = None
+        self._pred[i] = {}
+        self._succ[i] = {}
+
+        self._changed()
+
+        return task
+
+    def index(self, name):
+        return self._index[name]
+
+    def name(self, i):
+        return self._names[i]
+
+    def task(self, i):
+        return self._tasks[i]
+
+    def predecessors(self, name):
+        """List of names of upstream tasks
+        """
+        return [self._names[j] for j in self._pred[self._index[name]]]
+
+    def successors(self, name):
+        """List of names of downstream tasks
+        """
+        return [self._names[j] for j in self._succ[self._index[name]]]
+
+    def predecessors_idx(self, i):
+        return self._pred[i]
+
+    def successors_idx(self, i):
+        return self._succ[i]
+
+    def topological_order(self):
+        """
+        List of task indexes in topological order, computed only once per
+        graph version
+        """
+        if self._order is None:
+            self._order = self._topological_order()
+
+        return self._order
+
+    def _topological_order(self):
+        in_degree = {i: len(self._pred[i]) for i in self._index.values()}
+        queue = deque(i for i, degree in in_degree.items() if not degree)
+        order = []
+
+        while queue:
+            i = queue.popleft()
+            order.append(i)
+
+            for j in self._succ[i]:
+                in_degree[j] -= 1
+
+                if not in_degree[j]:
+                    queue.append(j)
+
+        if len(order) != len(in_degree):
+            in_cycle = sorted(self._names[i] for i, degree
+                              in in_degree.items() if degree)
+            raise ValueError('DAGs cannot have cycles, the following tasks '
+                             'are part of one or depend on one: {}'
+                             .format(in_cycle))
+
+        return order
+
+    def sub_topological_order(self, indexes):
+        """
+        Topological order of a subset of tasks, only considers edges between
+        tasks in the subset, runs in time proportional to the subset (plus
+        their edges), not the whole graph
+        """
+        indexes = list(indexes)
+        subset = set(indexes)
+        in_degree = {i: sum(1 for j in self._pred[i] if j in subset)
+                     for i in indexes}
+        queue = deque(i for i in indexes if not in_degree[i])
+        order = []
+
+        while queue:
+            i = queue.popleft()
+            order.append(i)
+
+            for j in self._succ[i]:
+                if j in subset:
+                    in_degree[j] -= 1
+
+                    if not in_degree[j]:
+                        queue.append(j)
+
+        if len(order) != len(indexes):
+            # same error as topological_order
+            self._topological_order()
+
+        return order
+
+    def indexes(self, bitset):
+        """Convert a bitset to a list of task indexes
+        """
+        # iterating over the binary representation is linear in the number
+        # of bits, extracting bits one by one is quadratic for large ints
+        return [i for i, bit in enumerate(reversed(bin(bitset)[2:]))
+                if bit == '1']
+
+    def ancestors(self, i):
+        """
+        Bitset with the indexes of all the tasks that the task with index i
+        depends on (directly or indirectly)
+        """
+        return self._closure(i, self._pred, self._ancestors)
+
+    def descendants(self, i):
+        """
+        Bitset with the indexes of all the tasks that depend on the task with
+        index i (directly or indirectly)
+        """
+        return self._closure(i, self._succ, self._descendants)
+
+    def names(self, bitset):
+        """Convert a bitset to a list of task names
+        """
+        return [self._names[i] for i in self.indexes(bitset)]
+
+    def _closure(self, i, edges, memo):
+        if i in memo:
+            return memo[i]
+
+        # raises an error if there are cycles
+        self.topological_order()
+
+        # find the tasks whose closure has not been computed yet, then
+        # compute them, each one after all the tasks it points to
+        # (post-order). Iterative to support very deep graphs
+        stack = [(i, iter(edges[i]))]
+        visiting = {i}
+
+        while stack:
+            node, neighbors = stack[-1]
+
+            for neighbor in neighbors:
+                if neighbor not in memo and neighbor not in visiting:
+                    visiting.add(neighbor)
+                    stack.append((neighbor, iter(edges[neighbor])))
+                    break
+            else:
+                stack.pop()
+                bitset = 0
+
+                for neighbor in edges[node]:
+                    bitset |= memo[neighbor] | (1 << neighbor)
+
+                memo[node] = bitset
+
+        return memo[i]
+
+    def _changed(self):
+        self._order = None
+        self._ancestors = {}
+        self._descendants = {}
+        self.version += 1
+
+    def __contains__(self, name):
+        return name in self._index
+
+    def __iter__(self):
+        for name in self._index:
+            yield name
+
+    def __len__(self):
+        return len(self._index)
+
+    def __getitem__(self, name):
+        return self._tasks[self._index[name]]
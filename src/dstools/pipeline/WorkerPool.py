@@ -0,0 +1,122 @@
+"""
+Process pool shared by the tasks in a DAG
+"""
+import multiprocessing
+
+from dstools.pipeline.profiling import run_profiled
+
+
+class WorkerPool:
+    """
+    A process pool that is started the first time a task uses it and kept
+    across tasks and builds. Used by PythonCallable when the executor allows
+    tasks to create child processes (executors.Serial)
+
+    Parameters
+    ----------
+    processes: int, optional
+        Number of processes, defaults to 1 (Serial runs one task at a time)
+    start_method: str, optional
+        'fork', 'spawn' or 'forkserver', defaults to the multiprocessing
+        default for the platform
+    preload: list, optional
+        Modules imported by the forkserver process before starting workers
+        (e.g. ['pandas', 'sklearn']), so workers start with them imported,
+        only used if start_method is 'forkserver'
+    maxtasksperchild: int, optional
+        Number of tasks a worker runs before being replaced by a new one.
+        Defaults to 1 (each task runs in a new process), use None to never
+        replace workers
+
+    Notes
+    -----
+    By default, each task runs in a new process, so tasks are isolated
+    from each other. With maxtasksperchild=None (see the reuse_workers
+    argument in DAG), workers are reused: tasks do not pay the cost of
+    starting a process and importing modules every time they run, but
+    changes to the state of a module (e.g. a global variable, a cache or a
+    monkeypatched function) made by one task are seen by the tasks that run
+    after it in the same worker.
+
+    Functions are sent to workers by reference, if a function that the
+    workers already received is redefined (e.g. in a notebook), the workers
+    are replaced so they do not run an outdated copy. Workers started
+    before a function was defined in __main__ do not have it, call
+    WorkerPool.close to start new ones.
+
+    Workers are stopped when calling WorkerPool.close (DAG.close for the
+    pool a DAG creates) or when the WorkerPool is garbage collected
+    """
+
+    def __init__(self, processes=1, start_method=None, preload=None,
+                 maxtasksperchild=1):
+        if preload and start_method != 'forkserver':
+            raise ValueError('preload can only be used with '
+                             'start_method="forkserver", got: {!r}'
+                             .format(start_method))
+
+        self.processes = processes
+        self.start_method = start_method
+        self.preload = preload
+        self.maxtasksperchild = maxtasksperchild
+        self._pool = None
+        # (module, qualified name) -> function sent to the current workers
+        self._functions = {}
+
+    def apply_async(self, func, kwds, profile=None):
+        """
+        Run func(**kwds) in a worker, starts the pool if needed, returns a
+        multiprocessing.pool.AsyncResult. If profile is a path, the call is
+        profiled in the worker and the stats are saved there (see
+        profiling.run_profiled)
+        """
+        # functions are sent by reference, workers look them up in their own
+        # copy of the module. If the function was redefined, workers have an
+        # outdated copy so they are replaced
+        key = (func.__module__, func.__qualname__)
+        known = self._functions.get(key)
+
+        if known is not None and known is not func:
+            self.close()
+
+        self._functions[key] = func
+
+        if self._pool is None:
+            context = multiprocessing.get_context(self.start_method)
+
+            if self.preload:
+                context.set_forkserver_preload(self.preload)
+
+            self._pool = context.Pool(processes=self.processes,
+                                      maxtasksperchild=self.maxtasksperchild)
+
+        if profile is not None:
+            return self._pool.apply_async(func=run_profiled,
+                                          args=(func, profile, kwds))
+
+        return self._pool.apply_async(func=func, kwds=kwds)
+
+    def close(self):
+        """Stop the workers, the pool is started again if used
+        """
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+
+        self._functions = {}
+
+    def __del__(self):
+        self.close()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # processes cannot be pickled, the copy starts its own pool
+        state['_pool'] = None
+        state['_functions'] = {}
+        return state
+
+    def __repr__(self):
+        return ('{}(processes={!r}, start_method={!r})'
+                .format(type(self).__name__, self.processes,
+                        self.start_method))
@@ -1,3 +1,4 @@
 from dstools.pipeline.dag import DAG
+from dstools.pipeline.DAGCollection import DAGCollection
 
-__all__ = ['DAG']
+__all__ = ['DAG', 'DAGCollection']
@@ -28,7 +28,10 @@ class Client(abc.ABC):
     Method's names were chosen to resemble the ones in the Python DB API Spec
     2.0 (PEP 249)
 
+    Executors that run tasks at the same time do not start more than
+    max_concurrency tasks that use the same client (None means no limit)
     """
+    max_concurrency = None
 
     def __init__(self):
         self._set_logger()
@@ -46,12 +49,40 @@ class Client(abc.ABC):
         """
         pass
 
+    async def execute_async(self, code):
+        """
+        Execute code from an event loop, clients without an async
+        implementation call execute in a thread (the default executor of the
+        event loop)
+        """
+        import asyncio
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(None, self.execute, code)
+
     @abc.abstractmethod
     def close(self):
         """Close connection if there is one active
         """
         pass
 
+    @property
+    def _single_thread(self):
+        """
+        True if the client must only be used from the thread that uses it
+        first, because connections opened in other threads would see
+        different data (e.g. in-memory databases), see
+        outdated.prefetch_metadata
+        """
+        return False
+
+    def _release_thread(self):
+        """
+        Close the connection opened by the current thread (if any), called
+        before a short-lived thread exits, clients that open one connection
+        per thread must implement it
+        """
+        pass
+
     # __getstate__ and __setstate__ are needed to make this picklable
 
     def __getstate__(self):
@@ -1,7 +1,7 @@
 from dstools.pipeline.clients.Client import Client
-from dstools.pipeline.clients.db import (DBAPIClient, SQLAlchemyClient,
-                                         DrillClient)
+from dstools.pipeline.clients.db import (DBAPIClient, AsyncDBAPIClient,
+                                         SQLAlchemyClient, DrillClient)
 from dstools.pipeline.clients.shell import ShellClient, RemoteShellClient
 
-__all__ = ['Client', 'DBAPIClient', 'SQLAlchemyClient', 'DrillClient',
-           'ShellClient', 'RemoteShellClient']
+__all__ = ['Client', 'DBAPIClient', 'AsyncDBAPIClient', 'SQLAlchemyClient',
+           'DrillClient', 'ShellClient', 'RemoteShellClient']
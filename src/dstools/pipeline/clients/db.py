@@ -1,33 +1,61 @@
 """
 Clients that communicate with databases
+
+DBAPIClient and SQLAlchemyClient open one connection per thread, this
+allows several threads (e.g. the ones used to fetch metadata concurrently)
+to use the same client, drivers such as sqlite3 do not allow to share
+connections between threads. Threads that only live for a short time must
+call Client._release_thread before exiting, so their connections do not
+stay open until the client is closed
 """
+import threading
 
 from dstools.pipeline.clients.Client import Client
 
-from sqlalchemy import create_engine
+
+def _in_memory(value):
+    """
+    True if value is a location for an in-memory database (e.g. sqlite's
+    ":memory:"), each connection to one sees a different database
+    """
+    return isinstance(value, str) and (':memory:' in value
+                                       or 'mode=memory' in value)
 
 
 class DBAPIClient(Client):
     """A client for a module following the PEP 214 DB API spec
+
+    Parameters
+    ----------
+    connect_fn: callable
+        Function that returns a connection
+    max_concurrency: int, optional
+        Maximum number of tasks using this client at the same time, no limit
+        if None (default)
+    **connect_kwargs
+        Parameters passed to connect_fn
     """
 
-    def __init__(self, connect_fn, **connect_kwargs):
+    def __init__(self, connect_fn, max_concurrency=None, **connect_kwargs):
         super().__init__()
         self.connect_fn = connect_fn
         self.connect_kwargs = connect_kwargs
+        self.max_concurrency = max_concurrency
 
-        # there is no open connection by default
-        self._connection = None
+        # thread id -> connection, there is no open connection by default
+        self._connections = {}
 
     @property
     def connection(self):
         """Return a connection, open one if there isn't any
         """
-        # if there isn't an open connection, open one...
-        if self._connection is None:
-            self._connection = self.connect_fn(**self.connect_kwargs)
+        thread = threading.get_ident()
 
-        return self._connection
+        # if there isn't an open connection (in this thread), open one...
+        if thread not in self._connections:
+            self._connections[thread] = self.connect_fn(**self.connect_kwargs)
+
+        return self._connections[thread]
 
     def execute(self, code):
         """Execute code with the existing connection
@@ -38,40 +66,170 @@ class DBAPIClient(Client):
         cur.close()
 
     def close(self):
-        """Close connection if there is one active
+        """Close connections if there are any active
+        """
+        while self._connections:
+            _, connection = self._connections.popitem()
+            connection.close()
+
+    @property
+    def _single_thread(self):
+        return any(_in_memory(value)
+                   for value in self.connect_kwargs.values())
+
+    def _release_thread(self):
+        connection = self._connections.pop(threading.get_ident(), None)
+
+        if connection is not None:
+            connection.close()
+
+    # __getstate__ and __setstate__ are needed to make this picklable
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        del state['_connections']
+        return state
+
+    def __setstate__(self, state):
+        super().__setstate__(state)
+        self._connections = {}
+
+
+class AsyncDBAPIClient(Client):
+    """
+    A client for async database drivers such as aiosqlite or asyncpg, used
+    by tasks that run in the Async executor
+
+    Parameters
+    ----------
+    connect_fn: coroutine function
+        Returns a connection whose execute method is a coroutine, if the
+        connection has a commit method, it is awaited after executing code
+    **connect_kwargs
+        Parameters passed to connect_fn
+
+    Notes
+    -----
+    Connections belong to the event loop that opened them, so one
+    connection is opened per event loop. Products need a blocking client
+    to save metadata, use DBAPIClient or SQLAlchemyClient for them
+    """
+
+    def __init__(self, connect_fn, max_concurrency=None, **connect_kwargs):
+        super().__init__()
+        self.connect_fn = connect_fn
+        self.connect_kwargs = connect_kwargs
+        self.max_concurrency = max_concurrency
+
+        # event loop -> connection
+        self._connections = {}
+
+    @property
+    def connection(self):
+        raise NotImplementedError('AsyncDBAPIClient connections must be '
+                                  'opened from an event loop, use '
+                                  'connection_async instead')
+
+    async def connection_async(self):
+        """Return a connection, open one if there isn't any in this loop
         """
-        if self._connection is not None:
-            self._connection.close()
+        import asyncio
+        loop = asyncio.get_event_loop()
+
+        if loop not in self._connections:
+            self._connections[loop] = await self.connect_fn(
+                **self.connect_kwargs)
+
+        return self._connections[loop]
+
+    async def execute_async(self, code):
+        connection = await self.connection_async()
+        await connection.execute(code)
+
+        # some drivers (e.g. asyncpg) do not use transactions by default
+        if hasattr(connection, 'commit'):
+            await connection.commit()
+
+    def execute(self, code):
+        """Execute code in a new event loop
+        """
+        import asyncio
+        loop = asyncio.new_event_loop()
+
+        try:
+            loop.run_until_complete(self.execute_async(code))
+            loop.run_until_complete(self._connections.pop(loop).close())
+        finally:
+            loop.close()
+
+    def close(self):
+        """
+        Close connections if there are any active, must not be called from
+        the event loop that opened them
+        """
+        import asyncio
+
+        while self._connections:
+            loop, connection = self._connections.popitem()
+
+            if loop.is_closed():
+                continue
+            elif loop.is_running():
+                asyncio.run_coroutine_threadsafe(connection.close(),
+                                                 loop).result()
+            else:
+                loop.run_until_complete(connection.close())
+
+    # __getstate__ and __setstate__ are needed to make this picklable
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        del state['_connections']
+        return state
+
+    def __setstate__(self, state):
+        super().__setstate__(state)
+        self._connections = {}
 
 
 class SQLAlchemyClient(Client):
     """Client for connecting with any SQLAlchemy supported database
 
+    Parameters
+    ----------
+    uri: str
+        Database URI
+    max_concurrency: int, optional
+        Maximum number of tasks using this client at the same time, no limit
+        if None (default)
     """
 
-    def __init__(self, uri):
+    def __init__(self, uri, max_concurrency=None):
         super().__init__()
         self._uri = uri
+        self.max_concurrency = max_concurrency
         self._engine = None
-        self._connection = None
+        # thread id -> connection
+        self._connections = {}
 
     @property
     def connection(self):
         """Return a connection from the pool
         """
+        thread = threading.get_ident()
+        connection = self._connections.get(thread)
+
         # we have to keep this reference here,
         # if we just return self.engine.raw_connection(),
         # any cursor from that connection will fail
         # doing: engine.raw_connection().cursor().execute('') fails!
-        if self._connection is None:
-            self._connection = self.engine.raw_connection()
-
         # if a task or product calls client.connection.close(), we have to
         # re-open the connection
-        if not self._connection.is_valid:
-            self._connection = self.engine.raw_connection()
+        if connection is None or not connection.is_valid:
+            connection = self.engine.raw_connection()
+            self._connections[thread] = connection
 
-        return self._connection
+        return connection
 
     def execute(self, code):
         cur = self.connection.cursor()
@@ -83,15 +241,35 @@ class SQLAlchemyClient(Client):
         """Closes all connections
         """
         self._logger.info(f'Disposing engine {self._engine}')
+
+        while self._connections:
+            _, connection = self._connections.popitem()
+            connection.close()
+
         if self._engine is not None:
             self._engine.dispose()
             self._engine = None
 
+    @property
+    def _single_thread(self):
+        # "sqlite://" is an in-memory database too
+        return (self._uri.startswith('sqlite')
+                and (_in_memory(self._uri)
+                     or self._uri.split('://', 1)[-1] in {'', '/'}))
+
+    def _release_thread(self):
+        connection = self._connections.pop(threading.get_ident(), None)
+
+        if connection is not None:
+            # returns it to the engine's pool
+            connection.close()
+
     @property
     def engine(self):
         """Returns a SQLAlchemy engine
         """
         if self._engine is None:
+            from sqlalchemy import create_engine
             self._engine = create_engine(self._uri)
 
         return self._engine
@@ -104,13 +282,15 @@ class SQLAlchemyClient(Client):
         # again in __setstate__
         del state['_logger']
         del state['_engine']
-        del state['_connection']
+        del state['_connections']
 
         return state
 
     def __setstate__(self, state):
         self.__dict__.update(state)
         self._set_logger()
+        self._engine = None
+        self._connections = {}
 
 
 class DrillClient(Client):
@@ -13,7 +13,25 @@ from subprocess import CalledProcessError
 from dstools.pipeline.clients.Client import Client
 from dstools.templates.Placeholder import Placeholder
 
-import paramiko
+
+async def run_async(args, shell=False, **kwargs):
+    """
+    Event loop counterpart of subprocess.run, returns a
+    subprocess.CompletedProcess. kwargs are passed to
+    asyncio.create_subprocess_shell if shell is True, otherwise to
+    asyncio.create_subprocess_exec
+    """
+    import asyncio
+
+    if shell:
+        process = await asyncio.create_subprocess_shell(args, **kwargs)
+    else:
+        process = await asyncio.create_subprocess_exec(*args, **kwargs)
+
+    stdout, stderr = await process.communicate()
+
+    return subprocess.CompletedProcess(args, process.returncode, stdout,
+                                       stderr)
 
 
 class ShellClient(Client):
@@ -23,10 +41,15 @@ class ShellClient(Client):
     def __init__(self,
                  subprocess_run_kwargs={'stderr': subprocess.PIPE,
                                         'stdout': subprocess.PIPE,
-                                        'shell': False}):
+                                        'shell': False},
+                 max_concurrency=None):
         """
+        max_concurrency: int, optional
+            Maximum number of tasks using this client at the same time, no
+            limit if None (default)
         """
         self.subprocess_run_kwargs = subprocess_run_kwargs
+        self.max_concurrency = max_concurrency
         self._logger = logging.getLogger('{}.{}'.format(__name__,
                                                         type(self).__name__))
 
@@ -37,14 +60,29 @@ class ShellClient(Client):
     def execute(self, code, run_template='bash {{path_to_code}}'):
         """Run code
         """
+        source = self._write_code(code, run_template)
+        res = subprocess.run(shlex.split(source), **self.subprocess_run_kwargs)
+        self._check_result(code, res)
+
+    async def execute_async(self, code, run_template='bash {{path_to_code}}'):
+        """Run code in a subprocess without blocking the event loop
+        """
+        source = self._write_code(code, run_template)
+        res = await run_async(shlex.split(source),
+                              **self.subprocess_run_kwargs)
+        self._check_result(code, res)
+
+    def _write_code(self, code, run_template):
+        """
+        Save code to a temporary file and return the command to run it
+        """
         _, path_to_tmp = tempfile.mkstemp()
         Path(path_to_tmp).write_text(code)
 
         run_template = Placeholder(run_template)
-        source = run_template.render(dict(path_to_code=path_to_tmp))
-
-        res = subprocess.run(shlex.split(source), **self.subprocess_run_kwargs)
+        return run_template.render(dict(path_to_code=path_to_tmp))
 
+    def _check_result(self, code, res):
         if res.returncode != 0:
             # log source code without expanded params
             self._logger.info(f'{code} returned stdout: '
@@ -63,7 +101,8 @@ class RemoteShellClient(Client):
     """Client to run commands in a remote shell
     """
 
-    def __init__(self, connect_kwargs, path_to_directory):
+    def __init__(self, connect_kwargs, path_to_directory,
+                 max_concurrency=None):
         """
 
         path_to_directory: str
@@ -71,9 +110,14 @@ class RemoteShellClient(Client):
 
         connect_kwargs: dict
             Parameters to send to the paramiko.SSHClient.connect constructor
+
+        max_concurrency: int, optional
+            Maximum number of tasks using this client at the same time, no
+            limit if None (default)
         """
         self.path_to_directory = path_to_directory
         self.connect_kwargs = connect_kwargs
+        self.max_concurrency = max_concurrency
         self._raw_client = None
         self._logger = logging.getLogger('{}.{}'.format(__name__,
                                                         type(self).__name__))
@@ -83,6 +127,8 @@ class RemoteShellClient(Client):
     def connection(self):
         # client has not been created
         if self._raw_client is None:
+            import paramiko
+
             self._raw_client = paramiko.SSHClient()
             self._raw_client.set_missing_host_key_policy(
                 paramiko.AutoAddPolicy())
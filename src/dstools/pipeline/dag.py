@@ -4,12 +4,12 @@ DAG module
 A DAG is collection of tasks that makes sure they are executed in
 the right order
 """
-from copy import copy
 from pathlib import Path
 import warnings
 import logging
 import collections
 import subprocess
+import json
 import tempfile
 
 try:
@@ -18,49 +18,58 @@ except ImportError:
     # backported
     import importlib_resources
 
-
-try:
-    import mistune
-except ImportError:
-    mistune = None
-
-
-try:
-    import pygments
-    from pygments import highlight
-    from pygments.lexers import get_lexer_by_name
-    from pygments.formatters import html
-except ImportError:
-    pygments = None
-
-import networkx as nx
-from tqdm.auto import tqdm
-from jinja2 import Template
-
-from dstools.pipeline.Table import Table
+from dstools.pipeline.Table import Table, BuildPlan, Row
+from dstools.pipeline.DurationHistory import DurationHistory
+from dstools.pipeline.BuildJournal import BuildJournal
+from dstools.pipeline.BuildTrace import BuildTrace, _span
+from dstools.pipeline.WorkerPool import WorkerPool
+from dstools.pipeline.TaskGraph import TaskGraph
+from dstools.pipeline.DAGView import DAGView
 from dstools.pipeline.products import MetaProduct
+from dstools.pipeline.constants import TaskStatus
 from dstools.pipeline.util import image_bytes2html
 from dstools.pipeline.CodeDiffer import CodeDiffer
 from dstools.pipeline import resources
 from dstools.pipeline import executors
+from dstools.pipeline import outdated
+from dstools.pipeline import estimate
 from dstools.util import isiterable
 
+# increase if the format of DAG.save_plan changes
+PLAN_VERSION = 1
+
 
-class HighlightRenderer(mistune.Renderer):
-    """mistune renderer with syntax highlighting
+def _make_highlight_renderer():
+    """
+    Returns a mistune renderer with syntax highlighting, mistune and pygments
+    are imported here since they are only needed to export to HTML
 
     Notes
     -----
     Source: https://github.com/lepture/mistune#renderer
     """
+    try:
+        import mistune
+        from pygments import highlight
+        from pygments.lexers import get_lexer_by_name
+        from pygments.formatters import html
+    except ImportError as e:
+        raise ImportError('mistune and pygments are '
+                          'required to export to HTML') from e
+
+    class HighlightRenderer(mistune.Renderer):
+        """mistune renderer with syntax highlighting
+        """
+
+        def block_code(self, code, lang):
+            if not lang:
+                return '\n<pre><code>%s</code></pre>\n' % \
+                    mistune.escape(code)
+            lexer = get_lexer_by_name(lang, stripall=True)
+            formatter = html.HtmlFormatter()
+            return highlight(code, lexer, formatter)
 
-    def block_code(self, code, lang):
-        if not lang:
-            return '\n<pre><code>%s</code></pre>\n' % \
-                mistune.escape(code)
-        lexer = get_lexer_by_name(lang, stripall=True)
-        formatter = html.HtmlFormatter()
-        return highlight(code, lexer, formatter)
+    return mistune, HighlightRenderer()
 
 
 class DAG(collections.abc.Mapping):
@@ -71,34 +80,97 @@ class DAG(collections.abc.Mapping):
     differ: CodeDiffer
         An object to determine whether two pieces of code are the same and
         to output a diff, defaults to CodeDiffer() (default parameters)
+    durations: str, pathlib.Path or DurationHistory, optional
+        Where to record how long tasks take to run, used by DAG.plan_build
+        to estimate build time. If a str or pathlib.Path, a JSON file is
+        used. Durations are not recorded if None (default)
+    worker_pool: WorkerPool, optional
+        Process pool used by PythonCallable tasks when the executor allows
+        tasks to create child processes (Serial), it is kept across tasks
+        and builds. Defaults to WorkerPool() (started the first time it is
+        used, closed by DAG.close), which runs each task in a new process
+    reuse_workers: bool, optional
+        If True, the default worker pool runs all tasks in the same process
+        (WorkerPool(maxtasksperchild=None)), so they do not pay the cost of
+        starting a process and importing modules every time, but tasks see
+        changes made by previous tasks to the state of a module (e.g. a
+        global variable). Defaults to False. Cannot be used with worker_pool
+    journal: str, pathlib.Path or BuildJournal, optional
+        Where to record when tasks start and finish while building, if a
+        build is interrupted, DAG.build(resume=True) uses it to skip the
+        tasks that finished. If a str or pathlib.Path, a JSON lines file is
+        used. Nothing is recorded if None (default)
+    trace: str, pathlib.Path or BuildTrace, optional
+        Where to record how long each phase of the build takes (rendering,
+        checking dependencies, waiting for a worker, running, saving
+        metadata and callbacks) for each task. If a str or pathlib.Path,
+        spans are saved there in the Chrome trace format after each build.
+        Nothing is recorded if None (default)
+    profile_directory: str or pathlib.Path, optional
+        Where to save the profile of each task when profiling (see
+        DAG.build), one .prof file per task in a folder named after the DAG
+        (so DAGs can share it). Defaults to 'profiles'
 
     """
     def __init__(self, name=None, clients=None, differ=None,
                  on_task_finish=None, on_task_failure=None,
-                 executor='serial'):
-        self._G = nx.DiGraph()
+                 executor='serial', durations=None, worker_pool=None,
+                 journal=None, trace=None, profile_directory='profiles',
+                 reuse_workers=False):
+        self._G = TaskGraph()
 
         self.name = name or 'No name'
         self.differ = differ or CodeDiffer()
         self._logger = logging.getLogger(__name__)
 
         self._clients = clients or {}
-        self._rendered = False
+        # task name -> hash of the inputs used the last time it was rendered
+        self._render_cache = {}
 
         if executor == 'serial':
             self._executor = executors.Serial()
         elif executor == 'parallel':
             self._executor = executors.Parallel()
+        elif executor == 'hybrid':
+            self._executor = executors.Hybrid()
+        elif executor == 'async':
+            self._executor = executors.Async()
         elif isinstance(executor, executors.Executor.Executor):
             self._executor = executor
         else:
-            raise TypeError('executor must be "serial", "parallel" or '
-                            'an instance of executors.Executor, got type {}'
+            raise TypeError('executor must be "serial", "parallel", '
+                            '"hybrid", "async" or an instance of '
+                            'executors.Executor, got type {}'
                             .format(type(executor)))
 
         self._on_task_finish = on_task_finish
         self._on_task_failure = on_task_failure
 
+        if durations is None or isinstance(durations, DurationHistory):
+            self._durations = durations
+        else:
+            self._durations = DurationHistory(durations)
+
+        if journal is None or isinstance(journal, BuildJournal):
+            self._journal = journal
+        else:
+            self._journal = BuildJournal(journal)
+
+        if trace is None or isinstance(trace, BuildTrace):
+            self._trace = trace
+        else:
+            self._trace = BuildTrace(trace)
+
+        if worker_pool is not None and reuse_workers:
+            raise ValueError('reuse_workers cannot be used with worker_pool, '
+                             'pass WorkerPool(maxtasksperchild=None) instead')
+
+        # pools passed in the constructor are closed by whoever created them
+        self._owns_worker_pool = worker_pool is None
+        self.worker_pool = worker_pool or WorkerPool(
+            maxtasksperchild=None if reuse_workers else 1)
+        self.profile_directory = Path(profile_directory)
+
     @property
     def product(self):
         # We have to rebuild it since tasks might have been added
@@ -111,15 +183,24 @@ class DAG(collections.abc.Mapping):
     def pop(self, name):
         """Remove a task from the dag
         """
-        t = self._G.nodes[name]['task']
-        self._G.remove_node(name)
+        t = self._G.remove_node(name)
+        self._render_cache.pop(name, None)
         return t
 
     def render(self, show_progress=True, force=False):
         """Render the graph
-        """
-        g = self._to_graph()
 
+        Tasks whose raw source, params and upstream product identifiers did
+        not change since they were last rendered are skipped
+
+        Parameters
+        ----------
+        show_progress: bool, optional
+            Show a progress bar, defaults to True
+        force: bool, optional
+            If True, render all tasks even if their inputs did not change,
+            defaults to False
+        """
         def unique(elements):
             elements_unique = []
             for elem in elements:
@@ -127,7 +208,7 @@ class DAG(collections.abc.Mapping):
                     elements_unique.append(elem)
             return elements_unique
 
-        dags = unique([t.dag for t in g])
+        dags = unique([t.dag for t in self.values()])
 
         # first render any other dags involved (this happens when some
         # upstream parameters come form other dags)
@@ -140,7 +221,79 @@ class DAG(collections.abc.Mapping):
 
         return self
 
-    def build(self, force=False, clear_cached_status=False):
+    def save_plan(self, path):
+        """
+        Render the DAG and save its rendered state to a JSON file: task
+        names, rendered source, product identifiers, upstream dependencies
+        and a hash of the inputs used to render each task
+
+        Parameters
+        ----------
+        path: str or pathlib.Path
+            Where to save the plan
+
+        Notes
+        -----
+        Use DAG.load_plan in a new session to skip rendering tasks whose
+        inputs did not change
+        """
+        self.render(show_progress=False)
+
+        plan = {'version': PLAN_VERSION,
+                'dag': self.name,
+                'tasks': {t.name: t._plan() for t in self._topological_sort()}}
+
+        Path(path).write_text(json.dumps(plan))
+
+    def load_plan(self, path, show_progress=True):
+        """
+        Render the DAG using a plan saved by DAG.save_plan. Tasks whose
+        source, params, product and upstream product identifiers did not
+        change since the plan was saved are restored instead of rendered
+        (source rendering and validation are skipped), the rest are
+        rendered as usual
+
+        Parameters
+        ----------
+        path: str or pathlib.Path
+            Plan location
+        show_progress: bool, optional
+            Show a progress bar, defaults to True
+        """
+        plan = json.loads(Path(path).read_text())
+
+        if plan.get('version') != PLAN_VERSION:
+            self._logger.info('Ignoring plan in %s, it was saved by a '
+                              'different version', path)
+            tasks = {}
+        else:
+            tasks = plan['tasks']
+
+        restored = 0
+        tasks_order = self._topological_sort()
+
+        if show_progress:
+            from tqdm.auto import tqdm
+            tasks_order = tqdm(tasks_order, total=len(tasks_order))
+            tasks_order.set_description('Loading plan for DAG "{}"'
+                                        .format(self.name))
+
+        for t in tasks_order:
+            entry = tasks.get(t.name)
+
+            if entry is not None and t._render_from_plan(entry):
+                self._render_cache[t.name] = entry['key']
+                restored += 1
+            else:
+                self._render_tasks([t], show_progress=False, force=False)
+
+        self._logger.info('Restored %i out of %i tasks from plan in %s',
+                          restored, len(self._G), path)
+
+        return self
+
+    def build(self, force=False, clear_cached_status=False, resume=False,
+              profile=False):
         """
         Runs the DAG in order so that all upstream dependencies are run for
         every task
@@ -155,45 +308,210 @@ class DAG(collections.abc.Mapping):
             If True, it will clear all cached status forcing a check on all
             tasks
 
+        resume: bool, optional
+            Continue a build that was interrupted: tasks that finished
+            according to the journal (see the journal parameter in the
+            constructor) are not checked or run again if their source,
+            params and upstream products did not change and their upstream
+            dependencies also finished. Tasks that were running when the
+            build was interrupted are checked as usual. If False, the
+            journal is cleared. Defaults to False
+
+        profile: bool, optional
+            If True, Task.run is profiled with cProfile for every task that
+            runs, otherwise only tasks with Task.profile = True are
+            profiled. Profiles are saved in the profile directory (see the
+            constructor), use DAG.profile_summary to see the functions
+            that took the most time. Defaults to False
+
         Returns
         -------
         BuildReport
             A dict-like object with tasks as keys and dicts with task
             status as values
         """
+        try:
+            self._prepare_build(force, clear_cached_status, resume,
+                                profile)
+            report = self._executor(dag=self, force=force)
+        finally:
+            self._save_trace()
+
+        self._record_durations(report)
+
+        return report
+
+    def _prepare_build(self, force, clear_cached_status, resume,
+                       profile=False, tasks=None):
+        """Render and check status before passing the DAG to an executor,
+        if tasks is not None (e.g. the tasks in a DAGView), only those tasks
+        (and their upstream dependencies from other DAGs) are rendered and
+        checked, tasks must be in topological order
+        """
+        if self._trace is not None:
+            self._trace.clear()
+
+        if clear_cached_status:
+            for t in (self.values() if tasks is None else tasks):
+                t.product._clear_cached_outdated_status()
+
+        if tasks is None:
+            self.render()
+            tasks = self._topological_sort()
+        else:
+            self._render_lineage(tasks, show_progress=True, force=False)
+
+        self._start_journal(tasks, resume)
+        self._start_profile(tasks, profile)
+
+        # no need to check status if running everything
+        if not force:
+            outdated.evaluate([t for t in tasks if not t._resumed],
+                              trace=self._trace)
+
+    def plan_build(self, force=False, clear_cached_status=False,
+                   max_workers=None):
+        """
+        Returns the tasks that DAG.build would run and the reason for each
+        one (missing product, outdated data or outdated code) without running
+        anything. Includes the estimated build time, based on recorded
+        durations (see the durations parameter in the constructor) and the
+        number of tasks the executor runs at the same time
+
+        Parameters
+        ----------
+        force: bool, optional
+            Plan a build with force=True (all tasks run), defaults to False
+        clear_cached_status: bool, optional
+            If True, it will clear all cached status forcing a check on all
+            tasks
+        max_workers: int, optional
+            Number of threads used to fetch products metadata concurrently,
+            see DAG.status
+
+        Returns
+        -------
+        BuildPlan
+            A Table with one row per task, the estimated time in seconds
+            is in the estimated_time attribute. Tasks without recorded
+            durations are not included in the estimation, they are listed
+            in the without_history attribute
+        """
         if clear_cached_status:
             self._clear_cached_outdated_status()
 
         self.render()
-        return self._executor(dag=self, force=force)
+
+        if not force:
+            self._evaluate_outdated_status(max_workers=max_workers)
+
+        tasks = self._topological_sort()
+        rows = []
+        durations = {}
+
+        for t in tasks:
+            reasons = ['Forced'] if force else t._build_reasons()
+            elapsed = None
+
+            if reasons:
+                if self._durations is not None:
+                    elapsed = self._durations.estimate(t.name)
+
+                durations[t.name] = elapsed or 0
+
+            rows.append(Row({'name': t.name,
+                             'Will run?': bool(reasons),
+                             'Reason': ', '.join(reasons),
+                             'Estimated (s)': elapsed}))
+
+        workers = self._executor.workers
+        estimated_time = estimate.makespan(
+            [t.name for t in tasks],
+            {t.name: self._G.predecessors(t.name) for t in tasks},
+            durations, workers=workers,
+            priority=self._critical_path(tasks))
+
+        return BuildPlan(rows, estimated_time=estimated_time,
+                         workers=workers)
 
     def build_partially(self, target, clear_cached_status=False):
         """Partially build a dag until certain task
+
+        Only the upstream dependencies of target are rendered and built,
+        the DAG is not modified
         """
-        if clear_cached_status:
-            self._clear_cached_outdated_status()
+        return self.view(target, include_targets=False).build(
+            clear_cached_status=clear_cached_status)
+
+    def view(self, targets, include_targets=True):
+        """
+        Returns a read-only view with the given tasks and all their upstream
+        dependencies, the view can be rendered, built and its status
+        checked, without rendering or building the rest of the DAG
+
+        Parameters
+        ----------
+        targets: str or iterable
+            Task name or names
+        include_targets: bool, optional
+            If False, only the upstream dependencies are included in the
+            view, defaults to True
+        """
+        if isinstance(targets, str):
+            targets = [targets]
 
-        lineage = self[target]._lineage
-        dag = copy(self)
+        G = self._G
+        indexes = [G.index(name) for name in targets]
+        bitset = 0
 
-        to_pop = set(dag) - {self.name} - lineage
+        for i in indexes:
+            bitset |= G.ancestors(i)
 
-        for task in to_pop:
-            dag.pop(task)
+            if include_targets:
+                bitset |= 1 << i
 
-        dag.render()
-        return self._executor(dag=dag)
+        return DAGView(self, G.names(bitset))
 
-    def status(self, clear_cached_status=False, **kwargs):
+    def ancestors(self, task_name):
+        """
+        Set with the names of all the tasks that task_name depends on
+        (upstream dependencies and their upstream dependencies), computed
+        once until tasks or edges are added or removed
+        """
+        return set(self._G.names(self._G.ancestors(self._G.index(task_name))))
+
+    def descendants(self, task_name):
+        """
+        Set with the names of all the tasks that depend on task_name, these
+        are the tasks affected if task_name changes. Computed once until
+        tasks or edges are added or removed
+        """
+        return set(self._G.names(
+            self._G.descendants(self._G.index(task_name))))
+
+    def status(self, clear_cached_status=False, max_workers=None,
+               **kwargs):
         """Returns a table with tasks status
+
+        Parameters
+        ----------
+        clear_cached_status: bool, optional
+            If True, it will clear all cached status forcing a check on all
+            tasks
+        max_workers: int, optional
+            Number of threads used to fetch products metadata concurrently
+            (products that share a client are fetched one at a time), if
+            None, metadata is fetched serially
+        **kwargs
+            Passed to Task.status
         """
         if clear_cached_status:
             self._clear_cached_outdated_status()
 
         self.render()
+        self._evaluate_outdated_status(max_workers=max_workers)
 
-        return Table([self._G.nodes[name]['task'].status(**kwargs)
-                      for name in self._G])
+        return Table([self[name].status(**kwargs) for name in self])
 
     def to_dict(self, include_plot=False, clear_cached_status=False):
         """Returns a dict representation of the dag's Tasks,
@@ -207,8 +525,7 @@ class DAG(collections.abc.Mapping):
         if clear_cached_status:
             self._clear_cached_outdated_status()
 
-        d = {name: self._G.nodes[name]['task'].to_dict()
-             for name in self._G}
+        d = {name: self[name].to_dict() for name in self}
 
         if include_plot:
             d['_plot'] = self.plot(open_image=False)
@@ -218,6 +535,8 @@ class DAG(collections.abc.Mapping):
     def to_markup(self, path=None, fmt='html'):
         """Returns a str (md or html) with the pipeline's description
         """
+        from jinja2 import Template
+
         if fmt not in ['html', 'md']:
             raise ValueError('fmt must be html or md, got {}'.format(fmt))
 
@@ -229,11 +548,7 @@ class DAG(collections.abc.Mapping):
         out = Template(template_md).render(plot=plot, status=status, dag=self)
 
         if fmt == 'html':
-            if not mistune or not pygments:
-                raise ImportError('mistune and pygments are '
-                                  'required to export to HTML')
-
-            renderer = HighlightRenderer()
+            mistune, renderer = _make_highlight_renderer()
             out = mistune.markdown(out, escape=False, renderer=renderer)
 
             # add css
@@ -245,8 +560,15 @@ class DAG(collections.abc.Mapping):
 
         return out
 
-    def plot(self, open_image=True, path=None, clear_cached_status=False):
+    def plot(self, open_image=True, path=None, clear_cached_status=False,
+             max_workers=None):
         """Plot the DAG
+
+        Parameters
+        ----------
+        max_workers: int, optional
+            Number of threads used to fetch products metadata concurrently,
+            see DAG.status
         """
         if clear_cached_status:
             self._clear_cached_outdated_status()
@@ -256,6 +578,7 @@ class DAG(collections.abc.Mapping):
 
         # FIXME: add tests for this
         self.render()
+        self._evaluate_outdated_status(max_workers=max_workers)
 
         if not path:
             path = tempfile.mktemp(suffix='.png')
@@ -269,6 +592,7 @@ class DAG(collections.abc.Mapping):
         # https://networkx.github.io/documentation/networkx-1.10/reference/drawing.html
         # # http://graphviz.org/doc/info/attrs.html
         # NOTE: requires pygraphviz and pygraphviz
+        import networkx as nx
         G_ = nx.nx_agraph.to_agraph(G)
         G_.draw(path, prog='dot', args='-Grankdir=LR')
 
@@ -287,40 +611,81 @@ class DAG(collections.abc.Mapping):
             if doc is None or doc == '':
                 warnings.warn('Task "{}" has no docstring'.format(task_name))
 
+    def close(self):
+        """
+        Stop the processes in the worker pool if the DAG created it (pools
+        passed in the constructor are not closed), the pool starts again if
+        the DAG is built after closing it
+        """
+        if self._owns_worker_pool:
+            self.worker_pool.close()
+
     def _render_current(self, show_progress, force):
-        # only render the first time this is called, this means that
-        # if the dag is modified, render won't have an effect, DAGs are meant
-        # to be all set before rendering, but might be worth raising a warning
-        # if trying to modify an already rendered DAG
-        if not self._rendered or force:
-            g = self._to_graph(only_current_dag=True)
+        # the topological order includes tasks from other DAGs that are
+        # upstream dependencies of tasks in this one, it is also a valid
+        # order for tasks in this DAG only
+        self._render_tasks(self._topological_sort(), show_progress, force)
+
+    def _render_lineage(self, tasks, show_progress, force):
+        # render a subset of tasks, upstream dependencies declared in other
+        # DAGs are rendered first (only their lineage, not the whole DAG)
+        other = collections.OrderedDict()
+
+        for t in tasks:
+            if t.dag is not self:
+                other.setdefault(t.dag, []).append(t.name)
+
+        for dag, names in other.items():
+            dag.view(names).render(show_progress=show_progress, force=force)
+
+        self._render_tasks(tasks, show_progress, force)
+
+    def _render_tasks(self, tasks, show_progress, force):
+        # tasks are only rendered if their inputs (raw source, params and
+        # upstream product identifiers) changed since the last time they
+        # were rendered, since tasks are visited in topological order, a
+        # change in a product identifier also re-renders its downstream
+        # tasks (which must be in topological order). force=True ignores
+        # the cache
+        if force:
+            for t in tasks:
+                self._render_cache.pop(t.name, None)
 
-            tasks = nx.algorithms.topological_sort(g)
+        if show_progress:
+            from tqdm.auto import tqdm
+            tasks = tqdm(tasks, total=len(tasks))
 
+        for t in tasks:
             if show_progress:
-                tasks = tqdm(tasks, total=len(g))
-
-            for t in tasks:
-                if show_progress:
-                    tasks.set_description('Rendering DAG "{}"'
-                                          .format(self.name))
-
-                with warnings.catch_warnings(record=True) as warnings_:
-                    try:
-                        t.render()
-                    except Exception as e:
-                        raise type(e)('While rendering a Task in {}, check '
-                                      'the full '
-                                      'traceback above for details'
-                                      .format(self)) from e
-
-                if warnings_:
-                    messages = [str(w.message) for w in warnings_]
-                    warning = ('Task "{}" had the following warnings:\n\n{}'
-                               .format(repr(t), '\n'.join(messages)))
-                    warnings.warn(warning)
-
-                self._rendered = True
+                tasks.set_description('Rendering DAG "{}"'
+                                      .format(self.name))
+
+            key = t._render_key()
+
+            # tasks that have not been rendered yet are WaitingRender, this
+            # also covers Task objects replaced by a new one with the same
+            # name
+            if (self._render_cache.get(t.name) == key
+                    and t._status != TaskStatus.WaitingRender):
+                continue
+
+            with warnings.catch_warnings(record=True) as warnings_, \
+                    _span(self._trace, 'render', t.name):
+                try:
+                    t.render()
+                except Exception as e:
+                    raise type(e)('While rendering a Task in {}, check '
+                                  'the full '
+                                  'traceback above for details'
+                                  .format(self)) from e
+
+            if warnings_:
+                messages = [str(w.message) for w in warnings_]
+                warning = ('Task "{}" had the following warnings:\n\n{}'
+                           .format(repr(t), '\n'.join(messages)))
+                warnings.warn(warning)
+
+            self._render_cache[t.name] = key
 
     def _add_task(self, task):
         """Adds a task to the DAG
@@ -331,7 +696,7 @@ class DAG(collections.abc.Mapping):
                              'already'.format(task.name))
 
         if task.name is not None:
-            self._G.add_node(task.name, task=task)
+            self._G.add_node(task.name, task)
         else:
             raise ValueError('Tasks must have a name, got None')
 
@@ -341,8 +706,13 @@ class DAG(collections.abc.Mapping):
         dependencies are not required to come from the same DAG,
         this object might include tasks that are not included in the current
         object
+
+        Notes
+        -----
+        Only used for plotting, use DAG._topological_sort, DAG._get_upstream
+        and DAG._get_downstream for everything else
         """
-        # NOTE: delete this, use existing DiGraph object
+        import networkx as nx
         G = nx.DiGraph()
 
         for task in self.values():
@@ -366,7 +736,7 @@ class DAG(collections.abc.Mapping):
                 # this happens when the task was originally declared in
                 # another dag...
                 if a_task_from.name not in self._G:
-                    self._G.add_node(a_task_from.name, task=a_task_from)
+                    self._G.add_node(a_task_from.name, a_task_from)
 
                 self._G.add_edge(a_task_from.name, task_to.name)
 
@@ -374,7 +744,7 @@ class DAG(collections.abc.Mapping):
             # this happens when the task was originally declared in
             # another dag...
             if task_from.name not in self._G:
-                self._G.add_node(task_from.name, task=task_from)
+                self._G.add_node(task_from.name, task_from)
 
             # DAGs are treated like a single task
             self._G.add_edge(task_from.name, task_to.name)
@@ -382,15 +752,151 @@ class DAG(collections.abc.Mapping):
     def _get_upstream(self, task_name):
         """Get upstream tasks given a task name (returns Task objects)
         """
-        upstream = self._G.predecessors(task_name)
-        return {u: self._G.nodes[u]['task'] for u in upstream}
+        return {u: self._G[u] for u in self._G.predecessors(task_name)}
+
+    def _get_downstream(self, task_name):
+        """Get downstream tasks given a task name (returns Task objects)
+        """
+        return [self._G[d] for d in self._G.successors(task_name)]
+
+    def _topological_sort(self):
+        """
+        List of Task objects in topological order, cached until tasks or
+        edges are added or removed
+        """
+        G = self._G
+        return [G.task(i) for i in G.topological_order()]
+
+    def _evaluate_outdated_status(self, max_workers=None):
+        """
+        Evaluate outdated status for all tasks in a single pass, results
+        are cached in the products
+        """
+        outdated.evaluate(self._topological_sort(), max_workers=max_workers)
+
+    def _critical_path(self, tasks):
+        """
+        Task name -> estimated time from the start of the task until the end
+        of the build, based on recorded durations (tasks without records
+        take the mean of the recorded ones). None if there are no records
+        """
+        durations = self._estimated_durations(tasks)
+
+        if not durations:
+            return None
+
+        return estimate.critical_path(
+            [t.name for t in tasks],
+            {t.name: self._G.predecessors(t.name) for t in tasks},
+            durations,
+            default=sum(durations.values()) / len(durations))
+
+    def _estimated_durations(self, tasks):
+        """
+        Task name -> estimated duration based on recorded durations, tasks
+        without records are not included
+        """
+        if self._durations is None:
+            return {}
+
+        durations = {t.name: self._durations.estimate(t.name) for t in tasks}
+
+        return {name: elapsed for name, elapsed in durations.items()
+                if elapsed is not None}
+
+    def _start_journal(self, tasks, resume):
+        """
+        Clear the journal, or if resuming, mark tasks that finished in the
+        interrupted build so they are skipped
+        """
+        if resume and self._journal is None:
+            raise ValueError('resume=True requires a journal, pass one in '
+                             'the DAG constructor')
+
+        for t in tasks:
+            t._resumed = False
+
+        if self._journal is None:
+            return
+
+        if not resume:
+            self._journal.clear()
+            return
+
+        completed = self._journal.completed()
+        interrupted = self._journal.interrupted()
+
+        if interrupted:
+            self._logger.info('Tasks running when the build was '
+                              'interrupted: %s', interrupted)
+
+        resumed = set()
+
+        # tasks are in topological order, if an upstream dependency has to
+        # run again, the task might have to run too
+        for t in tasks:
+            if (completed.get(t.name) == t._render_key()
+                    and all(up in resumed for up in t.upstream)):
+                t._resumed = True
+                resumed.add(t.name)
+
+        self._logger.info('Resuming build, skipping %i task(s) that '
+                          'finished', len(resumed))
+
+    def _start_profile(self, tasks, profile):
+        """
+        Set where each task saves its profile, profiles from a previous
+        build are deleted so the summary only includes the tasks that run
+        """
+        from dstools.pipeline import profiling
+
+        for t in tasks:
+            if profile or t.profile:
+                t._profile_path = Path(
+                    self._profiles(),
+                    '{}.prof'.format(profiling.file_name(t.name)))
+
+                if t._profile_path.exists():
+                    t._profile_path.unlink()
+            else:
+                t._profile_path = None
+
+    def profile_summary(self, top=20):
+        """
+        Table with the functions that took the most time (cumulative time)
+        adding up the profiles of all tasks in the profile directory, see
+        DAG.build
+
+        Parameters
+        ----------
+        top: int, optional
+            Number of functions to include, defaults to 20
+        """
+        from dstools.pipeline import profiling
+        return profiling.summary(sorted(self._profiles().glob('*.prof')),
+                                 top=top)
+
+    def _profiles(self):
+        """Folder where the tasks in this DAG save their profiles
+        """
+        from dstools.pipeline import profiling
+        return Path(self.profile_directory, profiling.file_name(self.name))
+
+    def _save_trace(self):
+        if self._trace is not None and self._trace.path is not None:
+            self._trace.save()
+
+    def _record_durations(self, report):
+        # executors might not return a report
+        if self._durations is not None and report is not None:
+            self._durations.record_report(report)
 
     def _clear_cached_outdated_status(self):
         for task in self.values():
             task.product._clear_cached_outdated_status()
 
     def __getitem__(self, key):
-        return self._G.nodes[key]['task']
+        return self._G[key]
 
     def __iter__(self):
         # TODO: raise a warning if this any of this dag tasks have tasks
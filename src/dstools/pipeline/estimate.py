@@ -0,0 +1,113 @@
+"""
+Build time estimation
+"""
+import heapq
+
+
+def _downstream(order, upstream):
+    position = {name: i for i, name in enumerate(order)}
+    downstream = {name: [] for name in order}
+
+    for name in order:
+        for up in upstream[name]:
+            if up in position:
+                downstream[up].append(name)
+
+    return position, downstream
+
+
+def critical_path(order, upstream, durations, default=0):
+    """
+    Longest estimated time from the start of each task until the end of the
+    build (the task's duration plus the longest path through its downstream
+    dependencies). Executors start ready tasks with the longest critical
+    path first, since delaying them delays the whole build
+
+    Parameters
+    ----------
+    order: list
+        Task names in topological order
+    upstream: dict
+        Task name -> iterable of upstream task names, names not in order
+        are ignored
+    durations: dict
+        Task name -> duration in seconds
+    default: float, optional
+        Duration for tasks missing in durations, defaults to 0
+
+    Returns
+    -------
+    dict
+        Task name -> length of the critical path in seconds
+    """
+    _, downstream = _downstream(order, upstream)
+    path = {}
+
+    for name in reversed(order):
+        path[name] = (durations.get(name, default)
+                      + max((path[down] for down in downstream[name]),
+                            default=0))
+
+    return path
+
+
+def makespan(order, upstream, durations, workers=1, priority=None):
+    """
+    Estimated wall-clock time to run a set of tasks: tasks start as soon as
+    all their upstream dependencies are done and a worker is available,
+    when more than one task is ready, the one with the highest priority
+    starts first, ties are broken by order (this is how executors pick
+    tasks)
+
+    Parameters
+    ----------
+    order: list
+        Task names in topological order
+    upstream: dict
+        Task name -> iterable of upstream task names, names not in order
+        are ignored
+    durations: dict
+        Task name -> duration in seconds, missing tasks take no time
+    workers: int, optional
+        Number of tasks that can run at the same time, defaults to 1
+    priority: dict, optional
+        Task name -> priority (e.g. the output of critical_path), missing
+        tasks have priority 0. If None, tasks start in order
+
+    Returns
+    -------
+    float
+        Estimated time in seconds
+    """
+    if workers < 1:
+        raise ValueError('workers must be at least 1, got {}'
+                         .format(workers))
+
+    position, downstream = _downstream(order, upstream)
+    priority = priority or {}
+    remaining = {name: len([up for up in upstream[name] if up in position])
+                 for name in order}
+
+    def key(name):
+        return -priority.get(name, 0), position[name]
+
+    ready = [key(name) for name in order if not remaining[name]]
+    heapq.heapify(ready)
+    # (finish time, position) for tasks running
+    running = []
+    now = 0
+
+    while ready or running:
+        while ready and len(running) < workers:
+            _, i = heapq.heappop(ready)
+            heapq.heappush(running, (now + durations.get(order[i], 0), i))
+
+        now, i = heapq.heappop(running)
+
+        for name in downstream[order[i]]:
+            remaining[name] -= 1
+
+            if not remaining[name]:
+                heapq.heappush(ready, key(name))
+
+    return now
@@ -0,0 +1,116 @@
+import logging
+import traceback
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+
+from dstools.pipeline.executors.Parallel import Parallel, _result
+
+
+async def _build_async(task, kwargs, semaphore):
+    """
+    Build a task in the event loop, returns None, or the traceback if it
+    fails
+    """
+    async with semaphore:
+        try:
+            await task.build_async(**kwargs)
+        except Exception:
+            return traceback.format_exc()
+
+
+class Async(Parallel):
+    """
+    Runs a DAG in an asyncio event loop, all tasks run in the current
+    process. Tasks with an async implementation (SQLScript and ShellScript
+    with clients that implement execute_async, BashCommand) do not block
+    the loop, so hundreds of I/O bound tasks can run at the same time, the
+    rest run in a thread pool
+
+    Parameters
+    ----------
+    max_concurrency: int, optional
+        Maximum number of tasks running at the same time, defaults to 100
+    threads: int, optional
+        Number of threads for tasks without an async implementation and to
+        check and save product metadata, defaults to the
+        concurrent.futures.ThreadPoolExecutor default
+    stop_on_failure: bool, optional
+        If True, no more tasks are started after a task fails, otherwise,
+        only tasks that depend on the failed one are skipped. Defaults to
+        False
+    resources: dict, optional
+        Resource name -> amount available, see Parallel
+
+    Notes
+    -----
+    The event loop runs in the current thread, it cannot be used if
+    there is a loop already running (e.g. in a Jupyter notebook). On
+    Python 3.7, tasks that start subprocesses (BashCommand, ShellScript)
+    must be built from the main thread
+    """
+    TASKS_CAN_CREATE_CHILD_PROCESSES = False
+    STOP_ON_EXCEPTION = False
+
+    def __init__(self, max_concurrency=100, threads=None,
+                 logging_directory=None, logging_level=logging.INFO,
+                 stop_on_failure=False, resources=None):
+        super().__init__(processes=max_concurrency,
+                         logging_directory=logging_directory,
+                         logging_level=logging_level,
+                         stop_on_failure=stop_on_failure,
+                         resources=resources)
+        self.max_concurrency = max_concurrency
+        self.threads = threads
+
+    @property
+    def workers(self):
+        return self.max_concurrency
+
+    def _execute(self, dags, kwargs, weights=None):
+        import asyncio
+
+        try:
+            previous = asyncio.get_event_loop()
+        except RuntimeError:
+            # no event loop set in this thread (not the main thread)
+            previous = None
+
+        if previous is not None and previous.is_running():
+            raise RuntimeError('Async executor cannot build a DAG while an '
+                               'event loop is running in the same thread')
+
+        loop = asyncio.new_event_loop()
+        # in the main thread, this also attaches the child watcher needed
+        # to start subprocesses
+        asyncio.set_event_loop(loop)
+        threads = ThreadPoolExecutor(max_workers=self.threads)
+        loop.set_default_executor(threads)
+
+        try:
+            return loop.run_until_complete(
+                self._build_in_loop(dags, kwargs, weights))
+        finally:
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            threads.shutdown()
+            asyncio.set_event_loop(previous)
+            loop.close()
+
+    async def _build_in_loop(self, dags, kwargs, weights):
+        import asyncio
+
+        loop = asyncio.get_event_loop()
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        def submit(task, kwargs, finished):
+            future = asyncio.run_coroutine_threadsafe(
+                _build_async(task, kwargs, semaphore), loop)
+            future.add_done_callback(
+                lambda future: finished.put(
+                    (task.name, partial(_result, future.result()))))
+
+        # the dispatch loop waits for tasks to finish, run it in a separate
+        # thread so it does not block the event loop
+        with ThreadPoolExecutor(max_workers=1) as dispatcher:
+            return await loop.run_in_executor(
+                dispatcher, partial(self._build_many, dags, kwargs, submit,
+                                    weights=weights))
@@ -0,0 +1,374 @@
+"""
+Coordinator/worker executor, workers run in other processes (possibly in
+other machines) and connect to the coordinator over TCP
+
+Messages are tuples sent with multiprocessing.connection, the first
+element is the message type:
+
+* Worker to coordinator: ('hello', worker name), ('heartbeat',),
+  ('log', logger name, level, message), ('result', task name, (elapsed,
+  traceback))
+* Coordinator to worker: ('task', task name, payload), ('stop',)
+"""
+import os
+import time
+import socket
+import logging
+import threading
+from functools import partial
+from collections import deque
+from multiprocessing.connection import Listener, Client
+
+from dstools.pipeline.executors.Parallel import (Parallel, _run_payload,
+                                                 _finish_payload, _result)
+
+
+def _parse_address(address):
+    """Converts 'host:port' to a (host, port) tuple
+    """
+    if isinstance(address, str):
+        host, port = address.rsplit(':', 1)
+        return host, int(port)
+
+    return tuple(address)
+
+
+def _to_bytes(authkey):
+    return authkey.encode() if isinstance(authkey, str) else authkey
+
+
+class _Worker:
+    """A worker connected to the coordinator
+    """
+
+    def __init__(self, name, connection):
+        self.name = name
+        self.connection = connection
+        # task being built and the queue for its result, None if idle
+        self.task = None
+        self.finished = None
+        self.last_seen = time.monotonic()
+        self.lost = False
+        self.lock = threading.Lock()
+
+    def send(self, message):
+        with self.lock:
+            self.connection.send(message)
+
+
+def _wake(address, authkey):
+    try:
+        Client(address, authkey=authkey).close()
+    except Exception:
+        # the listener was closed before accepting this connection
+        pass
+
+
+class _Dispatcher:
+    """
+    Matches tasks with idle workers, tasks wait in a queue until there is an
+    idle worker
+    """
+
+    def __init__(self):
+        self._pending = deque()
+        self._idle = deque()
+        self._lock = threading.Lock()
+
+    def add_task(self, task, payload, finished):
+        with self._lock:
+            self._pending.append((task, payload, finished))
+            self._assign()
+
+    def add_idle(self, worker):
+        with self._lock:
+            self._idle.append(worker)
+            self._assign()
+
+    def remove(self, worker):
+        with self._lock:
+            if worker in self._idle:
+                self._idle.remove(worker)
+
+    def _assign(self):
+        while self._pending and self._idle:
+            worker = self._idle.popleft()
+            task, payload, finished = self._pending.popleft()
+            worker.task, worker.finished = task, finished
+
+            try:
+                worker.send(('task', task.name, payload))
+            except OSError:
+                # the worker disconnected, its reader thread reports it
+                worker.task = worker.finished = None
+                self._pending.appendleft((task, payload, finished))
+
+
+class Distributed(Parallel):
+    """
+    Runs a DAG using workers started with the "dstools worker" command,
+    which connect to this executor (the coordinator) over TCP. Workers only
+    receive what each task needs to run (see Task._payload), dependencies
+    are checked and metadata is saved by the coordinator, so File products
+    must be in storage shared by the coordinator and the workers
+
+    Parameters
+    ----------
+    address: str or tuple
+        Address to listen to, 'host:port' or a (host, port) tuple (e.g.
+        '0.0.0.0:6000' to accept connections from other machines)
+    authkey: str or bytes
+        Key workers must use to connect
+    workers: int, optional
+        Number of workers expected, used to decide how many tasks are sent
+        at the same time and to estimate build time, more workers can
+        connect. Defaults to 1
+    heartbeat_timeout: float, optional
+        Seconds without hearing from a busy worker before considering it
+        lost, the task it was running fails. Defaults to 60
+    stop_on_failure: bool, optional
+        If True, no more tasks are sent after a task fails, otherwise, only
+        tasks that depend on the failed one are skipped. Defaults to False
+    resources: dict, optional
+        Resource name -> amount available, see Parallel
+
+    Notes
+    -----
+    Tasks wait until a worker connects. Logs emitted by tasks are forwarded
+    to the coordinator. Workers keep running after the build finishes and
+    connect again for the next one (unless started with --once)
+    """
+
+    def __init__(self, address, authkey, workers=1, heartbeat_timeout=60,
+                 logging_directory=None, logging_level=logging.INFO,
+                 stop_on_failure=False, resources=None):
+        super().__init__(processes=workers,
+                         logging_directory=logging_directory,
+                         logging_level=logging_level,
+                         stop_on_failure=stop_on_failure,
+                         resources=resources)
+        self.address = _parse_address(address)
+        self.authkey = _to_bytes(authkey)
+        self.heartbeat_timeout = heartbeat_timeout
+
+    def _execute(self, dags, kwargs, weights=None):
+        dispatcher = _Dispatcher()
+        # workers connected, to stop them when the build finishes
+        connected = []
+        stopping = threading.Event()
+        listener = Listener(self.address, authkey=self.authkey)
+        lost_lock = threading.Lock()
+
+        def lose(worker, reason):
+            with lost_lock:
+                if worker.lost:
+                    return
+
+                worker.lost = True
+
+            dispatcher.remove(worker)
+            task, finished = worker.task, worker.finished
+            worker.task = worker.finished = None
+
+            if task is not None and not stopping.is_set():
+                finished.put((task.name,
+                              partial(_result,
+                                      'Worker {} was lost while running the '
+                                      'task: {}'.format(worker.name, reason))))
+
+        def read(worker):
+            while True:
+                try:
+                    message = worker.connection.recv()
+                except (EOFError, OSError):
+                    break
+
+                worker.last_seen = time.monotonic()
+                kind = message[0]
+
+                if kind == 'log':
+                    _, name, level, text = message
+                    logging.getLogger(name).log(level, '[%s] %s',
+                                                worker.name, text)
+                elif kind == 'result':
+                    _, name, result = message
+
+                    with lost_lock:
+                        if worker.lost:
+                            continue
+
+                        task, finished = worker.task, worker.finished
+                        worker.task = worker.finished = None
+
+                    finished.put((name, partial(_finish_payload, task,
+                                                result)))
+                    dispatcher.add_idle(worker)
+
+            lose(worker, 'connection closed')
+
+        def accept():
+            while True:
+                try:
+                    connection = listener.accept()
+
+                    if stopping.is_set():
+                        connection.close()
+                        return
+
+                    _, name = connection.recv()
+                except Exception:
+                    # failed handshake
+                    self._logger.exception('Error accepting a worker')
+                    continue
+
+                self._logger.info('Worker %s connected', name)
+                worker = _Worker(name, connection)
+                connected.append(worker)
+                threading.Thread(target=read, args=(worker,),
+                                 daemon=True).start()
+                dispatcher.add_idle(worker)
+
+        def monitor():
+            while not stopping.wait(1):
+                now = time.monotonic()
+
+                for worker in list(connected):
+                    if (worker.task is not None
+                            and now - worker.last_seen
+                            > self.heartbeat_timeout):
+                        self._logger.error('Worker %s stopped sending '
+                                           'heartbeats', worker.name)
+                        lose(worker, 'no heartbeat in {} seconds'
+                             .format(self.heartbeat_timeout))
+
+        def submit(task, kwargs, finished):
+            payload = self._prepare_payload(task, kwargs, finished)
+
+            if payload is not None:
+                dispatcher.add_task(task, payload, finished)
+
+        accepting = threading.Thread(target=accept, daemon=True)
+        accepting.start()
+        threading.Thread(target=monitor, daemon=True).start()
+
+        try:
+            return self._build_many(dags, kwargs, submit, weights=weights)
+        finally:
+            stopping.set()
+
+            for worker in connected:
+                try:
+                    worker.send(('stop',))
+                except OSError:
+                    pass
+
+            # accept() blocks until a worker connects, connect to wake it up
+            # so the address is released when the listener is closed
+            threading.Thread(target=_wake, args=(listener.address,
+                                                 self.authkey),
+                             daemon=True).start()
+            accepting.join()
+            listener.close()
+
+            for worker in connected:
+                worker.connection.close()
+
+
+class _ForwardHandler(logging.Handler):
+    """Sends log records to the coordinator
+    """
+
+    def __init__(self, send):
+        super().__init__()
+        self._send = send
+
+    def emit(self, record):
+        try:
+            self._send(('log', record.name, record.levelno,
+                        record.getMessage()))
+        except Exception:
+            # the coordinator is gone, nothing to do
+            pass
+
+
+def worker(address, authkey, once=False, heartbeat_interval=5,
+           logging_level=logging.INFO):
+    """
+    Connect to a Distributed executor and run the tasks it sends, when the
+    build finishes, it connects again for the next one
+
+    Parameters
+    ----------
+    address: str or tuple
+        Coordinator address, 'host:port' or a (host, port) tuple
+    authkey: str or bytes
+        Key to connect to the coordinator
+    once: bool, optional
+        Exit after the first build instead of connecting again, defaults to
+        False
+    heartbeat_interval: float, optional
+        Seconds between heartbeats sent while connected, defaults to 5
+    """
+    address = _parse_address(address)
+    authkey = _to_bytes(authkey)
+    name = '{}:{}'.format(socket.gethostname(), os.getpid())
+    logger = logging.getLogger()
+
+    while True:
+        try:
+            connection = Client(address, authkey=authkey)
+        except (OSError, EOFError):
+            # the coordinator is not listening yet or it is shutting down
+            time.sleep(0.1)
+            continue
+
+        lock = threading.Lock()
+
+        def send(message):
+            with lock:
+                connection.send(message)
+
+        try:
+            send(('hello', name))
+        except OSError:
+            connection.close()
+            continue
+
+        handler = _ForwardHandler(send)
+        handler.setLevel(logging_level)
+        logger.addHandler(handler)
+        logger.setLevel(min(logger.level or logging_level, logging_level))
+        disconnected = threading.Event()
+
+        def heartbeat():
+            while not disconnected.wait(heartbeat_interval):
+                try:
+                    send(('heartbeat',))
+                except OSError:
+                    return
+
+        threading.Thread(target=heartbeat, daemon=True).start()
+
+        try:
+            while True:
+                try:
+                    message = connection.recv()
+                except (EOFError, OSError):
+                    break
+
+                if message[0] == 'stop':
+                    break
+
+                _, task_name, payload = message
+
+                try:
+                    send(('result', task_name, _run_payload(payload)))
+                except OSError:
+                    break
+        finally:
+            disconnected.set()
+            logger.removeHandler(handler)
+            connection.close()
+
+        if once:
+            return
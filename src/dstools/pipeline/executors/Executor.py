@@ -1,3 +1,4 @@
-
 class Executor:
-    pass
+    # number of tasks that can run at the same time, used to estimate build
+    # time (see DAG.plan_build)
+    workers = 1
@@ -0,0 +1,90 @@
+import os
+import logging
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+
+from dstools.pipeline.executors.Parallel import (Parallel, _TrackedPool,
+                                                 _build, _result)
+
+
+def uses_client(task):
+    """
+    Default rule used by Hybrid to decide if a task is I/O bound: tasks that
+    use a client (SQLScript, SQLDump, PostgresCopy, ShellScript...) spend
+    most of the time waiting for a database or a remote server
+    """
+    return getattr(task, 'client', None) is not None
+
+
+class Hybrid(Parallel):
+    """
+    Runs a DAG using a thread pool for I/O bound tasks and a process pool
+    for CPU bound tasks. Both pools share the same scheduler, a task is sent
+    to its pool as soon as all its upstream dependencies finish, regardless
+    of the pool they ran in
+
+    Parameters
+    ----------
+    threads: int, optional
+        Number of threads for I/O bound tasks, defaults to 20
+    processes: int, optional
+        Number of processes for CPU bound tasks, defaults to the number of
+        CPUs
+    is_io_bound: callable, optional
+        Function that takes a task and returns True if it should run in the
+        thread pool, defaults to uses_client (tasks with a client). Must be
+        defined at the module level so the executor can be pickled
+    stop_on_failure: bool, optional
+        If True, no more tasks are sent to the pools after a task fails,
+        otherwise, only tasks that depend on the failed one are skipped.
+        Defaults to False
+    resources: dict, optional
+        Resource name -> amount available, see Parallel
+
+    Notes
+    -----
+    Tasks in the thread pool run in the main process so they must not keep
+    the GIL for long. Clients are shared by all tasks that use them, db
+    clients open one connection per thread. The process pool is only
+    started if there are CPU bound tasks to run
+    """
+
+    def __init__(self, threads=20, processes=None, is_io_bound=None,
+                 logging_directory=None, logging_level=logging.INFO,
+                 stop_on_failure=False, resources=None):
+        super().__init__(processes=processes or os.cpu_count(),
+                         logging_directory=logging_directory,
+                         logging_level=logging_level,
+                         stop_on_failure=stop_on_failure,
+                         resources=resources)
+        self.threads = threads
+        self.is_io_bound = is_io_bound or uses_client
+
+    @property
+    def workers(self):
+        return self.threads + self.processes
+
+    def _execute(self, dags, kwargs, weights=None):
+        # processes are started the first time a task uses them
+        pool = _TrackedPool(self.processes)
+
+        def submit(task, kwargs, finished):
+            if self.is_io_bound(task):
+                self._submit_to_threads(threads, task, kwargs, finished)
+            else:
+                self._submit_to_pool(pool, task, kwargs, finished)
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.threads) as threads:
+                return self._build_many(dags, kwargs, submit,
+                                        weights=weights, check=pool.check)
+        finally:
+            pool.terminate()
+
+    def _submit_to_threads(self, threads, task, kwargs, finished):
+        def callback(future):
+            # the task was built in place, only report the result
+            finished.put((task.name, partial(_result, future.result())))
+
+        threads.submit(_build, task, kwargs).add_done_callback(callback)
+        self._logger.info('Added %s to the thread pool...', task.name)
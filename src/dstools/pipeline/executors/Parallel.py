@@ -1,123 +1,866 @@
+import os
+import time
+import queue
+import pickle
 import logging
-from multiprocessing import Pool
+import itertools
+import threading
+import traceback
+import multiprocessing
+from datetime import datetime
+from functools import partial
+
+from dstools.exceptions import TaskBuildError
 from dstools.pipeline.constants import TaskStatus
+from dstools.pipeline.Table import BuildReport
 from dstools.pipeline.executors.Executor import Executor
+from dstools.pipeline.executors.Scheduler import Scheduler, share_capacity
 from dstools.pipeline.executors.LoggerHandler import LoggerHandler
 
 
+def _build(task, kwargs):
+    """
+    Build a task in this process, returns None, or the traceback if it
+    fails
+    """
+    try:
+        task.build(**kwargs)
+    except Exception:
+        return traceback.format_exc()
+
+
+def _run_payload(payload):
+    """
+    Run a pickled task payload (see Task._payload) in a worker process,
+    returns the elapsed time and None, or None and the traceback if it
+    fails (exceptions are not always picklable). The last element has the
+    process id and when the task started and finished (see Task._record_run)
+    """
+    return _run_task(pickle.loads(payload))
+
+
+def _run_task(task):
+    then = datetime.now()
+    start = time.time()
+
+    try:
+        task._run()
+    except Exception:
+        return (None, traceback.format_exc(),
+                (os.getpid(), start, time.time()))
+
+    return ((datetime.now() - then).total_seconds(), None,
+            (os.getpid(), start, time.time()))
+
+
+def _run_chain(payloads):
+    """
+    Run pickled task payloads one after the other, stops at the first one
+    that fails. Returns a list with the result of each payload that ran
+    (see _run_payload)
+    """
+    results = []
+
+    for payload in payloads:
+        task = pickle.loads(payload)
+        results.append(_run_task(task))
+
+        if results[-1][1] is not None:
+            break
+
+        # the parent checks the product once the whole chain finished,
+        # check it here too so the next task does not run if this one
+        # failed to create it
+        if not task.product.exists():
+            results[-1] = (None,
+                           'TaskBuildError: the task ran successfully but '
+                           'product "{}" does not exist yet '
+                           '(task.product.exist() returned False)'
+                           .format(task.product), results[-1][2])
+            break
+
+    return results
+
+
+def _run_batch(payloads):
+    """
+    Run pickled task payloads one after the other, returns a list with the
+    result of each one (see _run_payload)
+    """
+    return [_run_payload(payload) for payload in payloads]
+
+
+def _result(tb=None):
+    """
+    finish function (see Parallel._build_many) for tasks built in this process
+    and errors raised outside the task
+    """
+    return tb
+
+
+# where pool workers report the jobs they start (see _TrackedPool)
+_started = None
+
+
+def _init_worker(started):
+    global _started
+    _started = started
+
+
+def _run_tracked(token, func, args):
+    """
+    Report that this process started the job, then run it
+    """
+    _started.put((token, os.getpid()))
+    return func(*args)
+
+
+def _is_alive(pid):
+    # a worker that died is a zombie until the pool joins it (the pool
+    # checks for exited workers every 0.1 seconds), it is reported as lost
+    # in the next check
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # the pid was reused by a process from another user
+        return False
+
+    return True
+
+
+class _TrackedPool:
+    """
+    A multiprocessing.Pool (started the first time it is used) that finds
+    jobs that were lost. If a worker dies (e.g. killed by the OOM killer),
+    the pool replaces it but the job it was running never finishes and its
+    callbacks are never called, check calls the error callback of those
+    jobs instead. Results that arrive after a job was reported as lost are
+    ignored
+    """
+
+    def __init__(self, processes):
+        self.processes = processes
+        self._pool = None
+        self._started = None
+        # token -> error_callback of jobs that have not finished
+        self._pending = {}
+        # token -> id of the process that started the job
+        self._pids = {}
+        self._tokens = itertools.count()
+        self._lock = threading.Lock()
+
+    def apply_async(self, func, args, callback, error_callback):
+        if self._pool is None:
+            self._started = multiprocessing.SimpleQueue()
+            self._pool = multiprocessing.Pool(processes=self.processes,
+                                              initializer=_init_worker,
+                                              initargs=(self._started,))
+
+        token = next(self._tokens)
+
+        with self._lock:
+            self._pending[token] = error_callback
+
+        def done(result):
+            if self._finish(token):
+                callback(result)
+
+        def failed(e):
+            if self._finish(token):
+                error_callback(e)
+
+        self._pool.apply_async(_run_tracked, [token, func, args],
+                               callback=done, error_callback=failed)
+
+    def _finish(self, token):
+        # False if the job was already reported as lost
+        with self._lock:
+            self._pids.pop(token, None)
+            return self._pending.pop(token, None) is not None
+
+    def check(self):
+        """
+        Call the error callback of the jobs whose worker died
+        """
+        if self._pool is None:
+            return
+
+        with self._lock:
+            while not self._started.empty():
+                token, pid = self._started.get()
+
+                # the job may have finished already
+                if token in self._pending:
+                    self._pids[token] = pid
+
+            lost = [token for token, pid in self._pids.items()
+                    if not _is_alive(pid)]
+            callbacks = [(self._pending.pop(token), self._pids.pop(token))
+                         for token in lost]
+
+        for error_callback, pid in callbacks:
+            error_callback(RuntimeError('The worker process running the '
+                                        'task (pid {}) died unexpectedly'
+                                        .format(pid)))
+
+    def terminate(self):
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.terminate()
+
+
+def _is_fan_out(task):
+    # avoid circular imports
+    from dstools.pipeline.tasks import FanOut
+    return isinstance(task, FanOut)
+
+
+def _finish_payload(task, result, queued=None):
+    """
+    Finish building a task whose payload ran in a worker process, returns
+    None, or the traceback if it failed. queued is when the payload was
+    sent to the worker
+    """
+    elapsed, tb, (pid, start, end) = result
+    task._record_run(start, end, pid, queued)
+
+    if tb is not None:
+        task._run_failed(tb)
+        return tb
+
+    try:
+        task._finish_build(run=True, elapsed=elapsed)
+    except Exception:
+        return traceback.format_exc()
+
+
+def _finish_chained(tasks, results, i, queued=None):
+    """
+    Finish building the i-th task of a chain that ran in a worker process
+    (see _finish_payload). If it fails here (e.g. saving metadata or the
+    on_finish callback), the tasks after it already ran, their products
+    are deleted so they are not seen as up-to-date in the next build
+    """
+    tb = _finish_payload(tasks[i], results[i], queued)
+
+    # the chain stops at the first task that fails in the worker
+    ran = tasks[i + 1:len(results)]
+
+    if tb is None or not ran:
+        return tb
+
+    for task in ran:
+        try:
+            task.product.delete()
+        except Exception:
+            tb += ('\nError deleting the product of task "{}":\n{}'
+                   .format(task.name, traceback.format_exc()))
+
+    return tb + ('\nTasks {} ran after this one in the same process, their '
+                 'metadata was not saved and their products were deleted'
+                 .format([task.name for task in ran]))
+
+
+class _Tagged:
+    """Puts items in a queue along with a tag
+    """
+
+    def __init__(self, queue, tag):
+        self._queue = queue
+        self._tag = tag
+
+    def put(self, item):
+        self._queue.put((self._tag, item))
+
+
+class _DAGBuild:
+    """
+    State of a DAG while Parallel builds it, finished is the queue where
+    submitted tasks put their results
+    """
+
+    def __init__(self, executor, dag, finished, chains, batch):
+        self.executor = executor
+        self.dag = dag
+        self.finished = finished
+        self._logger = executor._logger
+
+        if executor.logging_directory:
+            self._logger_handler = LoggerHandler(
+                dag_name=dag.name, directory=executor.logging_directory,
+                logging_level=executor.logging_level)
+            self._logger_handler.add()
+        else:
+            self._logger_handler = None
+
+        self.tasks = dag._topological_sort()
+        self.tasks_by_name = {t.name: t for t in self.tasks}
+        # FanOut tasks whose partitions were added to the scheduler and
+        # the names of the partitions (DAG callbacks do not run for them)
+        self.expanded = []
+        self.partitions = set()
+
+        # tasks built in a previous call to build in the same session
+        # FIXME: if the session is restarted even up-to-date tasks will be
+        # WaitingExecution again, so maybe change WaitingExecution to
+        # WaitingBuild?
+        self.done = [t.name for t in self.tasks
+                     if t._status == TaskStatus.Executed]
+        fused = {}
+
+        if chains is not None:
+            fused = executor._find_chains(self.tasks, self.done)
+            chains.update(fused)
+
+        # estimated durations of the tasks to send in chunks
+        self.tiny = {}
+
+        if batch:
+            self.tiny = {name: elapsed for name, elapsed
+                         in dag._estimated_durations(self.tasks).items()
+                         if elapsed < executor.batch_threshold
+                         and self.tasks_by_name[name] not in fused
+                         and not _is_fan_out(self.tasks_by_name[name])}
+
+        # start tasks in the critical path first, if there are recorded
+        # durations
+        self.scheduler = Scheduler(
+            self.tasks, done=self.done,
+            priority=dag._critical_path(self.tasks),
+            capacity=executor.resources,
+            chains=[[t.name for t in chain] for chain in fused.values()])
+        self.tracebacks = {}
+
+    def expand(self, task, kwargs):
+        """
+        If task is a FanOut that has to run, add its partitions to the
+        scheduler, the task is submitted again once they finish (to gather).
+        Returns True if the task must not be submitted now
+        """
+        if not _is_fan_out(task) or task._expanded:
+            return False
+
+        try:
+            run = task._should_run(**kwargs)
+
+            if run:
+                partitions = task._expand()
+            else:
+                task._finish_build(run=False, elapsed=0)
+        except Exception:
+            self.finished.put((task.name,
+                               partial(_result, traceback.format_exc())))
+            return True
+
+        if not run:
+            self.finished.put((task.name, _result))
+            return True
+
+        task._expanded = True
+        self.expanded.append(task)
+
+        self.scheduler.expand(task.name, partitions)
+        self.tasks_by_name.update({t.name: t for t in partitions})
+        self.partitions.update(t.name for t in partitions)
+
+        return True
+
+    def update(self, name, finish):
+        """
+        Call the finish function of a task that finished and update the
+        scheduler, returns True if the task succeeded
+        """
+        task = self.tasks_by_name[name]
+        tb = finish()
+
+        if tb is None:
+            self.scheduler.mark_succeeded(name)
+            self._logger.info('Finished %i out of %i tasks',
+                              len(self.scheduler.succeeded),
+                              len(self.tasks) - len(self.done))
+
+            if self.dag._on_task_finish and name not in self.partitions:
+                self.dag._on_task_finish(task)
+
+            return True
+
+        task._status = TaskStatus.Errored
+        self.tracebacks[name] = tb
+        skipped = self.scheduler.mark_failed(name)
+        self._logger.error('Task "%s" failed, skipping downstream tasks: %s',
+                           name, skipped)
+
+        if self.dag._on_task_failure and name not in self.partitions:
+            self.dag._on_task_failure(task)
+
+        return False
+
+    def close(self):
+        """
+        Close clients, returns the BuildReport or a TaskBuildError if any
+        task failed
+        """
+        if self._logger_handler is not None:
+            self._logger_handler.remove()
+
+        # the next build has to list partitions again
+        for task in self.expanded:
+            task._expanded = False
+
+        for client in self.dag.clients.values():
+            client.close()
+
+        if self.tracebacks:
+            details = '\n\n'.join('Task "{}":\n{}'.format(name, tb)
+                                  for name, tb in self.tracebacks.items())
+            return TaskBuildError('{} task(s) failed: {}. Tasks not '
+                                  'executed: {}\n\n{}'
+                                  .format(len(self.tracebacks),
+                                          list(self.tracebacks),
+                                          self.scheduler.skipped, details))
+
+        succeeded = set(self.scheduler.succeeded)
+        build_report = BuildReport([t.build_report for t in self.tasks
+                                    if t.name in succeeded])
+        self._logger.info(' DAG report:\n{}'.format(repr(build_report)))
+
+        return build_report
+
+
 class Parallel(Executor):
     """Runs a DAG in parallel using the multiprocessing module
+
+    Tasks are sent to the pool as soon as all their upstream dependencies
+    finish, the executor sleeps until a task finishes. Dependencies are
+    checked and metadata is saved in this process, workers only receive
+    what the task needs to run (see Task._payload) and return the elapsed
+    time, tasks that are up-to-date are not sent to the pool
+
+    Parameters
+    ----------
+    processes: int, optional
+        Number of processes in the pool, defaults to 4
+    stop_on_failure: bool, optional
+        If True, no more tasks are sent to the pool after a task fails
+        (tasks that are running finish), otherwise, only tasks that depend
+        on the failed one are skipped. Defaults to False
+    resources: dict, optional
+        Resource name -> amount available (e.g. {'memory': 32}), a task is
+        only sent to the pool if the resources it declares in
+        Task.resources are available. Tasks that use a client with
+        max_concurrency also wait for a free slot in the client
+    fuse_chains: bool, optional
+        If True, linear chains of tasks (a >> b >> c, where each task is the
+        only upstream dependency of the next one and the next one is its
+        only downstream dependency) are sent to the pool as a single unit,
+        which saves one round trip per task in deep pipelines. Metadata and
+        status are still recorded for each task. Tasks that use resources
+        with limited capacity are not fused. If a task fails in this
+        process after the rest of the chain ran (e.g. its on_finish
+        callback), the products of the tasks after it are deleted.
+        Defaults to False
+    batch_threshold: float, optional
+        Tasks that took less than this many seconds in previous builds
+        (requires DAG durations) are sent to the pool in chunks, so tiny
+        tasks do not pay the cost of a round trip each. Metadata, status
+        and build reports are still recorded for each task. Defaults to
+        None (no batching)
+    batch_target: float, optional
+        Estimated duration of each chunk in seconds, chunks are smaller if
+        there are not enough ready tasks to keep all processes busy.
+        Defaults to 1
+
+    Notes
+    -----
+    If any task fails, a TaskBuildError with the tracebacks is raised after
+    all the other tasks finish. If the process running a task dies (e.g.
+    it is killed by the OOM killer), the task fails
     """
     # Tasks should not create child processes, see documention:
     # https://docs.python.org/3/library/multiprocessing.html#multiprocessing.Process.daemon
     TASKS_CAN_CREATE_CHILD_PROCESSES = False
     STOP_ON_EXCEPTION = False
+    # seconds between checks for tasks lost because their worker died
+    CHECK_INTERVAL = 1
 
     def __init__(self, processes=4, logging_directory=None,
-                 logging_level=logging.INFO):
+                 logging_level=logging.INFO, stop_on_failure=False,
+                 resources=None, fuse_chains=False, batch_threshold=None,
+                 batch_target=1):
         self.logging_directory = logging_directory
         self.logging_level = logging_level
         self.processes = processes
+        self.stop_on_failure = stop_on_failure
+        self.resources = resources
+        self.fuse_chains = fuse_chains
+        self.batch_threshold = batch_threshold
+        self.batch_target = batch_target
 
         self._logger = logging.getLogger(__name__)
-        self._i = 0
+
+    @property
+    def workers(self):
+        return self.processes
 
     def __call__(self, dag, **kwargs):
-        if self.logging_directory:
-            logger_handler = LoggerHandler(dag_name=dag.name,
-                                           directory=self.logging_directory,
-                                           logging_level=self.logging_level)
-            logger_handler.add()
-        # TODO: Have to test this with other Tasks, especially the ones that use
-        # clients - have to make sure they are serialized correctly
-        done = []
-        started = []
-        set_all = set(dag)
-
-        # there might be up-to-date tasks, add them to done
-        # FIXME: this only happens when the dag is already build and then
-        # then try to build again (in the same session), if the session
-        # is restarted even up-to-date tasks will be WaitingExecution again
-        # this is a bit confusing, so maybe change WaitingExecution
-        # to WaitingBuild?
-        for name in dag:
-            if dag[name]._status == TaskStatus.Executed:
-                done.append(dag[name])
-
-        def callback(task):
-            """Keep track of finished tasks
-            """
-            self._logger.debug('Added %s to the list of finished tasks...',
-                               task.name)
-            done.append(task)
-
-        def next_task():
-            """
-            Return the next Task to execute, returns None if no Tasks are available
-            for execution (cause their dependencies are not done yet) and raises
-            a StopIteration exception if there are no more tasks to run, which means
-            the DAG is done
-            """
-            # update task status for tasks in the done list
-            for task in done:
-                task = dag[task.name]
-                # TODO: must check for esxecution status - if there is an error
-                # is this status updated automatically? cause it will be better
-                # for tasks to update their status by themselves, then have a
-                # manager to update the other tasks statuses whenever one finishes
-                # to know which ones are available for execution
-                task._status = TaskStatus.Executed
-
-                # update other tasks status, should abstract this in a execution
-                # manager, also make the _get_downstream more efficient by
-                # using the networkx data structure directly
-                for t in task._get_downstream():
-                    t._update_status()
-
-            # iterate over tasks to find which is ready for execution
-            for task_name in dag:
-                # ignore tasks that are already started, I should probably add an
-                # executing status but that cannot exist in the task itself,
-                # maybe in the manaer?
-                if (dag[task_name]._status == TaskStatus.WaitingExecution
-                        and dag[task_name] not in started):
-                    t = dag[task_name]
-                    return t
-                # there might be some up-to-date tasks, add them
-
-            # if all tasks are done, stop
-            set_done = set([t.name for t in done])
-
-            if not self._i % 1000:
-                self._logger.debug('Finished tasks so far: %s', set_done)
-                self._logger.debug('Remaining tasks: %s',
-                                   set_all - set_done)
-                self._logger.info('Finished %i out of %i tasks',
-                                  len(set_done), len(set_all))
-
-            if set_done == set_all:
-                self._logger.debug('All tasks done')
-
-                if self.logging_directory:
-                    logger_handler.remove()
-
-                raise StopIteration
-
-            self._i += 1
-
-        with Pool(processes=self.processes) as pool:
+        result, = self._execute([dag], kwargs)
+
+        if isinstance(result, Exception):
+            raise result
+
+        return result
+
+    def _execute(self, dags, kwargs, weights=None):
+        """
+        Build DAGs sharing the workers, returns a list with the BuildReport
+        of each DAG or the TaskBuildError if any of its tasks failed (see
+        _build_many). Subclasses start their workers here
+        """
+        chains = {}
+
+        with _TrackedPool(self.processes) as pool:
+            def submit(task, kwargs, finished):
+                if task in chains:
+                    self._submit_chain_to_pool(pool, chains[task], kwargs,
+                                               finished)
+                else:
+                    self._submit_to_pool(pool, task, kwargs, finished)
+
+            def submit_batch(tasks, kwargs, finished):
+                self._submit_batch_to_pool(pool, tasks, kwargs, finished)
+
+            return self._build_many(
+                dags, kwargs, submit,
+                chains=chains if self.fuse_chains else None,
+                submit_batch=(submit_batch if self.batch_threshold
+                              is not None else None),
+                weights=weights, check=pool.check)
+
+    def _build_many(self, dags, kwargs, submit, chains=None,
+                    submit_batch=None, weights=None, check=None):
+        """
+        Build all tasks in the dags, submit(task, kwargs, finished) must
+        start building the task and put (task name, finish) in the finished
+        queue once it is done. finish is called in this thread, it must
+        return None if the task succeeded or the traceback if it failed
+
+        If chains is a dictionary, linear chains of tasks are added to it
+        (first task -> list of tasks), when submit receives the first task,
+        it must build the whole chain and put the results in order, tasks
+        after a failed one must not be reported
+
+        If submit_batch is passed, tasks that took less than
+        batch_threshold seconds in previous builds are grouped in chunks,
+        submit_batch(tasks, kwargs, finished) must build them and put the
+        result of each task in the finished queue
+
+        FanOut tasks that have to run are not submitted until their
+        partitions (which are submitted as any other task) finish, see
+        _DAGBuild.expand
+
+        When building more than one DAG, workers are shared in proportion
+        to weights (one per DAG, defaults to the same for all). Returns a
+        list with the BuildReport of each DAG or the TaskBuildError if any
+        of its tasks failed
+
+        If no task finishes in CHECK_INTERVAL seconds, check() is called
+        (if passed), it must put the result of tasks that will never finish
+        (e.g. the process running them died) in the finished queue
+        """
+        # callbacks run in other threads, they put results here
+        finished = queue.Queue()
+        builds = [_DAGBuild(self, dag, _Tagged(finished, i), chains,
+                            submit_batch is not None)
+                  for i, dag in enumerate(dags)]
+        share_capacity([build.scheduler for build in builds])
+        weights = weights or [1] * len(builds)
+        results = [None] * len(builds)
+
+        try:
             while True:
-                try:
-                    task = next_task()
-                except StopIteration:
+                self._dispatch(builds, weights, kwargs, submit,
+                               submit_batch)
+
+                for i, build in enumerate(builds):
+                    if results[i] is None and build.scheduler.finished:
+                        results[i] = build.close()
+
+                if all(result is not None for result in results):
                     break
-                else:
-                    if task is not None:
-                        res = pool.apply_async(
-                            task.build, [], kwds=kwargs, callback=callback)
-                        started.append(task)
-                        logging.info('Added %s to the pool...', task.name)
-                        # time.sleep(3)
+
+                try:
+                    i, (name, finish) = finished.get(
+                        timeout=None if check is None
+                        else self.CHECK_INTERVAL)
+                except queue.Empty:
+                    check()
+                    continue
+
+                failed = not builds[i].update(name, finish)
+
+                if failed and self.stop_on_failure:
+                    for build in builds:
+                        cancelled = build.scheduler.cancel()
+                        self._logger.info('Cancelled tasks: %s', cancelled)
+        finally:
+            for i, build in enumerate(builds):
+                if results[i] is None:
+                    build.close()
+
+        return results
+
+    def _dispatch(self, builds, weights, kwargs, submit, submit_batch):
+        """Submit the ready tasks that can start right away
+        """
+        # FanOut tasks add their partitions as ready tasks, keep going
+        # until no task is expanded
+        expanded = True
+
+        while expanded:
+            expanded = False
+            # only send tasks that can start right away, so a high
+            # priority task that becomes ready later does not wait in the
+            # pool's queue behind lower priority ones
+            free = self.workers - sum(build.scheduler.busy
+                                      for build in builds)
+
+            for build, ready in self._pop_ready(builds, weights, free):
+                if build.tiny:
+                    ready = self._submit_batches(build.scheduler, ready,
+                                                 build.tiny, submit,
+                                                 submit_batch, kwargs,
+                                                 build.finished)
+
+                for task in ready:
+                    if build.expand(task, kwargs):
+                        expanded = True
+                    else:
+                        submit(task, kwargs, build.finished)
+
+    def _pop_ready(self, builds, weights, free):
+        """
+        Take up to free ready tasks, if there is more than one DAG, each
+        slot goes to the DAG with the fewest tasks running per unit of
+        weight. Returns a list of (build, tasks)
+        """
+        if free <= 0:
+            return []
+
+        if len(builds) == 1:
+            return [(builds[0], builds[0].scheduler.pop_ready(limit=free))]
+
+        busy = [build.scheduler.busy for build in builds]
+        ready = [[] for _ in builds]
+        # DAGs without ready tasks that fit
+        exhausted = set()
+
+        while free and len(exhausted) < len(builds):
+            i = min((i for i in range(len(builds)) if i not in exhausted),
+                    key=lambda i: (busy[i] / weights[i], i))
+            task = builds[i].scheduler.pop_ready(limit=1)
+
+            if not task:
+                exhausted.add(i)
+                continue
+
+            ready[i].extend(task)
+            busy[i] += 1
+            free -= 1
+
+        return [(build, tasks) for build, tasks in zip(builds, ready)
+                if tasks]
+
+    def _submit_to_pool(self, pool, task, kwargs, finished):
+        def callback(result):
+            finished.put((task.name, partial(_finish_payload, task, result,
+                                             queued)))
+
+        def error_callback(e):
+            # errors raised outside the task
+            finished.put((task.name, partial(_result, repr(e))))
+
+        payload = self._prepare_payload(task, kwargs, finished)
+        queued = time.time()
+
+        if payload is not None:
+            pool.apply_async(_run_payload, [payload], callback=callback,
+                             error_callback=error_callback)
+
+    def _submit_batches(self, scheduler, ready, tiny, submit, submit_batch,
+                        kwargs, finished):
+        """
+        Send tiny tasks in chunks, each tiny task in ready takes a worker,
+        ready tiny tasks that were not returned by the scheduler are added
+        to the chunks until they reach batch_target seconds. Returns the
+        rest of the tasks in ready
+        """
+        chunks = [[t] for t in ready if t.name in tiny]
+
+        if not chunks:
+            return ready
+
+        mean = sum(tiny[chunk[0].name] for chunk in chunks) / len(chunks)
+        # a recorded duration of zero means it took less than the clock
+        # resolution
+        size = max(1, int(self.batch_target / max(mean, 1e-3)))
+        more = scheduler.pop_ready(limit=len(chunks) * (size - 1),
+                                   select=lambda t: t.name in tiny)
+
+        # spread them so all workers get the same amount of work
+        for i, task in enumerate(more):
+            chunks[i % len(chunks)].append(task)
+
+        for chunk in chunks:
+            if len(chunk) == 1:
+                submit(chunk[0], kwargs, finished)
+            else:
+                scheduler.group([t.name for t in chunk])
+                submit_batch(chunk, kwargs, finished)
+
+        return [t for t in ready if t.name not in tiny]
+
+    def _submit_batch_to_pool(self, pool, tasks, kwargs, finished):
+        """
+        Run tasks in a single call to the pool, tasks that are up-to-date
+        are finished here
+        """
+        to_run = []
+        payloads = []
+
+        for task in tasks:
+            payload = self._prepare_payload(task, kwargs, finished)
+
+            if payload is not None:
+                to_run.append(task)
+                payloads.append(payload)
+
+        if not to_run:
+            return
+
+        queued = time.time()
+
+        def callback(results):
+            for task, result in zip(to_run, results):
+                finished.put((task.name,
+                              partial(_finish_payload, task, result,
+                                      queued)))
+
+        def error_callback(e):
+            # errors raised outside the tasks, all of them fail
+            for task in to_run:
+                finished.put((task.name, partial(_result, repr(e))))
+
+        pool.apply_async(_run_batch, [payloads], callback=callback,
+                         error_callback=error_callback)
+
+    def _find_chains(self, tasks, done):
+        """
+        Linear chains among the tasks to build, returns a dictionary with
+        the first task -> list of tasks in the chain
+        """
+        from dstools.pipeline.executors.fusion import linear_chains
+
+        tasks_by_name = {t.name: t for t in tasks}
+        pending = [t.name for t in tasks if t.name not in done]
+        # tasks that use resources are scheduled one by one
+        fusable = [t.name for t in tasks
+                   if not t.resources and not _is_fan_out(t)
+                   and getattr(getattr(t, 'client', None),
+                               'max_concurrency', None) is None]
+        chains = linear_chains(pending,
+                               {t.name: list(t.upstream) for t in tasks},
+                               fusable=fusable)
+        self._logger.info('Fusing %i chain(s) of tasks: %s', len(chains),
+                          chains)
+
+        return {tasks_by_name[chain[0]]: [tasks_by_name[name]
+                                          for name in chain]
+                for chain in chains}
+
+    def _submit_chain_to_pool(self, pool, chain, kwargs, finished):
+        """
+        Run a chain of tasks in a single call to the pool. Tasks at the
+        beginning of the chain that are up-to-date are finished here, once
+        one has to run, the rest run too since their upstream dependency
+        changed
+        """
+        for i, task in enumerate(chain):
+            payload = self._prepare_payload(task, kwargs, finished)
+
+            if payload is not None:
+                break
+
+            # up-to-date or failed
+            if task._status != TaskStatus.Executed:
+                return
+        else:
+            return
+
+        to_run = chain[i:]
+
+        try:
+            payloads = [payload] + [pickle.dumps(t._payload())
+                                    for t in to_run[1:]]
+        except Exception:
+            finished.put((to_run[0].name,
+                          partial(_result, traceback.format_exc())))
+            return
+
+        for task in to_run[1:]:
+            task._started()
+
+        queued = time.time()
+
+        def callback(results):
+            # the rest of the tasks start as soon as the previous one
+            # finishes
+            for i, task in enumerate(to_run[:len(results)]):
+                finished.put((task.name,
+                              partial(_finish_chained, to_run, results, i,
+                                      queued if i == 0 else None)))
+
+        def error_callback(e):
+            finished.put((to_run[0].name, partial(_result, repr(e))))
+
+        pool.apply_async(_run_chain, [payloads], callback=callback,
+                         error_callback=error_callback)
+
+    def _prepare_payload(self, task, kwargs, finished):
+        """
+        Check if the task has to run, returns the pickled payload (see
+        Task._payload) if it does. Otherwise, or if there is an error, the
+        result is put in finished and None is returned
+        """
+        try:
+            run = task._should_run(**kwargs)
+
+            # pickle here instead of letting the pool do it in a separate
+            # thread, so errors are reported as task failures and the task
+            # is not pickled while another thread modifies it
+            if run:
+                payload = pickle.dumps(task._payload())
+            else:
+                task._finish_build(run=False, elapsed=0)
+        except Exception:
+            finished.put((task.name,
+                          partial(_result, traceback.format_exc())))
+            return None
+
+        if not run:
+            finished.put((task.name, _result))
+            return None
+
+        task._started()
+
+        return payload
 
     # __getstate__ and __setstate__ are needed to make this picklable
 
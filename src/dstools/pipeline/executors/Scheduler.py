@@ -0,0 +1,324 @@
+"""
+Keeps track of which tasks can run while a DAG is built
+"""
+import heapq
+
+
+def share_capacity(schedulers):
+    """
+    Make schedulers take resources from the same pool, used to build more
+    than one DAG at the same time. Clients are added by each scheduler, the
+    rest of the resources are the same in all of them
+    """
+    available = {}
+
+    for scheduler in schedulers:
+        available.update(scheduler._available)
+
+    for scheduler in schedulers:
+        scheduler._available = available
+
+
+class Scheduler:
+    """
+    Tracks the state of each task during a build. A task becomes ready
+    when all its upstream dependencies finish, tasks downstream of a failed
+    one are skipped. Each task is only revisited when one of its upstream
+    dependencies finishes, so the total work is proportional to the number
+    of dependencies, not to the number of times the executor checks for
+    ready tasks
+
+    Parameters
+    ----------
+    tasks: list
+        Tasks to build, in topological order
+    done: iterable, optional
+        Names of tasks that are already done, they are not scheduled and
+        count as finished for their downstream dependencies
+    priority: dict, optional
+        Task name -> priority, ready tasks with higher priority are returned
+        first (e.g. the critical path, see DAG._critical_path), missing
+        tasks have priority 0. If None, ready tasks are returned in
+        topological order
+    capacity: dict, optional
+        Resource name -> amount available, a ready task is only returned if
+        the resources it declares (Task.resources) are available, they are
+        released when the task finishes. Clients with max_concurrency are
+        added automatically, each task uses one slot of its client.
+        Resources not in capacity are not limited
+    chains: list, optional
+        Lists of task names that run as a single unit (see
+        executors.fusion.linear_chains), each task must be the only
+        upstream dependency of the next one. When the first task is
+        returned by pop_ready, the rest are marked as running too, if one
+        fails, the rest are skipped. Only the first task can use resources
+        with limited capacity
+
+    Tasks can also be added while building, see Scheduler.expand
+
+    Notes
+    -----
+    Upstream dependencies that are not in tasks are considered done. If a
+    ready task does not fit in the available resources, tasks with lower
+    priority that fit are returned
+    """
+
+    def __init__(self, tasks, done=None, priority=None, capacity=None,
+                 chains=None):
+        done = set(done or [])
+        priority = priority or {}
+        self._available = dict(capacity or {})
+        self._demand = {}
+
+        for t in tasks:
+            client = getattr(t, 'client', None)
+            max_concurrency = getattr(client, 'max_concurrency', None)
+
+            if max_concurrency is not None:
+                self._available[client] = max_concurrency
+
+        for t in tasks:
+            self._demand[t.name] = self._demand_for(t)
+
+            for resource, amount in self._demand[t.name].items():
+                if amount > self._available[resource]:
+                    raise ValueError('Task "{}" requires {} of {!r} but '
+                                     'only {} is available'
+                                     .format(t.name, amount, resource,
+                                             self._available[resource]))
+
+        # position in topological order, used to break ties between ready
+        # tasks (the same order Serial uses)
+        self._position = {t.name: i for i, t in enumerate(tasks)}
+        # heap key for each task
+        self._key = {t.name: (-priority.get(t.name, 0), self._position[t.name])
+                     for t in tasks}
+        # copy, tasks added by expand are appended
+        self._tasks = list(tasks)
+        self._downstream = {t.name: [] for t in tasks}
+        # number of upstream dependencies that have not finished, None
+        # once the task started or is skipped
+        self._remaining = {}
+        self._ready = []
+
+        for t in tasks:
+            if t.name in done:
+                continue
+
+            upstream = [up for up in t.upstream
+                        if up in self._position and up not in done]
+            self._remaining[t.name] = len(upstream)
+
+            for up in upstream:
+                self._downstream[up].append(t.name)
+
+            if not upstream:
+                self._ready.append(self._key[t.name])
+
+        heapq.heapify(self._ready)
+
+        # task name -> name of the first task in its chain
+        self._unit = {}
+        # first task in a chain -> the rest of the tasks
+        self._chains = {}
+
+        for chain in chains or []:
+            head, *rest = chain
+            self._chains[head] = rest
+
+            for name in rest:
+                if self._demand[name]:
+                    raise ValueError('Task "{}" cannot be part of a chain, '
+                                     'it uses resources with limited '
+                                     'capacity'.format(name))
+
+            for name in chain:
+                self._unit[name] = head
+
+        self.running = set()
+        self.succeeded = []
+        self.failed = []
+        self.skipped = []
+
+    def _demand_for(self, task):
+        """Resources used by a task (only the ones with limited capacity)
+        """
+        demand = {resource: amount
+                  for resource, amount in (task.resources or {}).items()
+                  if resource in self._available}
+        client = getattr(task, 'client', None)
+
+        if client is not None and client in self._available:
+            demand[client] = 1
+
+        return demand
+
+    def _fits(self, name):
+        return all(self._available[resource] >= amount
+                   for resource, amount in self._demand[name].items())
+
+    def _acquire(self, name):
+        for resource, amount in self._demand[name].items():
+            self._available[resource] -= amount
+
+    def _release(self, name):
+        for resource, amount in self._demand[name].items():
+            self._available[resource] += amount
+
+    def pop_ready(self, limit=None, select=None):
+        """
+        Returns the tasks that are ready to run (highest priority first) and
+        marks them as running
+
+        Parameters
+        ----------
+        limit: int, optional
+            Maximum number of tasks to return, if None, returns all ready
+            tasks
+        select: callable, optional
+            Only return tasks for which select(task) is True, the rest stay
+            ready
+        """
+        ready = []
+        # ready tasks that do not fit in the available resources
+        waiting = []
+
+        while self._ready and (limit is None or len(ready) < limit):
+            key = heapq.heappop(self._ready)
+            task = self._tasks[key[1]]
+
+            if ((select is not None and not select(task))
+                    or not self._fits(task.name)):
+                waiting.append(key)
+                continue
+
+            self._acquire(task.name)
+            self._remaining[task.name] = None
+            self.running.add(task.name)
+            ready.append(task)
+
+            for name in self._chains.get(task.name, []):
+                self._remaining[name] = None
+                self.running.add(name)
+
+        for key in waiting:
+            heapq.heappush(self._ready, key)
+
+        return ready
+
+    def group(self, names):
+        """
+        Count running tasks as a single worker (see busy), for tasks that
+        are sent to the same worker
+        """
+        for name in names:
+            self._unit[name] = names[0]
+
+    def expand(self, name, tasks):
+        """
+        Add tasks that must finish before a running task finishes (e.g. the
+        partitions of a FanOut task, listed once its upstream dependencies
+        are done). The running task goes back to waiting and becomes ready
+        again when all the new tasks succeed, if one fails, it is skipped.
+        New tasks are ready right away and have the same priority as the
+        running task
+        """
+        self.running.remove(name)
+        self._release(name)
+        priority = self._key[name][0]
+
+        for t in tasks:
+            if t.name in self._position:
+                raise ValueError('Cannot add task "{}", there is a task '
+                                 'with the same name already'.format(t.name))
+
+            self._demand[t.name] = self._demand_for(t)
+            self._position[t.name] = len(self._tasks)
+            self._key[t.name] = (priority, self._position[t.name])
+            self._tasks.append(t)
+            self._downstream[t.name] = [name]
+            self._remaining[t.name] = 0
+            heapq.heappush(self._ready, self._key[t.name])
+
+        self._remaining[name] = len(tasks)
+
+        if not tasks:
+            heapq.heappush(self._ready, self._key[name])
+
+    def mark_succeeded(self, name):
+        """Mark a running task as successfully finished
+        """
+        self.running.remove(name)
+        self._release(name)
+        self.succeeded.append(name)
+
+        for down in self._downstream[name]:
+            # skipped (another upstream dependency failed) or cancelled
+            if self._remaining[down] is None:
+                continue
+
+            self._remaining[down] -= 1
+
+            if not self._remaining[down]:
+                heapq.heappush(self._ready, self._key[down])
+
+    def mark_failed(self, name):
+        """
+        Mark a running task as failed, returns the names of the tasks that
+        will be skipped because they depend on it
+        """
+        self.running.remove(name)
+        self._release(name)
+        self.failed.append(name)
+
+        skipped = []
+        stack = list(self._downstream[name])
+
+        while stack:
+            down = stack.pop()
+
+            # the rest of the chain did not run
+            if down in self.running and self._unit.get(down) is not None:
+                self.running.remove(down)
+                skipped.append(down)
+                stack.extend(self._downstream[down])
+                continue
+
+            # tasks downstream of a failed one cannot have started, None
+            # means it was already skipped
+            if self._remaining[down] is not None:
+                self._remaining[down] = None
+                skipped.append(down)
+                stack.extend(self._downstream[down])
+
+        self.skipped.extend(skipped)
+
+        return skipped
+
+    def cancel(self):
+        """
+        Do not schedule more tasks, tasks that are running are not affected.
+        Returns the names of the tasks that will not run
+        """
+        cancelled = [name for name, remaining in self._remaining.items()
+                     if remaining is not None]
+
+        for name in cancelled:
+            self._remaining[name] = None
+
+        self._ready = []
+        self.skipped.extend(cancelled)
+
+        return cancelled
+
+    @property
+    def busy(self):
+        """Number of workers in use (a chain uses one)
+        """
+        return len({self._unit.get(name, name) for name in self.running})
+
+    @property
+    def finished(self):
+        """True if there are no tasks running or ready to run
+        """
+        return not self.running and not self._ready
@@ -3,8 +3,6 @@ DAG executors
 """
 import logging
 
-import networkx as nx
-from tqdm.auto import tqdm
 from dstools.pipeline.Table import BuildReport
 from dstools.pipeline.executors.Executor import Executor
 from dstools.pipeline.executors.LoggerHandler import LoggerHandler
@@ -30,8 +28,10 @@ class Serial(Executor):
 
         status_all = []
 
-        g = dag._to_graph()
-        pbar = tqdm(nx.algorithms.topological_sort(g), total=len(g))
+        from tqdm.auto import tqdm
+
+        tasks = dag._topological_sort()
+        pbar = tqdm(tasks, total=len(tasks))
 
         for t in pbar:
             pbar.set_description('Building task "{}"'.format(t.name))
@@ -1,4 +1,7 @@
 from dstools.pipeline.executors.Serial import Serial
 from dstools.pipeline.executors.Parallel import Parallel
+from dstools.pipeline.executors.Hybrid import Hybrid
+from dstools.pipeline.executors.Async import Async
+from dstools.pipeline.executors.Distributed import Distributed
 
-__all__ = ['Serial', 'Parallel']
+__all__ = ['Serial', 'Parallel', 'Hybrid', 'Async', 'Distributed']
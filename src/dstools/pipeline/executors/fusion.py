@@ -0,0 +1,59 @@
+"""
+Fusion of linear task chains
+"""
+from dstools.pipeline.estimate import _downstream
+
+
+def linear_chains(order, upstream, fusable=None):
+    """
+    Find maximal chains of tasks where each task is the only upstream
+    dependency of the next one and the next one is its only downstream
+    dependency (a >> b >> c). Tasks in a chain can never run in parallel,
+    so an executor can run the whole chain in a single worker call
+
+    Parameters
+    ----------
+    order: list
+        Task names in topological order
+    upstream: dict
+        Task name -> iterable of upstream task names, names not in order
+        are ignored
+    fusable: iterable, optional
+        Names of the tasks that can be part of a chain, defaults to all
+
+    Returns
+    -------
+    list
+        Lists of task names in execution order, only chains with two or
+        more tasks are returned
+    """
+    fusable = set(order if fusable is None else fusable)
+    _, downstream = _downstream(order, upstream)
+    upstream = {name: [up for up in upstream[name] if up in downstream]
+                for name in order}
+
+    def linked(up, down):
+        return (up in fusable and down in fusable
+                and downstream[up] == [down] and upstream[down] == [up])
+
+    chains = []
+
+    for name in order:
+        # chains start at tasks that are not linked to their upstream
+        if len(upstream[name]) == 1 and linked(upstream[name][0], name):
+            continue
+
+        chain = [name]
+
+        while len(downstream[chain[-1]]) == 1:
+            down = downstream[chain[-1]][0]
+
+            if not linked(chain[-1], down):
+                break
+
+            chain.append(down)
+
+        if len(chain) > 1:
+            chains.append(chain)
+
+    return chains
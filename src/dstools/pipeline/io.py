@@ -4,9 +4,6 @@ Handling file I/O
 import csv
 from pathlib import Path
 
-import pyarrow as pa
-import pyarrow.parquet as pq
-
 from dstools.pipeline.util import safe_remove
 
 
@@ -95,6 +92,9 @@ class ParquetIO(FileIO):
 
     @classmethod
     def write_in_path(cls, path, data, headers, schema):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
         arrays = [pa.array(col) for col in map(list, zip(*data))]
         table = pa.Table.from_arrays(arrays, names=headers, schema=schema)
         pq.write_table(table, str(path))
@@ -0,0 +1,176 @@
+"""
+Outdated status evaluation
+
+A Task is outdated if its source code changed since it was last run (code
+dependency) or if any of its upstream products is newer or outdated (data
+dependencies). Evaluating tasks in topological order guarantees that the
+status of every upstream product is already known (and cached in the
+product) when evaluating a task, so each task is evaluated exactly once
+and status never has to be computed recursively
+
+The cached status is kept up-to-date during execution: when a Task runs,
+Task.build marks its product as up-to-date and the products of its
+downstream tasks as data-outdated
+
+Before evaluating, metadata for all products is fetched in batches (one
+per Product class and client) using Product.exists_many and
+Product.fetch_metadata_many. Fetching metadata is I/O bound (e.g. queries
+to a remote database), batches can be fetched concurrently in a pool of
+threads, up to Client.max_concurrency at the same time for products that
+share a client. Threads close the connections they open before exiting,
+products whose client uses an in-memory database are checked in the
+current thread
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from dstools.pipeline.products import MetaProduct, Product
+from dstools.pipeline.BuildTrace import _span
+
+# concurrent fetches for products that share a client whose
+# max_concurrency is None
+CLIENT_CONCURRENCY = 4
+
+
+def evaluate(tasks, max_workers=None, trace=None):
+    """
+    Evaluate and cache the outdated status of every task, tasks must be
+    in topological order. Tasks whose status is already cached are not
+    evaluated again, use DAG._clear_cached_outdated_status to force it
+
+    Parameters
+    ----------
+    tasks: iterable
+        Tasks to evaluate, in topological order
+    max_workers: int, optional
+        Number of threads used to fetch metadata, if None or 1, metadata is
+        fetched serially
+    trace: BuildTrace, optional
+        Where to record how long fetching metadata and checking each task
+        takes
+    """
+    tasks = list(tasks)
+
+    with _span(trace, 'fetch metadata'):
+        prefetch_metadata(tasks, max_workers=max_workers)
+
+    for task in tasks:
+        product = task.product
+
+        with _span(trace, 'check data', task.name):
+            product._outdated_data_dependencies()
+
+        with _span(trace, 'check code', task.name):
+            product._outdated_code_dependency()
+
+
+def prefetch_metadata(tasks, max_workers=None):
+    """
+    Fetch metadata for all products that have not fetched it yet, using
+    a single batch per Product class and client
+
+    Parameters
+    ----------
+    tasks: iterable
+        Tasks whose products will fetch metadata
+    max_workers: int, optional
+        Number of threads used to fetch metadata, if None or 1, metadata is
+        fetched serially in the current thread. Products of a class that
+        fetches metadata in batches use one thread per client, the rest are
+        split among the threads. Up to Client.max_concurrency threads
+        (CLIENT_CONCURRENCY if None) fetch products that share a client at
+        the same time, clients open one connection per thread, which is
+        closed when the thread is done. Products whose client cannot be
+        used from other threads (see Client._single_thread) are fetched in
+        the current thread
+    """
+    groups = {}
+
+    for task in tasks:
+        for product in _products(task.product):
+            if not product.did_download_metadata:
+                client = _get_client(product)
+                key = (type(product), id(client))
+                groups.setdefault(key, (client, []))[1].append(product)
+
+    if not max_workers or max_workers == 1:
+        for (cls, _), (_, products) in groups.items():
+            cls._get_metadata_many(products)
+
+        return
+
+    # (client, cls, products) fetched in one thread
+    jobs = []
+    # jobs whose client cannot be used from other threads
+    serial = []
+    # client id -> semaphore that limits the threads using it
+    slots = {}
+
+    for (cls, _), (client, products) in groups.items():
+        if getattr(client, '_single_thread', False):
+            serial.append((cls, products))
+            continue
+
+        if client is None:
+            n = max_workers
+        else:
+            n = min(max_workers, getattr(client, 'max_concurrency', None)
+                    or CLIENT_CONCURRENCY)
+
+            if id(client) not in slots:
+                slots[id(client)] = threading.BoundedSemaphore(n)
+
+        if _implements_batch(cls):
+            # a single round trip
+            jobs.append((client, cls, products))
+        else:
+            # checking one product at a time, split them among the threads
+            jobs.extend((client, cls, products[i::n]) for i in range(n)
+                        if products[i::n])
+
+    def run(client, cls, products):
+        if client is None:
+            cls._get_metadata_many(products)
+            return
+
+        with slots[id(client)]:
+            try:
+                cls._get_metadata_many(products)
+            finally:
+                # the thread may not use this client again, close its
+                # connection so it does not stay open until the client is
+                # closed
+                if hasattr(client, '_release_thread'):
+                    client._release_thread()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(run, *job) for job in jobs]
+
+        for cls, products in serial:
+            cls._get_metadata_many(products)
+
+        # raise any exceptions
+        for future in futures:
+            future.result()
+
+
+def _get_client(product):
+    try:
+        return product.client
+    # products without clients (e.g. File) or with a missing client,
+    # the latter will raise an error when fetching metadata
+    except (AttributeError, ValueError):
+        return None
+
+
+def _implements_batch(cls):
+    return (cls.exists_many.__func__ is not Product.exists_many.__func__
+            or (cls.fetch_metadata_many.__func__
+                is not Product.fetch_metadata_many.__func__))
+
+
+def _products(product):
+    if isinstance(product, MetaProduct):
+        return list(product)
+    else:
+        return [product]
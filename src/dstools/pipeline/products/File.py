@@ -50,6 +50,38 @@ class File(Product):
     def exists(self):
         return self._path_to_file.exists()
 
+    @classmethod
+    def exists_many(cls, products):
+        # subclasses that override how a single file is checked, do not
+        # necessarily work with the batch implementation
+        if cls.exists is not File.exists:
+            return super().exists_many(products)
+
+        listing = _DirectoryListing()
+        return [listing.exists(p._path_to_file) for p in products]
+
+    @classmethod
+    def fetch_metadata_many(cls, products):
+        if cls.fetch_metadata is not File.fetch_metadata:
+            return super().fetch_metadata_many(products)
+
+        listing = _DirectoryListing()
+        metadata = []
+
+        for p in products:
+            source = listing.entry(p._path_to_stored_source_code)
+
+            if source is not None and listing.exists(p._path_to_file):
+                metadata.append(dict(
+                    timestamp=source.stat().st_mtime,
+                    stored_source_code=(p._path_to_stored_source_code
+                                        .read_text())))
+            else:
+                metadata.append(dict(timestamp=None,
+                                     stored_source_code=None))
+
+        return metadata
+
     def delete(self, force=False):
         # force is not used for this product but it is left for API
         # compatibility
@@ -63,3 +95,35 @@ class File(Product):
     @property
     def name(self):
         return self._path_to_file.with_suffix('').name
+
+
+class _DirectoryListing:
+    """
+    Checks files existence by listing each directory once (os.scandir)
+    instead of calling stat on every path
+    """
+
+    def __init__(self):
+        self._listings = {}
+
+    def _listing(self, directory):
+        if directory not in self._listings:
+            try:
+                with os.scandir(directory) as it:
+                    self._listings[directory] = {e.name: e for e in it}
+            except (FileNotFoundError, NotADirectoryError):
+                self._listings[directory] = {}
+
+        return self._listings[directory]
+
+    def entry(self, path):
+        """os.DirEntry for an existing path (None if it does not exist)
+        """
+        entry = self._listing(str(path.parent)).get(path.name)
+
+        # behave like Path.exists: follow symlinks, broken ones do not exist
+        if entry is not None and (entry.is_file() or entry.is_dir()):
+            return entry
+
+    def exists(self, path):
+        return self.entry(path) is not None
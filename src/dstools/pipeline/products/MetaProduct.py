@@ -124,7 +124,11 @@ class MetaProduct:
 
     def _clear_cached_outdated_status(self):
         for p in self.products:
-            p._clear_cached_outdated_status
+            p._clear_cached_outdated_status()
+
+    def _cache_outdated_status(self, data=None, code=None):
+        for p in self.products:
+            p._cache_outdated_status(data=data, code=code)
 
     def _to_json_serializable(self):
         """Returns a JSON serializable version of this product
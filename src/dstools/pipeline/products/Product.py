@@ -48,12 +48,10 @@ class Product(abc.ABC):
 
     @property
     def metadata(self):
-        if self.did_download_metadata:
-            return self._metadata
-        else:
+        if not self.did_download_metadata:
             self._get_metadata()
-            self.did_download_metadata = True
-            return self._metadata
+
+        return self._metadata
 
     @task.setter
     def task(self, value):
@@ -93,6 +91,9 @@ class Product(abc.ABC):
             A task becomes data outdated if an upstream product has a higher
             timestamp or if an upstream product is outdated
             """
+            # NOTE: if upstream products were evaluated first (see
+            # dstools.pipeline.outdated), their status is cached and this
+            # does not recurse
             if self.timestamp is None or up_prod.timestamp is None:
                 return True
             else:
@@ -122,27 +123,78 @@ class Product(abc.ABC):
         self._outdated_data_dependencies_status = None
         self._outdated_code_dependency_status = None
 
+    def _cache_outdated_status(self, data=None, code=None):
+        """Overwrite the cached outdated status, None values are ignored
+        """
+        if data is not None:
+            self._outdated_data_dependencies_status = data
+
+        if code is not None:
+            self._outdated_code_dependency_status = code
+
     def _get_metadata(self):
         """
         This method calls Product.fetch_metadata() (provided by subclasses),
         if some conditions are met, then it saves it in Product.metadata
         """
-        metadata_empty = dict(timestamp=None, stored_source_code=None)
         # if the product does not exist, return a metadata
         # with None in the values
         if not self.exists():
-            self.metadata = metadata_empty
+            self._set_fetched_metadata(None)
         else:
-            metadata = self.fetch_metadata()
+            self._set_fetched_metadata(self.fetch_metadata())
 
-            if metadata is None:
-                self.metadata = metadata_empty
-            else:
-                # FIXME: we need to further validate this, need to check
-                # that this is an instance of mapping, if yes, then
-                # check keys [timestamp, stored_source_code], check
-                # types and fill with None if any of the keys is missing
-                self.metadata = metadata
+    def _set_fetched_metadata(self, metadata):
+        if metadata is None:
+            self.metadata = dict(timestamp=None, stored_source_code=None)
+        else:
+            # FIXME: we need to further validate this, need to check
+            # that this is an instance of mapping, if yes, then
+            # check keys [timestamp, stored_source_code], check
+            # types and fill with None if any of the keys is missing
+            self.metadata = metadata
+
+        self.did_download_metadata = True
+
+    @classmethod
+    def _get_metadata_many(cls, products):
+        """
+        Batch version of Product._get_metadata, uses the exists_many and
+        fetch_metadata_many classmethods, products must be instances of cls
+        """
+        products = list(products)
+        exists = cls.exists_many(products)
+        existing = [p for p, e in zip(products, exists) if e]
+
+        for p, e in zip(products, exists):
+            if not e:
+                p._set_fetched_metadata(None)
+
+        if existing:
+            metadata = cls.fetch_metadata_many(existing)
+
+            for p, m in zip(existing, metadata):
+                p._set_fetched_metadata(m)
+
+    # Subclasses can override these to check several products at once (e.g.
+    # with a single query), they are used to fetch metadata for all the
+    # products in a DAG
+
+    @classmethod
+    def exists_many(cls, products):
+        """
+        Returns a list of bools, one per product (same order) indicating
+        whether the product exists
+        """
+        return [p.exists() for p in products]
+
+    @classmethod
+    def fetch_metadata_many(cls, products):
+        """
+        Returns a list with the result of fetch_metadata, one per product
+        (same order)
+        """
+        return [p.fetch_metadata() for p in products]
 
     def __str__(self):
         return str(self._identifier)
@@ -1,8 +1,6 @@
 import sqlite3
 import json
 
-from psycopg2 import sql
-
 from dstools.pipeline.products import Product
 from dstools.pipeline.products.serializers import Base64Serializer
 from dstools.templates.Placeholder import SQLRelationPlaceholder
@@ -98,6 +96,49 @@ class SQLiteRelation(Product):
         cur.close()
         return exists
 
+    @classmethod
+    def exists_many(cls, products):
+        if cls.exists is not SQLiteRelation.exists:
+            return super().exists_many(products)
+
+        found = set()
+
+        for client, group in _group_by_client(products):
+            names = [p._identifier.name for p in group]
+            query = """
+            SELECT type, name
+            FROM sqlite_master
+            WHERE name IN ({})
+            """
+            found.update((id(client), kind, name) for kind, name
+                         in _select_in(client, query, names))
+
+        return [(id(p.client), p._identifier.kind, p._identifier.name)
+                in found for p in products]
+
+    @classmethod
+    def fetch_metadata_many(cls, products):
+        if cls.fetch_metadata is not SQLiteRelation.fetch_metadata:
+            return super().fetch_metadata_many(products)
+
+        metadata = {}
+
+        for client, group in _group_by_client(products):
+            group[0]._create_metadata_relation()
+            names = [p._identifier.name for p in group]
+            query = """
+            SELECT name, metadata
+            FROM _metadata
+            WHERE name IN ({})
+            """
+            records = _select_in(client, query, names)
+            metadata.update({(id(client), name):
+                             json.loads(metadata_bin.decode("utf-8"))
+                             for name, metadata_bin in records})
+
+        return [metadata.get((id(p.client), p._identifier.name))
+                for p in products]
+
     def delete(self):
         """Deletes the product
         """
@@ -117,6 +158,40 @@ class SQLiteRelation(Product):
         return self._identifier.schema
 
 
+# SQLite limits the number of parameters in a query (999 in older versions)
+_MAX_PARAMETERS = 500
+
+
+def _group_by_client(products):
+    """Returns (client, products) tuples
+    """
+    groups = {}
+
+    for p in products:
+        client = p.client
+        groups.setdefault(id(client), (client, []))[1].append(p)
+
+    return list(groups.values())
+
+
+def _select_in(client, query, values):
+    """
+    Run a query with a "IN ({})" clause for a (possibly long) list of
+    values, returns all records
+    """
+    records = []
+    cur = client.connection.cursor()
+
+    for i in range(0, len(values), _MAX_PARAMETERS):
+        chunk = values[i:i + _MAX_PARAMETERS]
+        cur.execute(query.format(', '.join(['?'] * len(chunk))), chunk)
+        records.extend(cur.fetchall())
+
+    cur.close()
+
+    return records
+
+
 class PostgresRelation(Product):
     """A Product that represents a postgres relation (table or view)
     """
@@ -183,6 +258,8 @@ class PostgresRelation(Product):
         # if yes, also return a dict with None values, and maybe emit a warn
 
     def save_metadata(self):
+        from psycopg2 import sql
+
         metadata = Base64Serializer.serialize(self.metadata)
 
         if self._identifier.kind == 'table':
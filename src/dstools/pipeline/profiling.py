@@ -0,0 +1,94 @@
+"""
+Task profiling
+
+When profiling is enabled (see DAG.build and Task.profile), Task.run is
+called under cProfile and the stats are saved to one .prof file per task
+(named after the task, in a folder named after the DAG inside the
+DAG's profile directory), in the process where the task runs: the pool
+worker for the Parallel executor and the worker pool process for
+PythonCallable tasks built with the Serial executor. Files can be opened
+with pstats, snakeviz or any other tool that reads cProfile output
+
+Tasks with an async implementation (Task.run_async) are not profiled when
+using the Async executor, the event loop runs other tasks at the same time
+"""
+import re
+import pstats
+import cProfile
+from pathlib import Path
+
+from dstools.pipeline.Table import Table, Row
+
+
+def file_name(name):
+    """
+    Make a task or DAG name safe to use as a file name: characters other
+    than letters, digits, "_", "-", ".", "[" and "]" are replaced with "_"
+    """
+    name = re.sub(r'[^\w.\-\[\]]', '_', name)
+
+    # "." and ".." are not file names
+    if not name.strip('.'):
+        name = name.replace('.', '_')
+
+    return name
+
+
+def run_profiled(function, path, kwargs=None):
+    """
+    Call function(**kwargs) under cProfile and save the stats to path (also
+    if the function raises an exception), returns what the function returns
+    """
+    profiler = cProfile.Profile()
+
+    try:
+        return profiler.runcall(function, **(kwargs or {}))
+    finally:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        profiler.dump_stats(str(path))
+
+
+def summary(paths, top=20):
+    """
+    Table with the functions with the highest cumulative time, adding up
+    the stats in all files
+
+    Parameters
+    ----------
+    paths: iterable
+        .prof files (e.g. one per task)
+    top: int, optional
+        Number of functions to include, defaults to 20
+
+    Returns
+    -------
+    Table
+        Function, number of calls, time spent in the function itself
+        (excluding calls to other functions), cumulative time and number of
+        files (tasks) where the function appears
+    """
+    paths = [str(path) for path in paths]
+
+    if not paths:
+        return Table([])
+
+    # number of tasks that called each function
+    tasks = {}
+
+    for path in paths:
+        for function in pstats.Stats(path).stats:
+            tasks[function] = tasks.get(function, 0) + 1
+
+    stats = pstats.Stats(*paths).stats
+    # stats: function -> (primitive calls, calls, total time, cumulative
+    # time, callers)
+    functions = sorted(stats, key=lambda function: stats[function][3],
+                       reverse=True)
+
+    return Table([Row({'Function': pstats.func_std_string(function),
+                       'Calls': stats[function][1],
+                       'Total (s)': stats[function][2],
+                       'Cumulative (s)': stats[function][3],
+                       'Tasks': tasks[function]})
+                  for function in functions[:top]])
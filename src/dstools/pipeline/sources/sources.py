@@ -48,10 +48,23 @@ class Source(abc.ABC):
     def needs_render(self):
         return self.value.needs_render
 
+    @property
+    def raw(self):
+        """The source before rendering (a str)
+        """
+        return self.value.raw
+
     def render(self, params):
         self.value.render(params)
         self._post_render_validation(self.value.value, params)
 
+    def _restore(self, rendered):
+        """
+        Set the rendered value without rendering nor validating, used to
+        restore a source rendered in a previous session
+        """
+        self.value._value = rendered
+
     def __str__(self):
         return str(self.value)
 
@@ -216,6 +229,10 @@ class PythonCallableSource(Source):
     def __str__(self):
         return self._source_as_str
 
+    @property
+    def raw(self):
+        return self._source_as_str
+
     @property
     def doc(self):
         return self._source.__doc__
@@ -26,12 +26,15 @@ the output, hence shoulf not make tasks outdated
 """
 import inspect
 import abc
+import hashlib
 import traceback
 from copy import copy
 import logging
 from datetime import datetime
+from collections.abc import Mapping
 from dstools.pipeline.products import Product, MetaProduct
 from dstools.pipeline.dag import DAG
+from dstools.pipeline.BuildTrace import _span
 from dstools.exceptions import TaskBuildError
 from dstools.pipeline.tasks.TaskGroup import TaskGroup
 from dstools.pipeline.constants import TaskStatus
@@ -40,8 +43,6 @@ from dstools.pipeline.Table import Row
 from dstools.pipeline.sources.sources import Source
 from dstools.util import isiterable
 
-import humanize
-
 
 class Task(abc.ABC):
     """A task represents a unit of work
@@ -54,6 +55,16 @@ class Task(abc.ABC):
         """
         pass
 
+    async def run_async(self):
+        """
+        Runs the task in an event loop, used by the Async executor. Tasks
+        without an async implementation run Task.run in a thread (the default
+        executor of the event loop)
+        """
+        import asyncio
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(None, self._run)
+
     @abc.abstractmethod
     def _init_source(self, source):
         pass
@@ -126,8 +137,21 @@ class Task(abc.ABC):
 
         self.product.task = self
         self.client = None
+        # resource name -> amount used while the task runs (e.g.
+        # {'memory': 8}), executors that run tasks at the same time only
+        # start a task if there are enough resources, see Parallel
+        self.resources = {}
+        # if True, Task.run is profiled even if DAG.build is called with
+        # profile=False, see profiling
+        self.profile = False
+        # where to save the profile in the current build, None if not
+        # profiling
+        self._profile_path = None
 
         self._status = TaskStatus.WaitingRender
+        # True if the task finished in an interrupted build and it is
+        # trusted to be up-to-date, see DAG.build(resume=True)
+        self._resumed = False
         self.build_report = None
         self._on_finish = None
         self._on_failure = None
@@ -189,16 +213,19 @@ class Task(abc.ABC):
         Set with task names of all the dependencies for this task
         (including dependencies of dependencies)
         """
+        lineage = self.dag.ancestors(self.name)
+
+        # upstream dependencies of tasks declared in other DAGs are tracked
+        # by those DAGs
+        for name in list(lineage):
+            task = self.dag[name]
+
+            if (getattr(task, 'dag', self.dag) is not self.dag
+                    and task._lineage):
+                lineage |= task._lineage
+
         # if no upstream deps, there is no lineage
-        if not len(self.upstream):
-            return None
-        else:
-            # retrieve lineage: upstream tasks + lineage from upstream tasks
-            up = list(self.upstream.keys())
-            lineage_up = [up._lineage for up in self.upstream.values() if
-                          up._lineage]
-            lineage = up + [task for lineage in lineage_up for task in lineage]
-            return set(lineage)
+        return lineage or None
 
     @property
     def on_finish(self):
@@ -232,6 +259,64 @@ class Task(abc.ABC):
         dict
             A dictionary with keys 'run' and 'elapsed'
         """
+        run = self._should_run(force)
+        elapsed = 0
+
+        if run:
+            self._started()
+
+            then = datetime.now()
+
+            try:
+                with self._span('run'):
+                    self._run()
+            except Exception:
+                self._run_failed(traceback.format_exc())
+                raise
+
+            elapsed = (datetime.now() - then).total_seconds()
+
+        self._finish_build(run, elapsed)
+
+        return self
+
+    async def build_async(self, force=False):
+        """
+        Same as Task.build but runs the task with Task.run_async, checking
+        and saving metadata may block so it is done in the default executor
+        of the event loop
+        """
+        import asyncio
+        loop = asyncio.get_event_loop()
+
+        run = await loop.run_in_executor(None, self._should_run, force)
+        elapsed = 0
+
+        if run:
+            self._started()
+
+            then = datetime.now()
+
+            try:
+                with self._span('run'):
+                    await self.run_async()
+            except Exception:
+                self._run_failed(traceback.format_exc())
+                raise
+
+            elapsed = (datetime.now() - then).total_seconds()
+
+        await loop.run_in_executor(None, self._finish_build, run, elapsed)
+
+        return self
+
+    def _should_run(self, force):
+        """Check dependencies to determine whether the task has to run
+        """
+        with self._span('check'):
+            return self._check_dependencies(force)
+
+    def _check_dependencies(self, force):
         # TODO: if this is run in a task that has upstream dependencies
         # it will fail with a useless error since self.params does not have
         # upstream yet (added after rendering)
@@ -243,9 +328,11 @@ class Task(abc.ABC):
 
         # do not run unless some of the conditions below match...
         run = False
-        elapsed = 0
 
-        if force:
+        if self._resumed:
+            self._logger.info('Finished in the interrupted build, skipping '
+                              'checks...')
+        elif force:
             self._logger.info('Forcing run, skipping checks...')
             run = True
         else:
@@ -284,32 +371,42 @@ class Task(abc.ABC):
 
                 self._logger.info('Running...')
 
-        if run:
-            self._logger.info(f'Starting execution: {repr(self)}')
+        return run
 
-            then = datetime.now()
+    def _started(self):
+        """Log that the task is about to run
+        """
+        self._logger.info(f'Starting execution: {repr(self)}')
+        self._journal('start')
+
+    def _run_failed(self, tb):
+        """Call the on_failure callback with the traceback of the error
+        """
+        self._journal('fail')
 
+        if self.on_failure:
             try:
-                self.run()
-            except Exception as e:
-                tb = traceback.format_exc()
-
-                if self.on_failure:
-                    try:
-                        self.on_failure(self, tb)
-                    except Exception:
-                        self._logger.exception('Error executing on_failure '
-                                               'callback')
-                raise e
-
-            now = datetime.now()
-            elapsed = (now - then).total_seconds()
+                with self._span('on_failure'):
+                    self.on_failure(self, tb)
+            except Exception:
+                self._logger.exception('Error executing on_failure '
+                                       'callback')
+
+    def _finish_build(self, run, elapsed):
+        """
+        Save metadata and run the on_finish callback (if the task ran),
+        then update status and build report
+        """
+        if run:
             self._logger.info(f'Done. Operation took {elapsed:.1f} seconds')
 
             # update metadata
-            self.product.timestamp = datetime.now().timestamp()
-            self.product.stored_source_code = self.source_code
-            self.product.save_metadata()
+            with self._span('save metadata'):
+                self.product.timestamp = datetime.now().timestamp()
+                self.product.stored_source_code = self.source_code
+                self.product.save_metadata()
+
+            self._product_was_updated()
 
             # TODO: also check that the Products were updated:
             # if they did not exist, they must exist now, if they alredy
@@ -324,10 +421,12 @@ class Task(abc.ABC):
 
             if self.on_finish:
                 try:
-                    if 'client' in inspect.getfullargspec(self.on_finish).args:
-                        self.on_finish(self, client=self.client)
-                    else:
-                        self.on_finish(self)
+                    with self._span('on_finish'):
+                        if 'client' in inspect.getfullargspec(
+                                self.on_finish).args:
+                            self.on_finish(self, client=self.client)
+                        else:
+                            self.on_finish(self)
 
                 except Exception as e:
                     raise TaskBuildError('Exception when running on_finish '
@@ -345,8 +444,45 @@ class Task(abc.ABC):
 
         self.build_report = Row({'name': self.name, 'Ran?': run,
                                  'Elapsed (s)': elapsed, })
+        self._journal('finish')
 
-        return self
+    def _journal(self, event):
+        """Record an event in the DAG's build journal (if it has one)
+        """
+        journal = self.dag._journal
+
+        if journal is not None:
+            key = self._render_key() if event == 'finish' else None
+            journal.record(event, self.name, key=key)
+
+    def _run(self):
+        """Call Task.run, under cProfile if profiling (see profiling)
+        """
+        if self._profile_path is None:
+            self.run()
+        else:
+            from dstools.pipeline.profiling import run_profiled
+            run_profiled(self.run, self._profile_path)
+
+    def _span(self, phase):
+        """
+        Context manager that records how long a phase takes in the DAG's
+        trace (if it has one)
+        """
+        return _span(self.dag._trace, phase, self.name)
+
+    def _record_run(self, start, end, pid, queued=None):
+        """
+        Record that the task ran in another process, queued is when it was
+        sent there (to record how long it waited for a worker)
+        """
+        trace = self.dag._trace
+
+        if trace is not None:
+            if queued is not None:
+                trace.record('wait', self.name, queued, start)
+
+            trace.record('run', self.name, start, end, pid=pid, tid=pid)
 
     def render(self):
         """
@@ -405,6 +541,8 @@ class Task(abc.ABC):
         data['name'] = self.name
 
         if p.timestamp is not None:
+            import humanize
+
             dt = datetime.fromtimestamp(p.timestamp)
             date_h = dt.strftime('%b %d, %y at %H:%M')
             time_h = humanize.naturaltime(dt)
@@ -459,12 +597,123 @@ class Task(abc.ABC):
                           ' check the full traceback above for details'
                           .format(repr(self), self.params)) from e
 
+    def _render_key(self):
+        """
+        Hash of the inputs to Task.render: raw source, params and upstream
+        product identifiers. Upstream tasks must be rendered first
+        """
+        # product and upstream are added to params when rendering
+        params = {k: v for k, v in self.params.items()
+                  if k not in {'product', 'upstream'}}
+        upstream = sorted((name, str(t.product))
+                          for name, t in self.upstream.items())
+
+        key = hashlib.sha256()
+
+        for element in (type(self).__name__, self.source.raw,
+                        repr(sorted(params.items(), key=lambda kv: kv[0])),
+                        repr(upstream)):
+            key.update(str(element).encode('utf-8'))
+            # separator so adjacent elements cannot collide
+            key.update(b'\x00')
+
+        return key.hexdigest()
+
+    def _product_was_updated(self):
+        # this product is up-to-date now, and since it is newer than
+        # the products of downstream tasks, those are outdated
+        self.product._cache_outdated_status(data=False, code=False)
+
+        for t in self._get_downstream():
+            t.product._cache_outdated_status(data=True)
+
+    def _payload(self):
+        """
+        Copy of this task with only what Task.run needs (rendered source,
+        params, products and clients), used to run it in another process.
+        The DAG and the other tasks are not included, so the cost of
+        sending it does not depend on the size of the DAG. Checking
+        dependencies and saving metadata must be done with the original task
+        (see Task._should_run and Task._finish_build)
+        """
+        task = copy(self)
+        task.dag = _DetachedDAG(self.dag)
+        task._product = _detach(self.product, task)
+        # callbacks run with the original task
+        task._on_finish = None
+        task._on_failure = None
+
+        task._params = copy(self.params)
+
+        if 'product' in task._params:
+            task._params['product'] = task._product
+
+        # upstream products only use their task to get the DAG clients
+        if 'upstream' in task._params:
+            task._params['upstream'] = Upstream(
+                {name: _detach(product, task) for name, product
+                 in self.params['upstream'].items()})
+
+        return task
+
+    def _build_reasons(self):
+        """
+        List with the reasons why Task.build would run this task (empty if
+        it would not run), uses the same checks as Task.build. Outdated
+        status should be evaluated first (see DAG._evaluate_outdated_status)
+        """
+        if not self.product.exists():
+            return ['Missing product']
+
+        reasons = []
+
+        if self.product._outdated_data_dependencies():
+            reasons.append('Outdated data')
+
+        if self.product._outdated_code_dependency():
+            reasons.append('Outdated code')
+
+        return reasons
+
+    def _plan(self):
+        """
+        Rendered state of this task (see DAG.save_plan), must be called
+        after rendering
+        """
+        return {'key': self._render_key(),
+                'source': (str(self.source) if self.source.needs_render
+                           else None),
+                'product': str(self.product),
+                'upstream': sorted(self.upstream)}
+
+    def _render_from_plan(self, plan):
+        """
+        Restore the rendered state saved by Task._plan, only the product is
+        rendered, rendering and validating the source is skipped. Returns
+        False if the inputs changed since the plan was saved, in such case
+        the task must be rendered. Upstream tasks must be rendered first
+        """
+        if (plan['upstream'] != sorted(self.upstream)
+                or plan['key'] != self._render_key()):
+            return False
+
+        self._render_product()
+
+        if str(self.product) != plan['product']:
+            return False
+
+        self.params['product'] = self.product
+
+        if self.source.needs_render:
+            self.source._restore(plan['source'])
+
+        self._status = (TaskStatus.WaitingExecution if not self.upstream
+                        else TaskStatus.WaitingUpstream)
+
+        return True
+
     def _get_downstream(self):
-        downstream = []
-        for t in self.dag.values():
-            if self in t.upstream.values():
-                downstream.append(t)
-        return downstream
+        return self.dag._get_downstream(self.name)
 
     def _update_status(self):
         if self._status == TaskStatus.WaitingUpstream:
@@ -515,3 +764,36 @@ class Task(abc.ABC):
         self.__dict__.update(state)
         self._logger = logging.getLogger('{}.{}'.format(__name__,
                                                         type(self).__name__))
+
+
+class _DetachedDAG:
+    """
+    Stands in for the DAG in a task payload (see Task._payload), only keeps
+    what tasks and products use when running
+    """
+
+    def __init__(self, dag):
+        self.name = dag.name
+        self.clients = dag.clients
+        self._executor = dag._executor
+        # events and spans are recorded by the original task
+        self._journal = None
+        self._trace = None
+
+
+def _detach(product, task):
+    """Copy of a product that belongs to task instead of its original task
+    """
+    if isinstance(product, MetaProduct):
+        products = product.products.products
+
+        if isinstance(products, Mapping):
+            products = {key: _detach(p, task) for key, p in products.items()}
+        else:
+            products = [_detach(p, task) for p in products]
+
+        return MetaProduct(products)
+
+    detached = copy(product)
+    detached.task = task
+    return detached
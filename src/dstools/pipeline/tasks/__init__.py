@@ -1,6 +1,6 @@
 from dstools.pipeline.tasks.tasks import (BashCommand, PythonCallable,
                                           ShellScript, DownloadFromURL,
-                                          Link, Input)
+                                          Link, Input, FanOut)
 from dstools.pipeline.tasks.Task import Task
 from dstools.pipeline.tasks.TaskFactory import TaskFactory
 from dstools.pipeline.tasks.sql import (SQLScript, SQLDump, SQLTransfer,
@@ -10,4 +10,4 @@ from dstools.pipeline.tasks.notebook import NotebookRunner
 __all__ = ['BashCommand', 'PythonCallable', 'ShellScript', 'TaskFactory',
            'Task', 'SQLScript', 'SQLDump', 'SQLTransfer', 'SQLUpload',
            'PostgresCopy', 'NotebookRunner', 'DownloadFromURL',
-           'Link', 'Input']
+           'Link', 'Input', 'FanOut']
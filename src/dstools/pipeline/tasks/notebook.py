@@ -2,41 +2,21 @@ from copy import copy
 from tempfile import mktemp
 from pathlib import Path
 
-try:
-    import papermill as pm
-except ImportError:
-    pm = None
-
-try:
-    import jupytext
-except ImportError:
-    jupytext = None
-
-try:
-    import nbformat
-except ImportError:
-    nbformat = None
-
-try:
-    import nbconvert
-except ImportError:
-    nbconvert = None
-
-try:
-    from jupyter_client import kernelspec
-except ImportError:
-    kernelspec = None
-
-
 from dstools.exceptions import TaskBuildError, SourceInitializationError
 from dstools.pipeline.sources import GenericSource
 from dstools.pipeline.products import File, MetaProduct
 from dstools.pipeline.tasks.Task import Task
 
+# papermill, jupytext, nbformat, nbconvert and jupyter_client are imported
+# when used, they take a long time to import
+
 
 def _to_ipynb(source, extension, kernelspec_name=None):
     """Convert to jupyter notebook via jupytext
     """
+    import jupytext
+    import nbformat
+
     nb = jupytext.reads(source, fmt={'extension': extension})
 
     # tag the first cell as "parameters" for papermill to inject them
@@ -49,6 +29,7 @@ def _to_ipynb(source, extension, kernelspec_name=None):
                          'a kernelspec by name')
 
     if kernelspec_name is not None:
+        from jupyter_client import kernelspec
         k = kernelspec.get_kernel_spec('python3')
 
         nb.metadata.kernelspec = {
@@ -64,6 +45,9 @@ def _to_ipynb(source, extension, kernelspec_name=None):
 
 
 def _from_ipynb(path_to_nb, extension, nbconvert_exporter_name):
+    import nbconvert
+    import nbformat
+
     if nbconvert_exporter_name is not None:
         exporter = nbconvert.get_exporter(nbconvert_exporter_name)
     else:
@@ -155,6 +139,8 @@ class NotebookRunner(Task):
             params['upstream'] = {k: n._to_json_serializable() for k, n
                                   in params['upstream'].items()}
 
+        import papermill as pm
+
         pm.execute_notebook(path_to_in, path_to_out,
                             parameters=params,
                             **self.papermill_params)
@@ -9,8 +9,6 @@ from dstools.pipeline.sources import (SQLScriptSource,
 from dstools.pipeline.products import File, PostgresRelation, SQLiteRelation
 from dstools.pipeline import io
 
-import pandas as pd
-
 
 class SQLScript(Task):
     """
@@ -34,6 +32,9 @@ class SQLScript(Task):
     def run(self):
         return self.client.execute(self.source_code)
 
+    async def run_async(self):
+        await self.client.execute_async(self.source_code)
+
     def _init_source(self, source):
         return SQLScriptSource(source)
 
@@ -149,6 +150,8 @@ class SQLTransfer(Task):
         source_code = str(self.source)
         product = self.params['product']
 
+        import pandas as pd
+
         # read from source_code, use connection from the Task
         self._logger.info('Fetching data...')
         dfs = pd.read_sql_query(source_code, self.client.engine,
@@ -198,6 +201,8 @@ class SQLUpload(Task):
     def run(self):
         product = self.params['product']
 
+        import pandas as pd
+
         self._logger.info('Reading data...')
         df = pd.read_parquet(str(self.source))
         self._logger.info('Done reading data...')
@@ -247,6 +252,8 @@ class PostgresCopy(Task):
 
     def run(self):
         product = self.params['product']
+
+        import pandas as pd
         df = pd.read_parquet(str(self.source))
 
         # create the table
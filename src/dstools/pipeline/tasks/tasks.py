@@ -5,14 +5,18 @@ A Task is a unit of work that produces a persistent change (Product)
 such as a bash or a SQL script
 """
 import types
-from urllib import request
-from multiprocessing import Pool
 import shlex
 import subprocess
 from subprocess import CalledProcessError
 import logging
+from pathlib import Path
 from dstools.exceptions import SourceInitializationError
 from dstools.pipeline.tasks.Task import Task
+from dstools.pipeline.dag import DAG
+from dstools.pipeline.products import File
+from dstools.pipeline.util import safe_remove
+from dstools.pipeline.profiling import run_profiled, file_name
+from dstools.pipeline.clients.shell import run_async
 from dstools.pipeline.sources import (PythonCallableSource,
                                       GenericSource)
 
@@ -44,12 +48,18 @@ class BashCommand(Task):
         return source
 
     def run(self):
-        source_code = (shlex.split(self.source_code) if self.split_source_code
-                       else self.source_code)
+        res = subprocess.run(self._command(), **self.subprocess_run_kwargs)
+        self._check_result(res)
 
-        res = subprocess.run(source_code,
-                             **self.subprocess_run_kwargs)
+    async def run_async(self):
+        res = await run_async(self._command(), **self.subprocess_run_kwargs)
+        self._check_result(res)
 
+    def _command(self):
+        return (shlex.split(self.source_code) if self.split_source_code
+                else self.source_code)
+
+    def _check_result(self, res):
         if res.returncode != 0:
             # log source code without expanded params
             self._logger.info(f'{self.source_code} returned stdout: '
@@ -71,9 +81,14 @@ class PythonCallable(Task):
         return PythonCallableSource(source)
 
     def run(self):
+        # when profiling, the function is profiled in the process that
+        # calls it
         if self.dag._executor.TASKS_CAN_CREATE_CHILD_PROCESSES:
-            p = Pool()
-            res = p.apply_async(func=self.source._source, kwds=self.params)
+            # the pool is shared by all tasks in the dag, see WorkerPool
+            res = self.dag.worker_pool.apply_async(func=self.source._source,
+                                                   kwds=self.params,
+                                                   profile=self._profile_path)
+            res.wait()
 
             # calling this make sure we catch the exception, from the docs:
             # Return the result when it arrives. If timeout is not None and
@@ -84,12 +99,179 @@ class PythonCallable(Task):
             # https://docs.python.org/3/library/multiprocessing.html#multiprocessing.pool.AsyncResult.get
             if self.dag._executor.STOP_ON_EXCEPTION:
                 res.get()
-
-            p.close()
-            p.join()
+        elif self._profile_path is not None:
+            run_profiled(self.source._source, self._profile_path,
+                         self.params)
         else:
             self.source._source(**self.params)
 
+    def _run(self):
+        # run profiles the function itself
+        self.run()
+
+
+class FanOut(Task):
+    """
+    Runs a Python callable once per partition of its upstream product,
+    partitions are listed when the upstream dependencies finish, so their
+    number does not have to be known when declaring the DAG (e.g. the files
+    written by SQLDump with chunksize). Executors that run tasks at the same
+    time (Parallel, Hybrid, Async, Distributed) build each partition as a
+    separate task, the Serial executor builds them one after another. Once
+    all partitions finish, the gather function runs
+
+    Parameters
+    ----------
+    source: callable
+        Called once per partition with upstream, product (a File in the
+        product folder, named after the partition), partition and params,
+        must create product
+    product: File
+        Folder where the products of the partitions are saved, it is created
+        again each time the task runs
+    dag: DAG
+        The DAG holding this task
+    name: str
+        A name for this task
+    params: dict, optional
+        Extra parameters passed to source and gather
+    partitions: callable, optional
+        Called with upstream once the upstream dependencies finish, must
+        return a list with the partition names. Defaults to the names of the
+        files in the folder of the upstream product (the task must have only
+        one upstream dependency)
+    gather: callable, optional
+        Called with product, partitions and params after all partitions
+        finish (e.g. to concatenate them)
+
+    Notes
+    -----
+    Metadata is only saved for the whole folder, if the task has to run,
+    all partitions run. Partitions use the same resources as this task
+    (see Task.resources)
+    """
+    PRODUCT_CLASSES_ALLOWED = (File, )
+
+    def __init__(self, source, product, dag, name, params=None,
+                 partitions=None, gather=None):
+        super().__init__(source, product, dag, name, params)
+        self.partitions = partitions
+        self.gather = gather
+        # set by the executor when it builds the partitions as separate
+        # tasks, run only has to gather
+        self._expanded = False
+        self._partition_names = None
+
+    def _init_source(self, source):
+        return PythonCallableSource(source)
+
+    def _should_run(self, force):
+        # partitions already ran, only gather is left
+        if self._expanded:
+            return True
+
+        return super()._should_run(force)
+
+    def run(self):
+        if not self._expanded:
+            for task in self._expand():
+                task.build()
+
+        if self.gather is not None:
+            self.gather(partitions=list(self._partition_names),
+                        **self._params_for('product'))
+
+    def _params_for(self, *keys):
+        """Params passed to the callables, keys are only kept if present
+        """
+        params = {k: v for k, v in self.params.items()
+                  if k not in {'product', 'upstream'}}
+
+        for key in keys:
+            if key in self.params:
+                params[key] = self.params[key]
+
+        return params
+
+    def _list_partitions(self):
+        upstream = self.params.get('upstream')
+
+        if self.partitions is not None:
+            return list(self.partitions(upstream))
+
+        if upstream is None or len(upstream) != 1:
+            raise ValueError('FanOut task "{}" must have exactly one '
+                             'upstream dependency to list partitions from '
+                             'its product, pass a partitions function '
+                             'otherwise'.format(self.name))
+
+        folder = Path(str(upstream.first))
+
+        if not folder.is_dir():
+            raise ValueError('Cannot list partitions for FanOut task "{}", '
+                             'the upstream product "{}" is not a folder'
+                             .format(self.name, folder))
+
+        return sorted(path.name for path in folder.iterdir()
+                      if not path.name.startswith('.'))
+
+    def _expand(self):
+        """
+        List partitions and create one rendered task for each one, must be
+        called after the upstream dependencies finish. The tasks live in a
+        separate DAG, so they are not part of this task's DAG
+        """
+        # helpers imports this module
+        from dstools.pipeline.helpers import PartitionedFile
+
+        self._partition_names = self._list_partitions()
+
+        if len(set(self._partition_names)) != len(self._partition_names):
+            raise ValueError('FanOut task "{}" got repeated partition '
+                             'names: {}'.format(self.name,
+                                                self._partition_names))
+
+        folder = Path(str(self.product))
+
+        if folder.exists():
+            safe_remove(folder)
+
+        folder.mkdir(parents=True)
+
+        dag = DAG(name='{} ({})'.format(self.dag.name, self.name),
+                  clients=self.dag.clients, executor=self.dag._executor,
+                  worker_pool=self.dag.worker_pool, trace=self.dag._trace)
+        tasks = []
+
+        for partition in self._partition_names:
+            task = _FanOutPartition(
+                self.source._source, PartitionedFile(folder / partition),
+                dag, name='{}[{}]'.format(self.name, partition),
+                params=dict(self._params_for('upstream'),
+                            partition=partition))
+            task.resources = dict(self.resources)
+
+            if self._profile_path is not None:
+                task._profile_path = self._profile_path.with_name(
+                    '{}.prof'.format(file_name(task.name)))
+
+            task.render()
+            tasks.append(task)
+
+        self._logger.info('FanOut task "%s" has %i partitions', self.name,
+                          len(tasks))
+
+        return tasks
+
+
+class _FanOutPartition(PythonCallable):
+    """One partition of a FanOut task, it always runs (FanOut checks
+    dependencies for all of them)
+    """
+
+    def _should_run(self, force):
+        return True
+
 
 class ShellScript(Task):
     """A task to run a shell script
@@ -119,9 +301,13 @@ class ShellScript(Task):
     def run(self):
         self.client.execute(str(self.source))
 
+    async def run_async(self):
+        await self.client.execute_async(str(self.source))
+
 
 class DownloadFromURL(Task):
     def run(self):
+        from urllib import request
         request.urlretrieve(str(self.source), filename=str(self.product))
 
     def _init_source(self, source):
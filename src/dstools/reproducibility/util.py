@@ -1,16 +1,12 @@
-from pydoc import locate
 from shlex import quote
 import sys
 import subprocess
 import itertools
 import logging
-import logging.config
 import datetime
 import hashlib
 from pathlib import Path
 
-import yaml
-
 from dstools.env import Env
 from dstools.util import ensure_iterator, _unwrap_if_single_element
 
@@ -96,6 +92,9 @@ def setup_logger(file, level=None):
     file: str
         As returned from __file__
     """
+    import logging.config
+    import yaml
+
     project_dir = Env().path.home
     path_to_logger_cfg = str(Path(project_dir, 'config', 'logger.yaml'))
 
@@ -142,6 +141,7 @@ def get_version(package_name):
     NON_EDITABLE = True if 'site-packages/' in installation_path else False
 
     if NON_EDITABLE:
+        from pydoc import locate
         return locate('{package}.__version__'
                       .format(package_name=package_name))
     else:
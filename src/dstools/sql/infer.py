@@ -2,7 +2,6 @@
 Analyzes SQL scripts to infer performed actions
 """
 import warnings
-import sqlparse
 
 
 class ParsedSQLRelation:
@@ -54,6 +53,8 @@ def parse_statement(statement):
 
 
 def created_relations(sql):
+    import sqlparse
+
     sql = sqlparse.format(sql, keyword_case='lower',
                           identifier_case='lower',
                           strip_comments=True)
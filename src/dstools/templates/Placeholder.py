@@ -3,10 +3,10 @@ from pathlib import Path
 
 from dstools.exceptions import RenderError
 
-from numpydoc.docscrape import NumpyDocString
-import jinja2
-from jinja2 import (Environment, meta, Template, UndefinedError,
-                    FileSystemLoader, PackageLoader)
+# jinja2's default syntax (jinja2.defaults), jinja2 is imported the first
+# time a template is compiled
+VARIABLE_START_STRING, VARIABLE_END_STRING = '{{', '}}'
+BLOCK_START_STRING, BLOCK_END_STRING = '{%', '%}'
 
 
 class Placeholder:
@@ -25,18 +25,24 @@ class Placeholder:
         self._logger = logging.getLogger('{}.{}'.format(__name__,
                                                         type(self).__name__))
 
+        # templates created from str or pathlib.Path are compiled the
+        # first time they are needed (see the template property), tasks
+        # restored from a plan (DAG.load_plan) never need them
         if isinstance(source, Path):
             self._path = source
             self._raw = source.read_text()
-            self._template = Template(self._raw,
-                                      undefined=jinja2.StrictUndefined)
+            self._template = None
         elif isinstance(source, str):
             self._path = None
             self._raw = source
-            self._template = Template(self._raw,
-                                      undefined=jinja2.StrictUndefined)
+            self._template = None
+        elif isinstance(source, Placeholder):
+            self._path = source.path
+            self._raw = source.raw
+            self._template = source._template
+        elif _is_template(source):
+            import jinja2
 
-        elif isinstance(source, Template):
             path = Path(source.filename)
 
             if source.environment.undefined != jinja2.StrictUndefined:
@@ -61,10 +67,6 @@ class Placeholder:
             self._path = path
             self._raw = path.read_text()
             self._template = source
-        elif isinstance(source, Placeholder):
-            self._path = source.path
-            self._raw = source.raw
-            self._template = source.template
         else:
             raise TypeError('{} must be initialized with a Template, '
                             'Placeholder, pathlib.Path or str, '
@@ -72,15 +74,18 @@ class Placeholder:
                             .format(type(self).__name__,
                                     type(source).__name__))
 
-        self.declared = self._get_declared()
+        self._declared = None
 
         self.needs_render = self._needs_render()
 
         self._value = None if self.needs_render else self.raw
 
-        loader = self._template.environment.loader
+        loader = (None if self._template is None
+                  else self._template.environment.loader)
 
         if loader is not None:
+            from jinja2 import FileSystemLoader, PackageLoader
+
             if isinstance(loader, FileSystemLoader):
                 self.loader_init = {'class': type(loader).__name__,
                                     'kwargs':
@@ -115,8 +120,22 @@ class Placeholder:
     def template(self):
         """jinja2.Template object
         """
+        if self._template is None:
+            import jinja2
+            self._template = jinja2.Template(self._raw,
+                                             undefined=jinja2.StrictUndefined)
+
         return self._template
 
+    @property
+    def declared(self):
+        """Set with the variables used in the template
+        """
+        if self._declared is None:
+            self._declared = self._get_declared()
+
+        return self._declared
+
     @property
     def raw(self):
         """A string with the raw jinja2.Template contents
@@ -139,14 +158,20 @@ class Placeholder:
         Returns true if the template is a literal and does not need any
         parameters to render
         """
-        env = self.template.environment
+        if self._template is None:
+            # not compiled yet (created from a str or pathlib.Path), these
+            # use the default syntax
+            variable = VARIABLE_START_STRING, VARIABLE_END_STRING
+            block = BLOCK_START_STRING, BLOCK_END_STRING
+        else:
+            env = self._template.environment
+            variable = env.variable_start_string, env.variable_end_string
+            block = env.block_start_string, env.block_end_string
 
         # check if the template has the variable or block start string
         # is there any better way of checking this?
-        needs_variables = (env.variable_start_string in self.raw
-                           and env.variable_end_string in self.raw)
-        needs_blocks = (env.block_start_string in self.raw
-                        and env.block_end_string in self.raw)
+        needs_variables = variable[0] in self.raw and variable[1] in self.raw
+        needs_blocks = block[0] in self.raw and block[1] in self.raw
 
         return needs_variables or needs_blocks
 
@@ -160,6 +185,8 @@ class Placeholder:
         if self.raw is None:
             raise ValueError('Cannot find declared values is raw is None')
 
+        from jinja2 import Environment, meta
+
         env = Environment()
 
         # this accepts None and does not break!
@@ -171,6 +198,8 @@ class Placeholder:
         """Prints some diagnostics
         """
         found = self.declared
+        from numpydoc.docscrape import NumpyDocString
+
         docstring_np = NumpyDocString(self.docstring())
         documented = set([p[0] for p in docstring_np['Parameters']])
 
@@ -185,6 +214,8 @@ class Placeholder:
     def render(self, params, optional=None):
         """
         """
+        from jinja2 import UndefinedError
+
         optional = optional or {}
         optional = set(optional)
 
@@ -239,13 +270,16 @@ class Placeholder:
                                                         type(self).__name__))
 
         if self.loader_init is None:
-            self._template = Template(self.raw,
-                                      undefined=jinja2.StrictUndefined)
+            # compiled on demand
+            self._template = None
         # re-construct the Templates environment, otherwise there could
         # be errors when using copy or pickling (the copied or unpickled
         # object wont have access to the environment which can break macros
         # and other thigns)
         else:
+            import jinja2
+            from jinja2 import Environment, FileSystemLoader, PackageLoader
+
             if self.loader_init['class'] == 'FileSystemLoader':
                 loader = FileSystemLoader(**self.loader_init['kwargs'])
             elif self.loader_init['class'] == 'PackageLoader':
@@ -259,6 +293,13 @@ class Placeholder:
             self._template = env.from_string(self.raw)
 
 
+def _is_template(source):
+    # without importing jinja2, a Template must come from it anyway
+    return any(cls.__module__.startswith('jinja2')
+               and cls.__name__ == 'Template'
+               for cls in type(source).__mro__)
+
+
 class SQLRelationPlaceholder:
     """
     An identifier that represents a database relation (table or view), used
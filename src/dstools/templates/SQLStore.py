@@ -3,9 +3,6 @@ This module provides subclasses of jinja2 for better integration with SQL
 """
 from dstools.templates.Placeholder import Placeholder
 
-import jinja2
-from jinja2 import Environment, PackageLoader, FileSystemLoader
-
 
 class SQLStore:
     """
@@ -22,6 +19,9 @@ class SQLStore:
     """
 
     def __init__(self, module, path):
+        import jinja2
+        from jinja2 import Environment, PackageLoader, FileSystemLoader
+
         if module is None:
             loader = FileSystemLoader(path)
         else:
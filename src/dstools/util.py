@@ -1,7 +1,5 @@
 import pickle
 from pathlib import Path
-import yaml
-from pydoc import locate
 import re
 
 import collections
@@ -149,6 +147,7 @@ def class_name(obj):
 
 
 def instantiate_from_class_string(class_str, kwargs):
+    from pydoc import locate
     return locate(class_str)(**kwargs)
 
 
@@ -186,6 +185,7 @@ def save(obj, path):
         np.save(str(path), obj)
 
     elif path.suffix == '.yaml':
+        import yaml
 
         with open(str(path), 'w') as f:
             yaml.dump(obj, f)
@@ -206,6 +206,7 @@ def load(path):
         return np.load(str(path))
 
     elif path.suffix == '.yaml':
+        import yaml
 
         with open(str(path), 'r') as f:
             return yaml.load(f)
@@ -0,0 +1,107 @@
+import pytest
+
+from dstools.pipeline.TaskGraph import TaskGraph
+from dstools.pipeline.dag import DAG
+from dstools.pipeline.tasks import BashCommand
+from dstools.pipeline.products import File
+
+
+def make_graph(edges, nodes=None):
+    g = TaskGraph()
+
+    for name in nodes or sorted({n for edge in edges for n in edge}):
+        g.add_node(name, 'task_' + name)
+
+    for a, b in edges:
+        g.add_edge(a, b)
+
+    return g
+
+
+def test_predecessors_and_successors_keep_insertion_order():
+    g = make_graph([('b', 'c'), ('a', 'c'), ('c', 'd')])
+
+    assert g.predecessors('c') == ['b', 'a']
+    assert g.successors('c') == ['d']
+    assert g['c'] == 'task_c'
+
+
+def test_adding_an_edge_twice_does_not_duplicate_it():
+    g = make_graph([('a', 'b'), ('a', 'b')])
+    assert g.predecessors('b') == ['a']
+
+
+def test_topological_order():
+    g = make_graph([('a', 'b'), ('b', 'd'), ('a', 'c'), ('c', 'd')])
+    order = [g.name(i) for i in g.topological_order()]
+
+    assert order.index('a') < order.index('b') < order.index('d')
+    assert order.index('a') < order.index('c') < order.index('d')
+
+
+def test_sub_topological_order():
+    # d is added first so index order is not a valid topological order
+    g = make_graph([('a', 'b'), ('b', 'd'), ('c', 'd')],
+                   nodes=['d', 'c', 'b', 'a'])
+    indexes = [g.index(name) for name in ['d', 'b', 'a']]
+
+    assert [g.name(i) for i in g.sub_topological_order(indexes)] == \
+        ['a', 'b', 'd']
+
+
+def test_topological_order_is_cached_until_graph_changes():
+    g = make_graph([('a', 'b')])
+    order = g.topological_order()
+
+    assert g.topological_order() is order
+
+    g.add_node('c', 'task_c')
+    g.add_edge('b', 'c')
+
+    assert [g.name(i) for i in g.topological_order()] == ['a', 'b', 'c']
+
+
+def test_remove_node():
+    g = make_graph([('a', 'b'), ('b', 'c')])
+    version = g.version
+
+    assert g.remove_node('b') == 'task_b'
+    assert 'b' not in g
+    assert list(g) == ['a', 'c']
+    assert g.successors('a') == []
+    assert g.predecessors('c') == []
+    assert g.version > version
+    # indexes are not re-used
+    assert g.index('c') == 2
+
+
+def test_cycles_raise_an_error():
+    g = make_graph([('a', 'b'), ('b', 'c'), ('c', 'a')])
+
+    with pytest.raises(ValueError):
+        g.topological_order()
+
+
+def test_topological_order_on_a_long_chain():
+    n = 100000
+    g = TaskGraph()
+    g.add_node(0, None)
+
+    for i in range(1, n):
+        g.add_node(i, None)
+        g.add_edge(i - 1, i)
+
+    assert g.topological_order() == list(range(n))
+
+
+def test_dag_get_downstream():
+    dag = DAG()
+    ta = BashCommand('touch {{product}}', File('a'), dag, 'ta')
+    tb = BashCommand('touch {{product}}', File('b'), dag, 'tb')
+    tc = BashCommand('touch {{product}}', File('c'), dag, 'tc')
+
+    ta >> tb
+    ta >> tc
+
+    assert ta._get_downstream() == [tb, tc]
+    assert tb._get_downstream() == []
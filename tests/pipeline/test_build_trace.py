@@ -0,0 +1,107 @@
+import os
+import json
+from pathlib import Path
+
+import pytest
+
+from dstools.exceptions import TaskBuildError
+from dstools.pipeline import DAG
+from dstools.pipeline.BuildTrace import BuildTrace
+from dstools.pipeline.products import File
+from dstools.pipeline.tasks import BashCommand
+from dstools.pipeline.executors import Parallel
+
+
+def on_finish(task):
+    pass
+
+
+def make_dag(executor='serial'):
+    dag = DAG(executor=executor, trace='trace.json')
+    a = BashCommand('touch {{product}}', File('a.txt'), dag, name='a')
+    b = BashCommand('cat {{upstream["a"]}} > {{product}}', File('b.txt'),
+                    dag, name='b')
+    a >> b
+    b.on_finish = on_finish
+    return dag
+
+
+def phases(trace, task_name):
+    return [span['phase'] for span in trace.spans
+            if span['task'] == task_name]
+
+
+def test_records_each_phase(tmp_directory):
+    dag = make_dag()
+    dag.build()
+
+    assert phases(dag._trace, None) == ['fetch metadata']
+    assert phases(dag._trace, 'b') == ['render', 'check data', 'check code',
+                                       'check', 'run', 'save metadata',
+                                       'on_finish']
+    assert {span['pid'] for span in dag._trace.spans} == {os.getpid()}
+    assert all(span['end'] >= span['start'] for span in dag._trace.spans)
+
+
+def test_records_runs_in_worker_processes(tmp_directory):
+    dag = make_dag(Parallel(processes=2))
+    dag.build()
+
+    runs = [span for span in dag._trace.spans if span['phase'] == 'run']
+    waits = [span for span in dag._trace.spans if span['phase'] == 'wait']
+
+    assert sorted(span['task'] for span in runs) == ['a', 'b']
+    assert sorted(span['task'] for span in waits) == ['a', 'b']
+    assert all(span['pid'] != os.getpid() for span in runs)
+    # metadata is saved by the main process
+    assert {span['pid'] for span in dag._trace.spans
+            if span['phase'] == 'save metadata'} == {os.getpid()}
+    assert set(dag._trace.busy()) == {(span['pid'], span['tid'])
+                                      for span in runs}
+
+
+def test_saves_chrome_trace(tmp_directory):
+    make_dag().build()
+
+    trace = json.loads(Path('trace.json').read_text())
+    events = [e for e in trace['traceEvents'] if e['ph'] == 'X']
+
+    assert 'b: run' in [e['name'] for e in events]
+    assert min(e['ts'] for e in events) == 0
+    assert all(e['dur'] >= 0 for e in events)
+    assert [e['args']['name'] for e in trace['traceEvents']
+            if e['ph'] == 'M'] == ['main']
+
+
+def test_trace_is_cleared_on_each_build(tmp_directory):
+    dag = make_dag()
+    dag.build()
+    dag.build()
+
+    # second build: tasks are up-to-date
+    assert 'run' not in phases(dag._trace, 'b')
+
+
+def test_saves_trace_if_build_fails(tmp_directory):
+    dag = DAG(executor='parallel', trace='trace.json')
+    BashCommand('exit 1; touch {{product}}', File('a.txt'), dag, name='a')
+
+    with pytest.raises(TaskBuildError):
+        dag.build()
+
+    trace = json.loads(Path('trace.json').read_text())
+    assert 'a: run' in [e['name'] for e in trace['traceEvents']]
+
+
+def test_totals():
+    trace = BuildTrace()
+    trace.record('run', 'a', 0, 2)
+    trace.record('run', 'b', 1, 2)
+    trace.record('check', 'a', 0, 0.5)
+
+    assert trace.totals() == {'run': 3, 'check': 0.5}
+
+
+def test_save_requires_path():
+    with pytest.raises(ValueError):
+        BuildTrace().save()
@@ -6,6 +6,7 @@ import pytest
 from dstools.pipeline.dag import DAG
 from dstools.pipeline.tasks import BashCommand, PythonCallable, SQLDump
 from dstools.pipeline.products import File
+from dstools.pipeline.constants import TaskStatus
 
 
 # can test this since this uses dag.plot(), which needs dot for plotting
@@ -162,3 +163,228 @@ def test_partial_build(tmp_directory):
 
     assert {row['name'] for row in table} == {'ta', 'tb'}
     assert all(row['Ran?'] for row in table)
+
+
+def test_partial_build_does_not_modify_the_dag(tmp_directory):
+    dag = DAG('dag')
+
+    code = 'cat {{upstream.first}} >> {{product}}'
+    ta = BashCommand('echo "hi" >> {{product}}', File('a.txt'), dag, 'ta')
+    tb = BashCommand(code, File('b.txt'), dag, 'tb')
+    tc = BashCommand(code, File('c.txt'), dag, 'tc')
+    td = BashCommand(code, File('d.txt'), dag, 'td')
+
+    ta >> tb >> tc
+    ta >> td
+
+    dag.build_partially('tc')
+
+    assert set(dag) == {'ta', 'tb', 'tc', 'td'}
+    assert dag.ancestors('tc') == {'ta', 'tb'}
+    # tasks outside the lineage are not rendered
+    assert tc._status == TaskStatus.WaitingRender
+    assert td._status == TaskStatus.WaitingRender
+
+
+def test_view(tmp_directory):
+    dag = DAG('dag')
+
+    code = 'cat {{upstream.first}} >> {{product}}'
+    ta = BashCommand('echo "hi" >> {{product}}', File('a.txt'), dag, 'ta')
+    tb = BashCommand(code, File('b.txt'), dag, 'tb')
+    tc = BashCommand(code, File('c.txt'), dag, 'tc')
+    td = BashCommand(code, File('d.txt'), dag, 'td')
+
+    ta >> tb >> tc
+    ta >> td
+
+    view = dag.view(['tb', 'td'])
+
+    assert list(view) == ['ta', 'tb', 'td']
+    assert view['tb'] is tb
+
+    with pytest.raises(KeyError):
+        view['tc']
+
+    view.build()
+
+    assert Path('b.txt').exists()
+    assert Path('d.txt').exists()
+    assert not Path('c.txt').exists()
+
+    # the render cache is shared with the dag
+    dag.render()
+    assert tb._status == TaskStatus.Executed
+
+    dag.pop('tc')
+
+    with pytest.raises(ValueError):
+        view.build()
+
+
+def test_ancestors_and_descendants():
+    dag = DAG('dag')
+
+    code = 'cat {{upstream.first}} >> {{product}}'
+    ta = BashCommand('touch {{product}}', File('a.txt'), dag, 'ta')
+    tb = BashCommand(code, File('b.txt'), dag, 'tb')
+    tc = BashCommand(code, File('c.txt'), dag, 'tc')
+    td = BashCommand(code, File('d.txt'), dag, 'td')
+    te = BashCommand(code, File('e.txt'), dag, 'te')
+
+    ta >> tb >> tc
+    tb >> td >> te
+
+    assert dag.ancestors('ta') == set()
+    assert dag.ancestors('tc') == {'ta', 'tb'}
+    assert dag.ancestors('te') == {'ta', 'tb', 'td'}
+    assert dag.descendants('tb') == {'tc', 'td', 'te'}
+    assert dag.descendants('te') == set()
+
+    # index must be updated when the graph changes
+    tf = BashCommand(code, File('f.txt'), dag, 'tf')
+    tc >> tf
+
+    assert dag.ancestors('tf') == {'ta', 'tb', 'tc'}
+    assert dag.descendants('ta') == {'tb', 'tc', 'td', 'te', 'tf'}
+
+
+def test_lineage_on_a_deep_diamond_graph():
+    dag = DAG('dag')
+
+    def touch(name):
+        return BashCommand('touch {{product}}', File(name), dag, name)
+
+    previous = touch('root')
+
+    # each level is a diamond, the number of paths to the root doubles
+    # on every level
+    for i in range(200):
+        left, right, bottom = (touch('l%i' % i), touch('r%i' % i),
+                               touch('b%i' % i))
+        previous >> left >> bottom
+        previous >> right >> bottom
+        previous = bottom
+
+    assert len(previous._lineage) == 600
+    assert len(dag.descendants('root')) == 600
+
+
+def _make_plan_dag(durations, tb_code='echo b'):
+    dag = DAG('dag', durations=durations)
+
+    code = 'cat {{upstream.first}} >> {{product}}'
+    ta = BashCommand('echo a >> {{product}}', File('a.txt'), dag, 'ta')
+    tb = BashCommand(code + ' && ' + tb_code, File('b.txt'), dag, 'tb')
+    tc = BashCommand(code, File('c.txt'), dag, 'tc')
+    BashCommand('echo d >> {{product}}', File('d.txt'), dag, 'td')
+
+    ta >> tb >> tc
+
+    return dag
+
+
+def test_plan_build(tmp_directory):
+    dag = _make_plan_dag('durations.json')
+
+    plan = dag.plan_build()
+
+    assert plan.to_run == ['ta', 'td', 'tb', 'tc']
+    assert {row['Reason'] for row in plan} == {'Missing product'}
+    assert plan.estimated_time == 0
+    assert plan.without_history == ['ta', 'td', 'tb', 'tc']
+    # planning does not run anything
+    assert not Path('a.txt').exists()
+
+    dag.build()
+
+    dag = _make_plan_dag('durations.json', tb_code='echo changed')
+    dag._durations.record({'tb': 2, 'tc': 3})
+    plan = dag.plan_build()
+    reasons = {row['name']: row['Reason'] for row in plan}
+
+    assert plan.to_run == ['tb', 'tc']
+    assert reasons['ta'] == ''
+    assert reasons['tb'] == 'Outdated code'
+    assert reasons['tc'] == 'Outdated data'
+    assert plan.without_history == []
+    assert plan.estimated_time == pytest.approx(
+        dag._durations.estimate('tb') + dag._durations.estimate('tc'))
+
+    assert dag.plan_build(force=True).to_run == ['ta', 'td', 'tb', 'tc']
+
+
+def test_build_records_durations(tmp_directory):
+    dag = _make_plan_dag('durations.json')
+    dag.build()
+
+    dag = _make_plan_dag('durations.json')
+
+    assert all(name in dag._durations for name in dag)
+
+    dag.build()
+
+    # nothing ran, nothing recorded
+    assert len(dag._durations._durations['ta']) == 1
+
+
+def _make_journal_dag(source_b='echo {{upstream["ta"]}} >> {{product}}'):
+    dag = DAG('dag', journal='journal.jsonl')
+    ta = BashCommand('echo a >> {{product}}', File('a.txt'), dag, 'ta')
+    tb = BashCommand(source_b, File('b.txt'), dag, 'tb')
+    ta >> tb
+    return dag
+
+
+def test_build_records_journal(tmp_directory):
+    _make_journal_dag().build()
+
+    events = [(e['event'], e['task'])
+              for e in _make_journal_dag()._journal.events()]
+
+    assert events == [('start', 'ta'), ('finish', 'ta'),
+                      ('start', 'tb'), ('finish', 'tb')]
+
+
+def test_resume_skips_tasks_that_finished(tmp_directory):
+    dag = _make_journal_dag(source_b='exit 1; echo {{upstream["ta"]}} '
+                                     '>> {{product}}')
+
+    with pytest.raises(Exception):
+        dag.build()
+
+    # products of finished tasks are not checked, a.txt is not created
+    # again
+    Path('a.txt').unlink()
+    report = _make_journal_dag().build(resume=True)
+
+    assert [(row['name'], row['Ran?']) for row in report] == [('ta', False),
+                                                              ('tb', True)]
+    assert not Path('a.txt').exists()
+
+    # without resume, the journal is cleared and everything is checked
+    _make_journal_dag().build()
+    assert Path('a.txt').exists()
+
+
+def test_resume_checks_interrupted_and_modified_tasks(tmp_directory):
+    _make_journal_dag().build()
+
+    dag = _make_journal_dag(source_b='echo modified {{upstream["ta"]}} '
+                                     '>> {{product}}')
+    dag.render()
+    # tb was running when the build was interrupted
+    dag._journal.record('start', 'tb')
+
+    assert dag._journal.interrupted() == ['tb']
+
+    report = dag.build(resume=True)
+
+    assert [(row['name'], row['Ran?']) for row in report] == [('ta', False),
+                                                              ('tb', True)]
+    assert dag['tb']._resumed is False
+
+
+def test_resume_requires_journal():
+    with pytest.raises(ValueError):
+        DAG().build(resume=True)
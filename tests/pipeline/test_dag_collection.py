@@ -0,0 +1,87 @@
+import time
+import queue
+from pathlib import Path
+
+import pytest
+
+from dstools.exceptions import TaskBuildError
+from dstools.pipeline import DAG, DAGCollection
+from dstools.pipeline.products import File
+from dstools.pipeline.tasks import PythonCallable
+from dstools.pipeline.executors import Parallel, Serial
+from dstools.pipeline.executors.Parallel import _DAGBuild, _Tagged
+
+
+def fn_times(product):
+    start = time.time()
+    time.sleep(0.3)
+    Path(str(product)).write_text('{} {}'.format(start, time.time()))
+
+
+def fn_fail(product):
+    raise ValueError('some error')
+
+
+def make_dag(name, n=1, fn=fn_times):
+    dag = DAG(name)
+
+    for i in range(n):
+        PythonCallable(fn, File('{}-{}.txt'.format(name, i)), dag,
+                       'task-{}'.format(i))
+
+    return dag
+
+
+def test_builds_dags_at_the_same_time(tmp_directory):
+    dags = [make_dag(name) for name in ['us', 'eu', 'asia']]
+    reports = DAGCollection(dags, executor=Parallel(processes=3)).build()
+
+    assert list(reports) == ['us', 'eu', 'asia']
+    # task names are the same in all dags, each gets its own report
+    assert all([row['name'] for row in report] == ['task-0']
+               for report in reports.values())
+
+    times = [[float(x) for x in Path(name + '-0.txt').read_text().split()]
+             for name in ['us', 'eu', 'asia']]
+    starts, ends = zip(*times)
+
+    assert max(starts) < min(ends)
+
+
+def test_failed_dag_does_not_stop_the_rest(tmp_directory):
+    dags = [make_dag('ok'), make_dag('fail', fn=fn_fail)]
+
+    with pytest.raises(TaskBuildError) as excinfo:
+        DAGCollection(dags).build()
+
+    assert "1 DAG(s) failed: ['fail'], succeeded: ['ok']" in str(
+        excinfo.value)
+    assert Path('ok-0.txt').exists()
+
+
+def test_workers_are_shared_in_proportion_to_weights(tmp_directory):
+    dags = [make_dag('a', n=4), make_dag('b', n=4)]
+    finished = queue.Queue()
+    executor = Parallel(processes=3)
+    builds = []
+
+    for i, dag in enumerate(dags):
+        dag.render()
+        builds.append(_DAGBuild(executor, dag, _Tagged(finished, i),
+                                chains=None, batch=False))
+
+    ready = executor._pop_ready(builds, weights=[2, 1], free=3)
+
+    assert [(build.dag.name, len(tasks)) for build, tasks in ready] == [
+        ('a', 2), ('b', 1)]
+
+
+def test_validates_parameters():
+    with pytest.raises(ValueError):
+        DAGCollection([DAG('a'), DAG('a')])
+
+    with pytest.raises(ValueError):
+        DAGCollection([DAG('a')], weights={'b': 1})
+
+    with pytest.raises(TypeError):
+        DAGCollection([DAG('a')], executor=Serial())
@@ -0,0 +1,58 @@
+import pytest
+
+from dstools.pipeline import estimate
+
+
+@pytest.fixture
+def diamond():
+    order = ['a', 'b', 'c', 'd']
+    upstream = {'a': [], 'b': ['a'], 'c': ['a'], 'd': ['b', 'c']}
+    durations = {'a': 1, 'b': 2, 'c': 3, 'd': 4}
+    return order, upstream, durations
+
+
+def test_makespan_with_one_worker(diamond):
+    assert estimate.makespan(*diamond) == 10
+
+
+def test_makespan_with_many_workers(diamond):
+    assert estimate.makespan(*diamond, workers=2) == 8
+    assert estimate.makespan(*diamond, workers=10) == 8
+
+
+def test_makespan_ignores_upstream_outside_order():
+    upstream = {'b': ['a'], 'c': ['b']}
+    assert estimate.makespan(['b', 'c'], upstream, {'b': 1, 'c': 1}) == 2
+
+
+def test_makespan_tasks_wait_for_free_workers():
+    order = ['a', 'b', 'c']
+    upstream = {'a': [], 'b': [], 'c': []}
+    durations = {'a': 5, 'b': 1, 'c': 1}
+
+    # c starts when b finishes
+    assert estimate.makespan(order, upstream, durations, workers=2) == 5
+
+
+def test_critical_path(diamond):
+    assert estimate.critical_path(*diamond) == {'a': 8, 'b': 6, 'c': 7,
+                                                'd': 4}
+
+
+def test_critical_path_default_duration(diamond):
+    order, upstream, _ = diamond
+    path = estimate.critical_path(order, upstream, {'a': 1}, default=2)
+    assert path == {'a': 5, 'b': 4, 'c': 4, 'd': 2}
+
+
+def test_critical_path_priority_reduces_makespan():
+    # short tasks come first in order but "long" is on the critical path
+    order = ['short1', 'short2', 'long', 'after_long']
+    upstream = {'short1': [], 'short2': [], 'long': [],
+                'after_long': ['long']}
+    durations = {'short1': 3, 'short2': 3, 'long': 4, 'after_long': 4}
+    priority = estimate.critical_path(order, upstream, durations)
+
+    assert estimate.makespan(order, upstream, durations, workers=2) == 11
+    assert estimate.makespan(order, upstream, durations, workers=2,
+                             priority=priority) == 8
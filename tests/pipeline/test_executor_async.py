@@ -0,0 +1,219 @@
+import time
+import threading
+from pathlib import Path
+from sqlite3 import connect
+
+import pytest
+
+from dstools.exceptions import TaskBuildError
+from dstools.pipeline import DAG
+from dstools.pipeline.products import File, SQLiteRelation
+from dstools.pipeline.tasks import (BashCommand, ShellScript, SQLScript,
+                                    PythonCallable)
+from dstools.pipeline.clients import (ShellClient, AsyncDBAPIClient,
+                                      SQLAlchemyClient)
+from dstools.pipeline.executors import Async
+
+
+class FakeAsyncConnection:
+    """Async driver backed by sqlite3
+    """
+    def __init__(self, path):
+        self.conn = connect(path, check_same_thread=False)
+        self.closed = False
+
+    async def execute(self, code):
+        self.conn.executescript(code)
+
+    async def commit(self):
+        self.conn.commit()
+
+    async def close(self):
+        self.conn.close()
+        self.closed = True
+
+
+async def fake_connect(path):
+    return FakeAsyncConnection(path)
+
+
+def write_thread(product):
+    Path(str(product)).write_text(str(threading.get_ident()))
+
+
+def fn_fail(product):
+    raise ValueError('some error')
+
+
+def test_async_tasks_run_concurrently(tmp_directory):
+    dag = DAG(executor=Async())
+
+    for i in range(5):
+        BashCommand('sleep 0.5; touch {{product}}', File('%i.txt' % i), dag,
+                    name='bash-%i' % i)
+
+    start = time.time()
+    report = dag.build()
+    elapsed = time.time() - start
+
+    assert all(Path('%i.txt' % i).exists() for i in range(5))
+    assert len(list(report)) == 5
+    assert elapsed < 2
+
+
+def test_async_respects_dependencies(tmp_directory):
+    dag = DAG(executor=Async(),
+              clients={ShellScript: ShellClient()})
+
+    a = BashCommand('echo a > {{product}}', File('a.txt'), dag, name='a')
+    b = ShellScript('cat {{upstream["a"]}} > {{product}}', File('b.txt'),
+                    dag, name='b')
+    a >> b
+
+    dag.build()
+
+    assert Path('b.txt').read_text() == 'a\n'
+
+
+def test_async_db_client(tmp_directory):
+    tmp = Path(tmp_directory)
+    path = str(tmp / 'database.db')
+    client = AsyncDBAPIClient(fake_connect, path=path)
+    dag = DAG(executor=Async(),
+              clients={SQLScript: client,
+                       SQLiteRelation: SQLAlchemyClient('sqlite:///' + path)})
+
+    ta = SQLScript('CREATE TABLE {{product}} AS SELECT 1 AS x',
+                   SQLiteRelation((None, 'ta', 'table')), dag, name='ta')
+    tb = SQLScript('CREATE TABLE {{product}} AS SELECT * FROM '
+                   '{{upstream["ta"]}}',
+                   SQLiteRelation((None, 'tb', 'table')), dag, name='tb')
+    ta >> tb
+
+    dag.build()
+
+    conn = connect(path)
+    assert conn.execute('SELECT * FROM tb').fetchall() == [(1,)]
+    conn.close()
+    # connections are closed after building
+    assert client._connections == {}
+
+
+def test_async_db_client_execute_blocking(tmp_directory):
+    client = AsyncDBAPIClient(fake_connect, path='database.db')
+
+    client.execute('CREATE TABLE t AS SELECT 1 AS x')
+
+    conn = connect('database.db')
+    assert conn.execute('SELECT * FROM t').fetchall() == [(1,)]
+    conn.close()
+    assert client._connections == {}
+
+
+def test_tasks_without_async_implementation_run_in_threads(tmp_directory):
+    dag = DAG(executor=Async())
+    PythonCallable(write_thread, File('a.txt'), dag, name='a')
+
+    dag.build()
+
+    assert int(Path('a.txt').read_text()) != threading.get_ident()
+
+
+def test_async_failure_skips_downstream(tmp_directory):
+    dag = DAG(executor=Async())
+    fail = PythonCallable(fn_fail, File('fail.txt'), dag, name='fail')
+    down = BashCommand('cat {{upstream["fail"]}} > {{product}}',
+                       File('down.txt'), dag, name='down')
+    BashCommand('touch {{product}}', File('other.txt'), dag, name='other')
+    fail >> down
+
+    with pytest.raises(TaskBuildError) as excinfo:
+        dag.build()
+
+    assert 'some error' in str(excinfo.value)
+    assert Path('other.txt').exists()
+    assert not Path('down.txt').exists()
+
+
+def test_max_concurrency(tmp_directory):
+    dag = DAG(executor=Async(max_concurrency=1))
+
+    for i in range(3):
+        BashCommand('sleep 0.2; touch {{product}}', File('%i.txt' % i), dag,
+                    name='bash-%i' % i)
+
+    start = time.time()
+    dag.build()
+
+    assert time.time() - start > 0.6
+
+
+def test_has_the_parallel_attributes():
+    executor = Async(max_concurrency=10)
+
+    assert executor.workers == 10
+    assert executor.processes == 10
+    assert not executor.fuse_chains
+    assert executor.batch_threshold is None
+
+
+def test_restores_the_event_loop(tmp_directory):
+    import asyncio
+
+    dag = DAG(executor=Async())
+    PythonCallable(write_thread, File('a.txt'), dag, name='a')
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    try:
+        dag.build()
+        current = asyncio.get_event_loop()
+    finally:
+        asyncio.set_event_loop(None)
+        loop.close()
+
+    assert current is loop
+    assert Path('a.txt').exists()
+
+
+def test_can_build_from_a_thread_without_event_loop(tmp_directory):
+    import asyncio
+
+    dag = DAG(executor=Async())
+    PythonCallable(write_thread, File('a.txt'), dag, name='a')
+    errors = []
+
+    def build():
+        try:
+            dag.build()
+            # the loop used to build is not left set in the thread
+            asyncio.get_event_loop()
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    thread = threading.Thread(target=build)
+    thread.start()
+    thread.join()
+
+    assert len(errors) == 1
+    assert 'There is no current event loop' in errors[0]
+    assert Path('a.txt').exists()
+
+
+def test_error_if_event_loop_is_running(tmp_directory):
+    import asyncio
+
+    dag = DAG(executor=Async())
+    PythonCallable(write_thread, File('a.txt'), dag, name='a')
+
+    async def build():
+        dag.build()
+
+    loop = asyncio.new_event_loop()
+
+    with pytest.raises(RuntimeError) as excinfo:
+        loop.run_until_complete(build())
+
+    loop.close()
+    assert 'event loop is running' in str(excinfo.value)
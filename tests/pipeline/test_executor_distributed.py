@@ -0,0 +1,128 @@
+import sys
+import time
+import socket
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from dstools.exceptions import TaskBuildError
+from dstools.pipeline import DAG
+from dstools.pipeline.products import File
+from dstools.pipeline.tasks import BashCommand
+from dstools.pipeline.constants import TaskStatus
+from dstools.pipeline.executors import Distributed
+from dstools.pipeline.executors.Distributed import _parse_address
+
+
+def free_address():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return '127.0.0.1:{}'.format(s.getsockname()[1])
+
+
+@pytest.fixture
+def start_workers(tmp_directory):
+    processes = []
+
+    def start(address, n):
+        for _ in range(n):
+            processes.append(
+                subprocess.Popen([sys.executable, '-c',
+                                  'from dstools.cli import cli; cli()',
+                                  'worker', address, '--authkey', 'secret'],
+                                 cwd=tmp_directory))
+
+    yield start
+
+    for process in processes:
+        process.kill()
+        process.wait()
+
+
+def test_parse_address():
+    assert _parse_address('localhost:6000') == ('localhost', 6000)
+    assert _parse_address(('localhost', 6000)) == ('localhost', 6000)
+
+
+def test_workers_run_tasks_at_the_same_time(start_workers):
+    address = free_address()
+    start_workers(address, 4)
+    dag = DAG(executor=Distributed(address, authkey='secret', workers=4))
+
+    # each task records the pid of the worker that ran it
+    for i in range(8):
+        BashCommand('sleep 1; echo $PPID > {{product}}',
+                    File('{}.txt'.format(i)), dag, name=str(i))
+
+    start = time.monotonic()
+    dag.build()
+    elapsed = time.monotonic() - start
+
+    pids = {Path('{}.txt'.format(i)).read_text() for i in range(8)}
+
+    # 8 seconds if tasks ran one at a time, workers might take a moment to
+    # connect
+    assert elapsed < 6
+    assert len(pids) > 1
+    assert all(t._status == TaskStatus.Executed for t in dag.values())
+
+
+def test_runs_dependencies_in_order(start_workers):
+    address = free_address()
+    start_workers(address, 2)
+    dag = DAG(executor=Distributed(address, authkey='secret', workers=2))
+
+    a = BashCommand('echo a > {{product}}', File('a.txt'), dag, name='a')
+    b = BashCommand('cat {{upstream["a"]}} > {{product}}; echo b >> '
+                    '{{product}}', File('b.txt'), dag, name='b')
+    a >> b
+
+    dag.build()
+
+    assert Path('b.txt').read_text() == 'a\nb\n'
+    # metadata is saved by the coordinator
+    assert dag['b'].product.fetch_metadata()['stored_source_code']
+
+    # workers connect again for the next build, up-to-date tasks are not
+    # sent to them
+    dag = DAG(executor=Distributed(address, authkey='secret', workers=2))
+    BashCommand('echo a > {{product}}', File('a.txt'), dag, name='a')
+    report = dag.build()
+
+    assert [row['Ran?'] for row in report] == [False]
+
+
+def test_failed_task_skips_downstream(start_workers):
+    address = free_address()
+    start_workers(address, 2)
+    dag = DAG(executor=Distributed(address, authkey='secret', workers=2))
+
+    fail = BashCommand('exit 1; touch {{product}}', File('fail.txt'), dag,
+                       name='fail')
+    after = BashCommand('cat {{upstream["fail"]}} > {{product}}',
+                        File('after.txt'), dag, name='after')
+    BashCommand('touch {{product}}', File('ok.txt'), dag, name='ok')
+    fail >> after
+
+    with pytest.raises(TaskBuildError):
+        dag.build()
+
+    assert dag['fail']._status == TaskStatus.Errored
+    assert dag['ok']._status == TaskStatus.Executed
+    assert not Path('after.txt').exists()
+
+
+def test_lost_worker_fails_its_task(start_workers):
+    address = free_address()
+    start_workers(address, 2)
+    dag = DAG(executor=Distributed(address, authkey='secret', workers=2))
+
+    # the shell's parent is the worker
+    BashCommand('kill -9 $PPID; touch {{product}}', File('kill.txt'), dag,
+                name='kill')
+
+    with pytest.raises(TaskBuildError) as excinfo:
+        dag.build()
+
+    assert 'was lost while running the task' in str(excinfo.value)
@@ -0,0 +1,109 @@
+import os
+from pathlib import Path
+from sqlite3 import connect
+
+import pytest
+
+from dstools.exceptions import TaskBuildError
+from dstools.pipeline import DAG
+from dstools.pipeline.products import File, SQLiteRelation
+from dstools.pipeline.tasks import PythonCallable, SQLScript
+from dstools.pipeline.clients import SQLAlchemyClient
+from dstools.pipeline.constants import TaskStatus
+from dstools.pipeline.executors import Hybrid
+from dstools.pipeline.executors.Hybrid import uses_client
+
+
+def write_pid(product):
+    Path(str(product)).write_text(str(os.getpid()))
+
+
+def write_pid_upstream(upstream, product):
+    Path(str(product)).write_text(str(os.getpid()))
+
+
+def fn_fail(product):
+    raise ValueError('some error')
+
+
+def always(task):
+    return True
+
+
+def make_dag(tmp, executor):
+    client = SQLAlchemyClient('sqlite:///{}'.format(tmp / 'database.db'))
+    dag = DAG(executor=executor,
+              clients={SQLScript: client, SQLiteRelation: client})
+
+    ta = SQLScript('CREATE TABLE {{product}} AS SELECT 1 AS x',
+                   SQLiteRelation((None, 'ta', 'table')), dag, name='ta')
+    tb = SQLScript('CREATE TABLE {{product}} AS SELECT * FROM '
+                   '{{upstream["ta"]}}',
+                   SQLiteRelation((None, 'tb', 'table')), dag, name='tb')
+    pa = PythonCallable(write_pid, File('pa.txt'), dag, name='pa')
+    pb = PythonCallable(write_pid_upstream, File('pb.txt'), dag, name='pb')
+
+    ta >> tb >> pb
+    pa >> pb
+
+    return dag
+
+
+def test_uses_client(tmp_directory):
+    dag = make_dag(Path(tmp_directory), executor='serial')
+
+    assert uses_client(dag['ta']) and uses_client(dag['tb'])
+    assert not uses_client(dag['pa']) and not uses_client(dag['pb'])
+
+
+def test_hybrid_builds_dag(tmp_directory):
+    tmp = Path(tmp_directory)
+    dag = make_dag(tmp, executor=Hybrid(threads=2, processes=2))
+
+    report = dag.build()
+
+    conn = connect(str(tmp / 'database.db'))
+    assert conn.execute('SELECT * FROM tb').fetchall() == [(1,)]
+    conn.close()
+
+    # cpu bound tasks run in the process pool
+    assert int(Path('pa.txt').read_text()) != os.getpid()
+    assert int(Path('pb.txt').read_text()) != os.getpid()
+    assert {row['name'] for row in report} == {'ta', 'tb', 'pa', 'pb'}
+    assert all(t._status == TaskStatus.Executed for t in dag.values())
+
+
+def test_can_route_tasks_to_threads(tmp_directory):
+    dag = make_dag(Path(tmp_directory),
+                   executor=Hybrid(threads=2, is_io_bound=always))
+
+    dag.build()
+
+    assert int(Path('pa.txt').read_text()) == os.getpid()
+    assert int(Path('pb.txt').read_text()) == os.getpid()
+
+
+def test_failure_in_thread_skips_downstream(tmp_directory):
+    dag = DAG(executor=Hybrid(threads=2, processes=2,
+                              is_io_bound=always))
+    fail = PythonCallable(fn_fail, File('fail.txt'), dag, name='fail')
+    down = PythonCallable(write_pid_upstream, File('down.txt'), dag,
+                          name='down')
+    PythonCallable(write_pid, File('other.txt'), dag, name='other')
+    fail >> down
+
+    with pytest.raises(TaskBuildError) as excinfo:
+        dag.build()
+
+    assert 'some error' in str(excinfo.value)
+    assert Path('other.txt').exists()
+    assert not Path('down.txt').exists()
+
+
+def test_workers():
+    assert Hybrid(threads=10, processes=3).workers == 13
+
+
+def test_dag_accepts_hybrid_string():
+    dag = DAG(executor='hybrid')
+    assert isinstance(dag._executor, Hybrid)
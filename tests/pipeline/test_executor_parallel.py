@@ -28,15 +28,19 @@
 #     for n, t in dag._dict.items():
 #         print(n, t, t._status)
 
+import os
 import time
 from pathlib import Path
 
+import pytest
 
-from dstools.exceptions import RenderError
+from dstools.exceptions import RenderError, TaskBuildError
 from dstools.pipeline import DAG
 from dstools.pipeline.products import File, PostgresRelation
 from dstools.pipeline.tasks import PythonCallable, SQLScript, BashCommand
 from dstools.pipeline import executors
+from dstools.pipeline.executors import Parallel
+from dstools.pipeline.DurationHistory import DurationHistory
 
 
 def fna1(product):
@@ -60,6 +64,64 @@ def fnc(upstream, product):
     Path(str(product)).touch()
 
 
+def fn_fail(product):
+    raise ValueError('some error')
+
+
+def fn_slow(product):
+    time.sleep(0.5)
+    Path(str(product)).touch()
+
+
+def fn_log(product):
+    with open('order.txt', 'a') as f:
+        f.write(Path(str(product)).name + '\n')
+
+    Path(str(product)).touch()
+
+
+def fn_log_upstream(upstream, product):
+    fn_log(product)
+
+
+def fn_times(product):
+    start = time.time()
+    time.sleep(0.2)
+    Path(str(product)).write_text('{} {}'.format(start, time.time()))
+
+
+def fn_pid(product):
+    Path(str(product)).write_text(str(os.getpid()))
+
+
+def fn_pid_upstream(upstream, product):
+    fn_pid(product)
+
+
+def fn_fail_upstream(upstream, product):
+    fn_fail(product)
+
+
+def fn_tiny(product):
+    if Path(str(product)).name == 'fail.txt':
+        raise ValueError('tiny task failed')
+
+    Path(str(product)).touch()
+
+
+def fn_die(product):
+    # simulate the OOM killer
+    os.kill(os.getpid(), 9)
+
+
+def on_finish_write_status(task):
+    # callbacks run in the main process, with the original task
+    Path('on_finish.txt').write_text(str(task.dag is DAG_USED))
+
+
+DAG_USED = None
+
+
 def test_parallel_execution(tmp_directory):
     dag = DAG('dag', executor='parallel')
 
@@ -70,4 +132,283 @@ def test_parallel_execution(tmp_directory):
 
     (a1 + a2) >> b >> c
 
+    report = dag.build()
+
+    assert {row['name'] for row in report} == {'a1', 'a2', 'b', 'c'}
+    assert all(row['Ran?'] for row in report)
+    assert all(Path(name + '.txt').exists()
+               for name in ['a1', 'a2', 'b', 'c'])
+
+
+def test_parallel_execution_skips_downstream_of_failed_tasks(tmp_directory):
+    dag = DAG('dag', executor='parallel')
+
+    a1 = PythonCallable(fn_fail, File('a1.txt'), dag, 'a1')
+    a2 = PythonCallable(fna2, File('a2.txt'), dag, 'a2')
+    b = PythonCallable(fnb, File('b.txt'), dag, 'b')
+    c = PythonCallable(fnc, File('c.txt'), dag, 'c')
+
+    a1 >> b
+    a2 >> c
+
+    with pytest.raises(TaskBuildError) as excinfo:
+        dag.build()
+
+    assert 'some error' in str(excinfo.value)
+    assert not Path('b.txt').exists()
+    assert Path('c.txt').exists()
+
+
+def test_parallel_execution_stop_on_failure(tmp_directory):
+    executor = executors.Parallel(processes=2, stop_on_failure=True)
+    dag = DAG('dag', executor=executor)
+
+    PythonCallable(fn_fail, File('a1.txt'), dag, 'a1')
+    a2 = PythonCallable(fn_slow, File('a2.txt'), dag, 'a2')
+    c = PythonCallable(fnc, File('c.txt'), dag, 'c')
+
+    a2 >> c
+
+    with pytest.raises(TaskBuildError):
+        dag.build()
+
+    # a2 was running when a1 failed
+    assert Path('a2.txt').exists()
+    assert not Path('c.txt').exists()
+
+
+def test_parallel_execution_marks_downstream_as_outdated(tmp_directory):
+    dag = DAG('dag', executor='parallel')
+
+    a1 = PythonCallable(fna1, File('a1.txt'), dag, 'a1')
+    b = PythonCallable(fnb, File('b.txt'), dag, 'b')
+
+    a1 >> b
+
+    dag.build()
+
+    assert not dag['a1'].product._outdated()
+    assert not dag['b'].product._outdated()
+
+
+def test_parallel_execution_starts_critical_path_first(tmp_directory):
+    dag = DAG(executor=executors.Parallel(processes=1),
+              durations='durations.json')
+    dag._durations.record({'short': 1, 'long': 1, 'after_long': 5})
+
+    PythonCallable(fn_log, File('short'), dag, 'short')
+    long = PythonCallable(fn_log, File('long'), dag, 'long')
+    after_long = PythonCallable(fn_log_upstream, File('after_long'), dag,
+                                'after_long')
+    long >> after_long
+
     dag.build()
+
+    # without durations, short would run first
+    assert Path('order.txt').read_text().split() == ['long', 'after_long',
+                                                     'short']
+
+
+def test_parallel_execution_respects_resources(tmp_directory):
+    dag = DAG(executor=executors.Parallel(processes=4,
+                                          resources={'memory': 10}))
+
+    for name in ['a', 'b', 'c']:
+        task = PythonCallable(fn_times, File(name), dag, name)
+        task.resources = {'memory': 6}
+
+    dag.build()
+
+    intervals = sorted(tuple(float(x) for x in Path(name).read_text().split())
+                       for name in ['a', 'b', 'c'])
+
+    # tasks do not overlap
+    for (_, end), (start, _) in zip(intervals, intervals[1:]):
+        assert end <= start
+
+
+def test_parallel_execution_runs_callbacks_with_original_task(tmp_directory):
+    global DAG_USED
+    DAG_USED = DAG(executor='parallel')
+
+    t = PythonCallable(fna1, File('a1.txt'), DAG_USED, 'a1')
+    t.on_finish = on_finish_write_status
+
+    DAG_USED.build()
+
+    assert Path('on_finish.txt').read_text() == 'True'
+
+
+def test_parallel_execution_does_not_send_up_to_date_tasks(tmp_directory):
+    def make():
+        dag = DAG(executor='parallel')
+        PythonCallable(fn_log, File('a1.txt'), dag, 'a1')
+        return dag
+
+    make().build()
+    report = make().build()
+
+    assert [row['Ran?'] for row in report] == [False]
+    assert Path('order.txt').read_text().split() == ['a1.txt']
+
+
+def test_parallel_execution_fuses_chains(tmp_directory):
+    def make():
+        dag = DAG(executor=executors.Parallel(fuse_chains=True))
+        a = PythonCallable(fn_pid, File('a.txt'), dag, 'a')
+        b = PythonCallable(fn_pid_upstream, File('b.txt'), dag, 'b')
+        c = PythonCallable(fn_pid_upstream, File('c.txt'), dag, 'c')
+        a >> b >> c
+        return dag
+
+    dag = make()
+    report = dag.build()
+
+    pids = {Path(name).read_text() for name in ['a.txt', 'b.txt', 'c.txt']}
+
+    # the chain ran in a single worker call, metadata is saved for each task
+    assert len(pids) == 1
+    assert [row['Ran?'] for row in report] == [True, True, True]
+    assert all(t.product.fetch_metadata()['timestamp'] for t in dag.values())
+
+    # up-to-date tasks at the start of the chain do not run, the rest do
+    Path('b.txt').unlink()
+    report = make().build()
+
+    assert [row['Ran?'] for row in report] == [False, True, True]
+
+
+def test_parallel_execution_failed_task_in_chain(tmp_directory):
+    dag = DAG(executor=executors.Parallel(fuse_chains=True))
+    a = PythonCallable(fn_pid, File('a.txt'), dag, 'a')
+    b = PythonCallable(fn_fail_upstream, File('b.txt'), dag, 'b')
+    c = PythonCallable(fn_pid_upstream, File('c.txt'), dag, 'c')
+    a >> b >> c
+
+    with pytest.raises(TaskBuildError) as excinfo:
+        dag.build()
+
+    assert "Tasks not executed: ['c']" in str(excinfo.value)
+    assert Path('a.txt').exists()
+    assert not Path('c.txt').exists()
+
+
+def fn_no_product(product):
+    pass
+
+
+def on_finish_fail(task):
+    raise ValueError('on_finish failed')
+
+
+def make_chain(fn_a):
+    dag = DAG(executor=executors.Parallel(fuse_chains=True))
+    a = PythonCallable(fn_a, File('a.txt'), dag, 'a')
+    b = PythonCallable(fn_pid_upstream, File('b.txt'), dag, 'b')
+    c = PythonCallable(fn_pid_upstream, File('c.txt'), dag, 'c')
+    a >> b >> c
+    return dag
+
+
+def test_chain_stops_if_task_does_not_create_its_product(tmp_directory):
+    dag = make_chain(fn_no_product)
+
+    with pytest.raises(TaskBuildError) as excinfo:
+        dag.build()
+
+    assert "Tasks not executed: ['b', 'c']" in str(excinfo.value)
+    assert 'does not exist yet' in str(excinfo.value)
+    assert not Path('b.txt').exists()
+    assert not Path('c.txt').exists()
+
+
+def test_chain_task_fails_after_the_rest_of_the_chain_ran(tmp_directory):
+    dag = make_chain(fn_pid)
+    dag['a'].on_finish = on_finish_fail
+
+    with pytest.raises(TaskBuildError) as excinfo:
+        dag.build()
+
+    assert 'on_finish failed' in str(excinfo.value)
+    assert ("Tasks ['b', 'c'] ran after this one in the same process"
+            in str(excinfo.value))
+    # b and c ran but their metadata was not saved, they run again in the
+    # next build
+    assert not Path('b.txt').exists()
+    assert not Path('c.txt').exists()
+
+    report = make_chain(fn_pid).build()
+    assert [row['name'] for row in report if row['Ran?']] == ['b', 'c']
+
+
+def test_parallel_execution_batches_tiny_tasks(tmp_directory, monkeypatch):
+    batches = []
+    submit_batch = Parallel._submit_batch_to_pool
+
+    def spy(self, pool, tasks, kwargs, finished):
+        batches.append([t.name for t in tasks])
+        submit_batch(self, pool, tasks, kwargs, finished)
+
+    monkeypatch.setattr(Parallel, '_submit_batch_to_pool', spy)
+
+    names = ['t{}'.format(i) for i in range(19)] + ['fail']
+    DurationHistory('durations.json').record({name: 0.01 for name in names})
+
+    executor = Parallel(processes=2, batch_threshold=0.1, batch_target=0.1)
+    dag = DAG(executor=executor, durations='durations.json')
+
+    for name in names:
+        PythonCallable(fn_tiny, File(name + '.txt'), dag, name)
+
+    with pytest.raises(TaskBuildError) as excinfo:
+        dag.build()
+
+    # two chunks of up to 10 tasks, one per process
+    assert len(batches) == 2
+    assert sorted(sum(batches, [])) == sorted(names)
+    # failures are reported for the task that failed
+    assert "1 task(s) failed: ['fail']" in str(excinfo.value)
+    assert all(Path(name + '.txt').exists() for name in names[:-1])
+    assert dag['t0'].product.fetch_metadata()['timestamp']
+
+
+def test_parallel_execution_batches_tasks_in_view(tmp_directory):
+    DurationHistory('durations.json').record({'t0': 0.01, 't1': 0.01})
+    executor = Parallel(processes=1, batch_threshold=0.1)
+    dag = DAG(executor=executor, durations='durations.json')
+
+    for name in ['t0', 't1', 't2']:
+        PythonCallable(fn_tiny, File(name + '.txt'), dag, name)
+
+    dag.view(['t0', 't1']).build()
+
+    assert Path('t0.txt').exists() and Path('t1.txt').exists()
+    assert not Path('t2.txt').exists()
+
+
+@pytest.mark.parametrize('executor', ['parallel', 'hybrid'])
+def test_task_fails_if_worker_dies(tmp_directory, executor):
+    dag = DAG(executor=executor)
+    a = PythonCallable(fn_die, File('a.txt'), dag, 'a')
+    b = PythonCallable(fnb, File('b.txt'), dag, 'b')
+    PythonCallable(fna2, File('a2.txt'), dag, 'a2')
+    a >> b
+
+    with pytest.raises(TaskBuildError) as excinfo:
+        dag.build()
+
+    assert "1 task(s) failed: ['a']" in str(excinfo.value)
+    assert 'died unexpectedly' in str(excinfo.value)
+    assert not Path('b.txt').exists()
+    assert Path('a2.txt').exists()
+
+
+def test_is_alive():
+    import subprocess
+    from dstools.pipeline.executors.Parallel import _is_alive
+
+    process = subprocess.Popen(['true'])
+    process.wait()
+
+    assert _is_alive(os.getpid())
+    assert not _is_alive(process.pid)
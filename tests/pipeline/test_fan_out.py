@@ -0,0 +1,142 @@
+import time
+import shutil
+from pathlib import Path
+
+import pytest
+
+from dstools.exceptions import TaskBuildError
+from dstools.pipeline import DAG
+from dstools.pipeline.products import File
+from dstools.pipeline.tasks import PythonCallable, FanOut
+from dstools.pipeline.constants import TaskStatus
+from dstools.pipeline.executors import Parallel
+
+
+def make_chunks(product, n):
+    if Path(str(product)).exists():
+        shutil.rmtree(str(product))
+
+    Path(str(product)).mkdir()
+
+    for i in range(n):
+        Path(str(product), '{}.txt'.format(i)).write_text(str(i))
+
+
+def double(upstream, product, partition):
+    value = int(Path(str(upstream['chunks']), partition).read_text())
+    Path(str(product)).write_text(str(2 * value))
+
+
+def sleep_and_touch(upstream, product, partition):
+    time.sleep(1)
+    Path(str(product)).touch()
+
+
+def fail_on_one(upstream, product, partition):
+    if partition == '1.txt':
+        raise ValueError('Cannot process partition')
+
+    Path(str(product)).touch()
+
+
+def add(product, partitions):
+    total = sum(int(Path(str(product), p).read_text()) for p in partitions)
+    Path(str(product), 'total').write_text(str(total))
+
+
+def letters(upstream):
+    return ['a', 'b']
+
+
+def touch(product, partition):
+    Path(str(product)).write_text(partition)
+
+
+def make_dag(executor, n=3, source=double, gather=add):
+    dag = DAG(executor=executor)
+    chunks = PythonCallable(make_chunks, File('chunks'), dag, name='chunks',
+                            params={'n': n})
+    doubled = FanOut(source, File('doubled'), dag, name='doubled',
+                     gather=gather)
+    chunks >> doubled
+    return dag
+
+
+@pytest.mark.parametrize('executor', ['serial', 'parallel', 'hybrid',
+                                      'async'])
+def test_runs_source_once_per_partition(tmp_directory, executor):
+    dag = make_dag(executor)
+    report = dag.build()
+
+    assert sorted(p.name for p in Path('doubled').iterdir()) == [
+        '0.txt', '1.txt', '2.txt', 'total']
+    assert Path('doubled', 'total').read_text() == '6'
+    # partitions are not part of the report
+    assert [row['name'] for row in report] == ['chunks', 'doubled']
+    assert dag['doubled']._status == TaskStatus.Executed
+
+
+def test_partitions_run_at_the_same_time(tmp_directory):
+    dag = make_dag(Parallel(processes=4), n=4, source=sleep_and_touch,
+                   gather=None)
+
+    start = time.monotonic()
+    dag.build()
+    elapsed = time.monotonic() - start
+
+    # 4 seconds if partitions ran one at a time
+    assert elapsed < 3
+    assert len(list(Path('doubled').iterdir())) == 4
+
+
+@pytest.mark.parametrize('executor', ['serial', 'parallel'])
+def test_up_to_date_fan_out_does_not_run(tmp_directory, executor):
+    make_dag(executor).build()
+    report = make_dag(executor).build()
+
+    assert [row['Ran?'] for row in report] == [False, False]
+
+
+def test_runs_again_if_upstream_changes(tmp_directory):
+    make_dag('parallel', n=3).build()
+
+    dag = make_dag('parallel', n=2)
+    dag.build(force=True)
+
+    # partitions from the previous build are removed
+    assert sorted(p.name for p in Path('doubled').iterdir()) == [
+        '0.txt', '1.txt', 'total']
+    assert Path('doubled', 'total').read_text() == '2'
+
+
+def test_failed_partition(tmp_directory):
+    dag = make_dag('parallel', source=fail_on_one, gather=None)
+
+    with pytest.raises(TaskBuildError) as excinfo:
+        dag.build()
+
+    assert 'doubled[1.txt]' in str(excinfo.value)
+    assert 'Cannot process partition' in str(excinfo.value)
+    assert dag['doubled']._status != TaskStatus.Executed
+    # partitions are listed again in the next build
+    assert not dag['doubled']._expanded
+
+
+def test_partitions_function(tmp_directory):
+    dag = DAG(executor='parallel')
+    FanOut(touch, File('out'), dag, name='out', partitions=letters)
+
+    dag.build()
+
+    assert Path('out', 'a').read_text() == 'a'
+    assert Path('out', 'b').read_text() == 'b'
+
+
+def test_error_if_partitions_cannot_be_listed(tmp_directory):
+    dag = DAG()
+    FanOut(touch, File('out'), dag, name='out')
+
+    with pytest.raises(ValueError) as excinfo:
+        dag.build()
+
+    assert 'must have exactly one upstream dependency' in str(excinfo.value)
@@ -0,0 +1,33 @@
+from dstools.pipeline.executors.fusion import linear_chains
+
+
+def test_finds_maximal_chains():
+    # a -> b -> c -> d, c -> e, f -> g
+    order = ['a', 'b', 'c', 'd', 'e', 'f', 'g']
+    upstream = {'a': [], 'b': ['a'], 'c': ['b'], 'd': ['c'], 'e': ['c'],
+                'f': [], 'g': ['f']}
+
+    assert linear_chains(order, upstream) == [['a', 'b', 'c'], ['f', 'g']]
+
+
+def test_chains_break_at_joins():
+    # a -> c <- b, c -> d
+    order = ['a', 'b', 'c', 'd']
+    upstream = {'a': [], 'b': [], 'c': ['a', 'b'], 'd': ['c']}
+
+    assert linear_chains(order, upstream) == [['c', 'd']]
+
+
+def test_chains_only_include_fusable_tasks():
+    order = ['a', 'b', 'c', 'd']
+    upstream = {'a': [], 'b': ['a'], 'c': ['b'], 'd': ['c']}
+
+    assert linear_chains(order, upstream,
+                         fusable=['a', 'b', 'd']) == [['a', 'b']]
+
+
+def test_upstream_not_in_order_is_ignored():
+    order = ['b', 'c']
+    upstream = {'b': ['a'], 'c': ['b']}
+
+    assert linear_chains(order, upstream) == [['b', 'c']]
@@ -0,0 +1,215 @@
+import time
+import threading
+from datetime import datetime
+from pathlib import Path
+
+from dstools.pipeline.dag import DAG
+from dstools.pipeline.tasks import PythonCallable, SQLScript
+from dstools.pipeline.products import Product, SQLiteRelation
+from dstools.pipeline.clients import SQLAlchemyClient
+from dstools.pipeline import outdated
+from dstools.templates.Placeholder import Placeholder
+
+
+class FakeClient:
+    def __init__(self, max_concurrency=None):
+        self.max_concurrency = max_concurrency
+        self.running = 0
+        self.max_running = 0
+
+
+class SlowProduct(Product):
+    """Product whose metadata takes some time to fetch
+    """
+    running = 0
+    max_running = 0
+    lock = threading.Lock()
+
+    def __init__(self, identifier, client):
+        super().__init__(identifier)
+        self.client = client
+
+    def _init_identifier(self, identifier):
+        return Placeholder(identifier)
+
+    def exists(self):
+        return True
+
+    def fetch_metadata(self):
+        cls = type(self)
+
+        with cls.lock:
+            cls.running += 1
+            self.client.running += 1
+            cls.max_running = max(cls.max_running, cls.running)
+            self.client.max_running = max(self.client.max_running,
+                                          self.client.running)
+
+        time.sleep(0.1)
+
+        with cls.lock:
+            cls.running -= 1
+            self.client.running -= 1
+
+        return dict(timestamp=1, stored_source_code='code')
+
+    def save_metadata(self):
+        pass
+
+    def delete(self, force=False):
+        pass
+
+    @property
+    def name(self):
+        return str(self._identifier)
+
+
+def fn(product):
+    pass
+
+
+def test_prefetch_metadata_concurrently():
+    SlowProduct.running = SlowProduct.max_running = 0
+    clients = [FakeClient() for _ in range(4)]
+    dag = DAG()
+
+    for i in range(16):
+        PythonCallable(fn, SlowProduct('p%i' % i, clients[i % 4]), dag,
+                       name='t%i' % i)
+
+    start = time.time()
+    outdated.prefetch_metadata(dag.values(), max_workers=8)
+    elapsed = time.time() - start
+
+    assert all(t.product.did_download_metadata for t in dag.values())
+    assert all(t.product.timestamp == 1 for t in dag.values())
+    assert SlowProduct.max_running == 8
+    # 16 products, 0.1s each, 8 at a time
+    assert elapsed < 1.0
+
+
+def make_products_with_one_client(client, n):
+    SlowProduct.running = SlowProduct.max_running = 0
+    dag = DAG()
+
+    for i in range(n):
+        PythonCallable(fn, SlowProduct('p%i' % i, client), dag,
+                       name='t%i' % i)
+
+    return dag
+
+
+def test_prefetch_metadata_concurrently_with_one_client():
+    client = FakeClient()
+    dag = make_products_with_one_client(client, 8)
+
+    start = time.time()
+    outdated.prefetch_metadata(dag.values(), max_workers=8)
+    elapsed = time.time() - start
+
+    assert all(t.product.did_download_metadata for t in dag.values())
+    # fetches on the same client overlap, up to CLIENT_CONCURRENCY
+    assert client.max_running == outdated.CLIENT_CONCURRENCY
+    # 0.8s if fetched one at a time
+    assert elapsed < 0.6
+
+
+def test_prefetch_metadata_respects_client_max_concurrency():
+    client = FakeClient(max_concurrency=2)
+    dag = make_products_with_one_client(client, 6)
+
+    outdated.prefetch_metadata(dag.values(), max_workers=8)
+
+    assert client.max_running == 2
+
+
+def test_concurrent_status_returns_the_same_table(tmp_directory):
+    tmp = Path(tmp_directory)
+    client = SQLAlchemyClient('sqlite:///{}'.format(tmp / "database.db"))
+    dag = DAG(clients={SQLScript: client, SQLiteRelation: client})
+
+    ta = SQLScript('CREATE TABLE {{product}} AS SELECT 1 AS x',
+                   SQLiteRelation((None, 'ta', 'table')), dag, name='ta')
+    tb = SQLScript('CREATE TABLE {{product}} AS SELECT * FROM '
+                   '{{upstream["ta"]}}',
+                   SQLiteRelation((None, 'tb', 'table')), dag, name='tb')
+    ta >> tb
+
+    dag.build()
+
+    expected = str(dag.status(clear_cached_status=True))
+
+    for t in dag.values():
+        t.product.did_download_metadata = False
+
+    assert str(dag.status(clear_cached_status=True,
+                          max_workers=4)) == expected
+
+    client.close()
+
+
+def make_sqlite_dag(client):
+    dag = DAG(clients={SQLScript: client, SQLiteRelation: client})
+
+    ta = SQLScript('CREATE TABLE {{product}} AS SELECT 1 AS x',
+                   SQLiteRelation((None, 'ta', 'table')), dag, name='ta')
+    tb = SQLScript('CREATE TABLE {{product}} AS SELECT * FROM '
+                   '{{upstream["ta"]}}',
+                   SQLiteRelation((None, 'tb', 'table')), dag, name='tb')
+    ta >> tb
+
+    return dag
+
+
+def test_threads_close_their_connections(tmp_directory):
+    tmp = Path(tmp_directory)
+    client = SQLAlchemyClient('sqlite:///{}'.format(tmp / "database.db"))
+    dag = make_sqlite_dag(client)
+    dag.build()
+
+    for _ in range(3):
+        for t in dag.values():
+            t.product.did_download_metadata = False
+
+        dag.status(clear_cached_status=True, max_workers=4)
+
+    # only the connection opened by this thread is kept
+    assert set(client._connections) <= {threading.get_ident()}
+
+    client.close()
+
+
+def test_concurrent_status_with_in_memory_database():
+    client = SQLAlchemyClient('sqlite://')
+    dag = make_sqlite_dag(client)
+    dag.render()
+
+    # executors close clients after building (which deletes an in-memory
+    # database), run the tasks here instead
+    for t in dag.values():
+        t.run()
+        t.product.timestamp = datetime.now().timestamp()
+        t.product.stored_source_code = t.source_code
+        t.product.save_metadata()
+
+    for t in dag.values():
+        t.product.did_download_metadata = False
+
+    # other threads would see an empty database
+    table = dag.status(clear_cached_status=True, max_workers=4)
+
+    assert client._single_thread
+    assert all(row['Last updated'] != 'Has not been run' for row in table)
+    assert not any(row['Outdated code'] for row in table)
+
+    client.close()
+
+
+def test_in_memory_clients():
+    import sqlite3
+    from dstools.pipeline.clients import DBAPIClient
+
+    assert DBAPIClient(sqlite3.connect, database=':memory:')._single_thread
+    assert not DBAPIClient(sqlite3.connect, database='db.db')._single_thread
+    assert SQLAlchemyClient('sqlite:///:memory:')._single_thread
+    assert not SQLAlchemyClient('sqlite:///db.db')._single_thread
@@ -205,3 +205,82 @@ def test_adding_tasks_right():
     assert not ta.upstream
     assert list(tb.upstream.values()) == [ta]
     assert list(tc.upstream.values()) == [ta]
+
+
+def test_status_fetches_metadata_once(tmp_directory, monkeypatch):
+    """ A -> {B, C} -> D
+    """
+    dag = DAG()
+
+    ta = BashCommand('touch {{product}}', File('a.txt'), dag, 'ta', {},
+                     kwargs, False)
+    tb = BashCommand('cat {{upstream["ta"]}} > {{product}}', File('b.txt'),
+                     dag, 'tb', {}, kwargs, False)
+    tc = BashCommand('cat {{upstream["ta"]}} > {{product}}', File('c.txt'),
+                     dag, 'tc', {}, kwargs, False)
+    td = BashCommand('cat {{upstream["tb"]}} {{upstream["tc"]}} > '
+                     '{{product}}', File('d.txt'), dag, 'td', {}, kwargs,
+                     False)
+
+    ta >> (tb + tc) >> td
+
+    dag.build()
+    dag._clear_cached_outdated_status()
+
+    calls = []
+    original = File.fetch_metadata_many
+
+    def fetch_metadata_many(cls, products):
+        calls.append(sorted(str(p) for p in products))
+        return original.__func__(cls, products)
+
+    monkeypatch.setattr(File, 'fetch_metadata_many',
+                        classmethod(fetch_metadata_many))
+
+    for t in dag.values():
+        t.product.did_download_metadata = False
+
+    dag.status()
+    dag.status()
+
+    # a single batch for all products
+    assert calls == [['a.txt', 'b.txt', 'c.txt', 'd.txt']]
+
+
+def test_running_a_task_makes_downstream_outdated(tmp_directory):
+    """ A -> B
+    """
+    dag = DAG()
+
+    ta = BashCommand('touch {{product}}', File('a.txt'), dag, 'ta', {},
+                     kwargs, False)
+    tb = BashCommand('cat {{upstream["ta"]}} > {{product}}', File('b.txt'),
+                     dag, 'tb', {}, kwargs, False)
+
+    ta >> tb
+
+    dag.build()
+    dag.status()
+
+    assert not tb.product._outdated()
+
+    # no need to clear the cached status
+    ta.build(force=True)
+
+    assert not ta.product._outdated()
+    assert tb.product._outdated()
+    assert tb.build().build_report['Ran?']
+
+
+def test_clear_cached_status_in_meta_product():
+    dag = DAG()
+    fa1 = File('a1.txt')
+    fa2 = File('a2.txt')
+    ta = BashCommand('echo {{product}}', [fa1, fa2], dag, 'ta')
+    ta.render()
+
+    ta.product._cache_outdated_status(data=True, code=True)
+    ta.product._clear_cached_outdated_status()
+
+    assert fa1._outdated_data_dependencies_status is None
+    assert fa2._outdated_code_dependency_status is None
@@ -18,3 +18,41 @@ def test_file_is_rendered_correctly():
     f = File('/path/to/{{name}}')
     f.render(params=dict(name='file'))
     assert str(f) == '/path/to/file'
+
+
+def test_exists_many(tmp_directory):
+    Path('a.txt').touch()
+    Path('dir').mkdir()
+    Path('dir', 'b.txt').touch()
+
+    files = [File('a.txt'), File('dir/b.txt'), File('dir/c.txt'),
+             File('missing/d.txt'), File('dir')]
+
+    assert File.exists_many(files) == [True, True, False, False, True]
+    assert File.exists_many(files) == [f.exists() for f in files]
+
+
+def test_fetch_metadata_many(tmp_directory):
+    Path('a.txt').touch()
+    Path('a.txt.source').write_text('some code')
+    Path('b.txt').touch()
+    Path('c.txt.source').write_text('some code')
+
+    files = [File('a.txt'), File('b.txt'), File('c.txt')]
+
+    assert File.fetch_metadata_many(files) == [f.fetch_metadata()
+                                               for f in files]
+    assert File.fetch_metadata_many(files)[0]['stored_source_code'] == \
+        'some code'
+
+
+def test_get_metadata_many(tmp_directory):
+    Path('a.txt').touch()
+    Path('a.txt.source').write_text('some code')
+
+    a, b = File('a.txt'), File('b.txt')
+    File._get_metadata_many([a, b])
+
+    assert a.did_download_metadata and b.did_download_metadata
+    assert a.stored_source_code == 'some code'
+    assert b.metadata == dict(timestamp=None, stored_source_code=None)
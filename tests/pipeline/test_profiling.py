@@ -0,0 +1,131 @@
+import pstats
+from pathlib import Path
+
+import pytest
+
+from dstools.pipeline import DAG, DAGCollection
+from dstools.pipeline.products import File
+from dstools.pipeline.tasks import PythonCallable, BashCommand
+from dstools.pipeline import profiling
+
+
+def slow_sum(n):
+    return sum(range(n))
+
+
+def compute(product):
+    slow_sum(100000)
+    Path(str(product)).touch()
+
+
+def functions(path):
+    return {name for (_, _, name) in pstats.Stats(str(path)).stats}
+
+
+def make_dag(executor, name='dag'):
+    dag = DAG(name, executor=executor)
+    PythonCallable(compute, File('a.txt'), dag, name='a')
+    PythonCallable(compute, File('b.txt'), dag, name='b')
+    BashCommand('touch {{product}}', File('c.txt'), dag, name='c')
+    return dag
+
+
+@pytest.mark.parametrize('executor', ['serial', 'parallel', 'hybrid'])
+def test_profiles_every_task(tmp_directory, executor):
+    dag = make_dag(executor)
+    dag.build(profile=True)
+
+    assert sorted(p.name for p in Path('profiles', 'dag').iterdir()) == [
+        'a.prof', 'b.prof', 'c.prof']
+    # the function is profiled in the process where it runs (e.g. the
+    # worker pool process when using the Serial executor)
+    assert 'slow_sum' in functions('profiles/dag/a.prof')
+
+
+def test_profile_flag(tmp_directory):
+    dag = make_dag('parallel')
+    dag['b'].profile = True
+    dag.build()
+
+    assert [p.name for p in Path('profiles', 'dag').iterdir()] == ['b.prof']
+
+
+def test_profile_directory(tmp_directory):
+    dag = DAG('dag', executor='parallel', profile_directory='some/dir')
+    PythonCallable(compute, File('a.txt'), dag, name='a')
+    dag.build(profile=True)
+
+    assert Path('some', 'dir', 'dag', 'a.prof').exists()
+
+
+def test_deletes_previous_profiles(tmp_directory):
+    make_dag('parallel').build(profile=True)
+
+    # up-to-date tasks do not run
+    dag = make_dag('parallel')
+    dag.build(profile=True)
+
+    assert list(Path('profiles', 'dag').iterdir()) == []
+    assert dag['a']._profile_path is not None
+
+    # profile is not on for the next build
+    dag.build()
+    assert dag['a']._profile_path is None
+
+
+def test_profile_summary(tmp_directory):
+    dag = make_dag('parallel')
+    dag.build(profile=True)
+
+    summary = dag.profile_summary(top=100)
+    rows = {row['Function']: row for row in summary._data}
+    slow, = [row for name, row in rows.items() if 'slow_sum' in name]
+
+    assert slow['Tasks'] == 2
+    assert slow['Calls'] == 2
+    assert len(summary._data) <= 100
+
+
+def test_task_and_dag_names_are_safe_file_names(tmp_directory):
+    dag = DAG('some/dag', executor='parallel')
+    PythonCallable(compute, File('a.txt'), dag, name='load/a')
+    dag.build(profile=True)
+
+    assert list(Path('profiles').iterdir()) == [Path('profiles', 'some_dag')]
+    assert Path('profiles', 'some_dag', 'load_a.prof').exists()
+    assert dag.profile_summary()._data
+
+
+def test_dags_sharing_the_profile_directory(tmp_directory):
+    first, second = make_dag('parallel', 'first'), make_dag('parallel',
+                                                            'second')
+    DAGCollection([first, second]).build(profile=True)
+
+    # profiles do not overwrite each other
+    for name in ['first', 'second']:
+        assert sorted(p.name for p in Path('profiles', name).iterdir()) == [
+            'a.prof', 'b.prof', 'c.prof']
+
+    # building one DAG does not delete the profiles of the other one
+    first = make_dag('parallel', 'first')
+    first.build(profile=True, force=True)
+
+    assert len(list(Path('profiles', 'second').iterdir())) == 3
+    assert first.profile_summary(top=100)._data
+
+
+def test_file_name():
+    assert profiling.file_name('load/a b') == 'load_a_b'
+    assert profiling.file_name('part[0.txt]') == 'part[0.txt]'
+    assert profiling.file_name('..') == '__'
+
+
+def test_summary_without_profiles(tmp_directory):
+    assert profiling.summary([])._data == []
+
+
+def test_run_profiled_saves_stats_on_error(tmp_directory):
+    with pytest.raises(ZeroDivisionError):
+        profiling.run_profiled(lambda: 1 / 0, 'error.prof')
+
+    assert Path('error.prof').exists()
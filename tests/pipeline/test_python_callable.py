@@ -1,8 +1,13 @@
+import os
+import sys
+import subprocess
+
 import pytest
 from pathlib import Path
 from dstools.pipeline import DAG
 from dstools.pipeline.tasks import PythonCallable
 from dstools.pipeline.products import File
+from dstools.pipeline.WorkerPool import WorkerPool
 
 
 class MyException(Exception):
@@ -49,3 +54,168 @@ def test_exceptions_are_raised_with_serial_executor():
 
     with pytest.raises(MyException):
         dag.build()
+
+
+def write_pid(product):
+    Path(str(product)).write_text(str(os.getpid()))
+
+
+def test_worker_pool_is_reused_across_tasks_and_builds(tmp_directory):
+    dag = DAG(reuse_workers=True)
+    PythonCallable(write_pid, File('a.txt'), dag, 'a')
+    PythonCallable(write_pid, File('b.txt'), dag, 'b')
+    dag.build()
+
+    pid = Path('a.txt').read_text()
+    assert Path('b.txt').read_text() == pid
+    assert int(pid) != os.getpid()
+
+    dag2 = DAG(worker_pool=dag.worker_pool)
+    PythonCallable(write_pid, File('c.txt'), dag2, 'c')
+    dag2.build()
+
+    assert Path('c.txt').read_text() == pid
+    dag.worker_pool.close()
+
+
+def test_runs_each_task_in_a_new_process_by_default(tmp_directory):
+    dag = DAG()
+    PythonCallable(write_pid, File('a.txt'), dag, 'a')
+    PythonCallable(write_pid, File('b.txt'), dag, 'b')
+    dag.build()
+
+    assert Path('a.txt').read_text() != Path('b.txt').read_text()
+    dag.worker_pool.close()
+
+
+def test_worker_pool_forkserver_preload(tmp_directory):
+    pool = WorkerPool(start_method='forkserver', preload=['json'])
+    dag = DAG(worker_pool=pool)
+    PythonCallable(fn, File('file.txt'), dag, 'callable', params=dict(a=1))
+
+    dag.build()
+
+    assert Path('file.txt').read_text() == 'things'
+    pool.close()
+
+
+def test_worker_pool_preload_requires_forkserver():
+    with pytest.raises(ValueError):
+        WorkerPool(preload=['pandas'])
+
+
+def test_worker_pool_replaces_workers_if_function_changes(tmp_directory):
+    pool = WorkerPool(maxtasksperchild=None)
+    pool.apply_async(write_pid, dict(product='a.txt')).get()
+    workers = pool._pool
+
+    pool.apply_async(write_pid, dict(product='b.txt')).get()
+    assert pool._pool is workers
+
+    # simulate that write_pid was redefined after starting the workers
+    pool._functions[(write_pid.__module__, write_pid.__qualname__)] = fn
+    pool.apply_async(write_pid, dict(product='c.txt')).get()
+
+    assert pool._pool is not workers
+    assert Path('c.txt').read_text() != Path('a.txt').read_text()
+    pool.close()
+
+
+_calls = {'count': 0}
+
+
+def count_calls(product):
+    _calls['count'] += 1
+    Path(str(product)).write_text(str(_calls['count']))
+
+
+def test_reused_workers_keep_module_state(tmp_directory):
+    dag = DAG(reuse_workers=True)
+    PythonCallable(count_calls, File('a.txt'), dag, 'a')
+    PythonCallable(count_calls, File('b.txt'), dag, 'b')
+    dag.build()
+
+    # both tasks run in the same process, b sees the change made by a
+    assert Path('a.txt').read_text() == '1'
+    assert Path('b.txt').read_text() == '2'
+    dag.close()
+
+
+def test_tasks_are_isolated_by_default(tmp_directory):
+    dag = DAG()
+    PythonCallable(count_calls, File('a.txt'), dag, 'a')
+    PythonCallable(count_calls, File('b.txt'), dag, 'b')
+    dag.build()
+
+    assert Path('a.txt').read_text() == '1'
+    assert Path('b.txt').read_text() == '1'
+    dag.close()
+
+
+def test_reuse_workers_with_functions_defined_in_main(tmp_directory):
+    # functions defined at the top level of a script
+    Path('script.py').write_text("""
+import os
+from pathlib import Path
+from dstools.pipeline import DAG
+from dstools.pipeline.tasks import PythonCallable
+from dstools.pipeline.products import File
+
+
+def write_pid(product):
+    Path(str(product)).write_text(str(os.getpid()))
+
+
+def a(product):
+    write_pid(product)
+
+
+def b(product):
+    write_pid(product)
+
+
+def c(product):
+    write_pid(product)
+
+
+dag = DAG(reuse_workers=True)
+
+for fn in [a, b, c]:
+    PythonCallable(fn, File(fn.__name__ + '.txt'), dag, fn.__name__)
+
+dag.build()
+dag.close()
+""")
+    subprocess.run([sys.executable, 'script.py'], check=True)
+
+    pids = {Path(name + '.txt').read_text() for name in ['a', 'b', 'c']}
+    assert len(pids) == 1
+
+
+def test_reuse_workers_cannot_be_used_with_worker_pool():
+    with pytest.raises(ValueError):
+        DAG(worker_pool=WorkerPool(), reuse_workers=True)
+
+
+def test_close_stops_the_worker_pool(tmp_directory):
+    dag = DAG()
+    PythonCallable(write_pid, File('a.txt'), dag, 'a')
+    dag.build()
+    workers = list(dag.worker_pool._pool._pool)
+
+    dag.close()
+
+    assert dag.worker_pool._pool is None
+    assert not any(worker.is_alive() for worker in workers)
+
+
+def test_close_does_not_stop_a_shared_worker_pool(tmp_directory):
+    pool = WorkerPool()
+    dag = DAG(worker_pool=pool)
+    PythonCallable(write_pid, File('a.txt'), dag, 'a')
+    dag.build()
+
+    dag.close()
+
+    assert pool._pool is not None
+    pool.close()
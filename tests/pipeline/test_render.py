@@ -1,4 +1,5 @@
 import subprocess
+from pathlib import Path
 
 from dstools.pipeline.dag import DAG
 from dstools.pipeline.tasks import BashCommand
@@ -7,8 +8,7 @@ from dstools.pipeline.products import File
 import pytest
 
 
-@pytest.fixture
-def dag():
+def make_dag(t3_code='echo c >> {{product}}'):
     dag = DAG()
 
     kwargs = {'stderr': subprocess.PIPE,
@@ -24,8 +24,7 @@ def dag():
                      dag,
                      't2', {}, kwargs, False)
 
-    t3 = BashCommand(('cat {{upstream["t2"]}} > {{product}} '
-                      '&& echo c >> {{product}}'),
+    t3 = BashCommand('cat {{upstream["t2"]}} > {{product}} && ' + t3_code,
                      File(('3_{{upstream["t2"]}}')), dag,
                      't3', {}, kwargs, False)
 
@@ -34,6 +33,11 @@ def dag():
     return dag
 
 
+@pytest.fixture
+def dag():
+    return make_dag()
+
+
 def can_access_product_without_rendering_if_literal():
     dag = DAG()
 
@@ -104,3 +108,104 @@ def test_rendering_dag_also_renders_upstream_outside_dag(tmp_directory):
     # this works
     sub_dag.build()
     dag.build()
+
+
+def test_render_skips_tasks_whose_inputs_did_not_change(dag, monkeypatch):
+    dag.render()
+
+    rendered = []
+    original = BashCommand.render
+
+    def render(self):
+        rendered.append(self.name)
+        return original(self)
+
+    monkeypatch.setattr(BashCommand, 'render', render)
+
+    dag.render()
+
+    assert rendered == []
+
+
+def test_render_re_renders_downstream_of_changed_identifier():
+    dag = DAG()
+
+    t1 = BashCommand('echo {{name}} > {{product}}', File('{{name}}.txt'), dag,
+                     't1', params=dict(name='1'))
+    t2 = BashCommand('cat {{upstream["t1"]}} > {{product}}',
+                     File('2_{{upstream["t1"]}}'), dag, 't2')
+    t3 = BashCommand('echo c > {{product}}', File('3.txt'), dag, 't3')
+
+    t1 >> t2
+
+    dag.render()
+
+    t1.params['name'] = 'one'
+    dag.render()
+
+    assert str(t1.product) == 'one.txt'
+    assert str(t2.product) == '2_one.txt'
+    assert str(t2.source) == 'cat one.txt > 2_one.txt'
+    assert str(t3.product) == '3.txt'
+
+
+def test_render_force_ignores_cache(dag, monkeypatch):
+    dag.render()
+
+    rendered = []
+    original = BashCommand.render
+
+    def render(self):
+        rendered.append(self.name)
+        return original(self)
+
+    monkeypatch.setattr(BashCommand, 'render', render)
+
+    dag.render(force=True)
+
+    assert rendered == ['t1', 't2', 't3']
+
+
+def test_load_plan_skips_rendering(tmp_directory, monkeypatch):
+    make_dag().save_plan('plan.json')
+
+    rendered = []
+    original = BashCommand.render
+
+    def render(self):
+        rendered.append(self.name)
+        return original(self)
+
+    monkeypatch.setattr(BashCommand, 'render', render)
+
+    dag = make_dag().load_plan('plan.json')
+    dag.render()
+
+    assert rendered == []
+    assert str(dag['t3'].product) == '3_2_1.txt'
+    assert str(dag['t3'].source) == ('cat 2_1.txt > 3_2_1.txt && '
+                                     'echo c >> 3_2_1.txt')
+
+    dag.build()
+
+    assert Path('3_2_1.txt').read_text() == 'a\nb\nc\n'
+
+
+def test_load_plan_renders_tasks_that_changed(tmp_directory, monkeypatch):
+    make_dag().save_plan('plan.json')
+
+    rendered = []
+    original = BashCommand.render
+
+    def render(self):
+        rendered.append(self.name)
+        return original(self)
+
+    monkeypatch.setattr(BashCommand, 'render', render)
+
+    dag = make_dag(t3_code='echo changed >> {{product}}')
+    dag.load_plan('plan.json')
+
+    assert rendered == ['t3']
+    assert str(dag['t3'].source) == ('cat 2_1.txt > 3_2_1.txt && '
+                                     'echo changed >> 3_2_1.txt')
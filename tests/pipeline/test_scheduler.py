@@ -0,0 +1,244 @@
+import pytest
+
+from dstools.pipeline.dag import DAG
+from dstools.pipeline.tasks import BashCommand, ShellScript
+from dstools.pipeline.products import File
+from dstools.pipeline.clients import ShellClient
+from dstools.pipeline.executors.Scheduler import Scheduler
+
+
+def make_dag():
+    dag = DAG()
+
+    for name in ['a', 'b', 'c', 'd', 'e']:
+        BashCommand('touch {{product}}', File(name), dag, name)
+
+    dag['a'] >> dag['b'] >> dag['d']
+    dag['c'] >> dag['d']
+    dag['c'] >> dag['e']
+
+    return dag
+
+
+def names(tasks):
+    return [t.name for t in tasks]
+
+
+def test_tasks_are_ready_when_upstream_finishes():
+    scheduler = Scheduler(make_dag()._topological_sort())
+
+    assert names(scheduler.pop_ready()) == ['a', 'c']
+    assert scheduler.pop_ready() == []
+
+    scheduler.mark_succeeded('c')
+    assert names(scheduler.pop_ready()) == ['e']
+
+    scheduler.mark_succeeded('a')
+    scheduler.mark_succeeded('e')
+    assert names(scheduler.pop_ready()) == ['b']
+
+    scheduler.mark_succeeded('b')
+    assert names(scheduler.pop_ready()) == ['d']
+    assert not scheduler.finished
+
+    scheduler.mark_succeeded('d')
+    assert scheduler.finished
+    assert scheduler.succeeded == ['c', 'a', 'e', 'b', 'd']
+
+
+def test_failed_tasks_skip_downstream():
+    scheduler = Scheduler(make_dag()._topological_sort())
+    scheduler.pop_ready()
+
+    assert sorted(scheduler.mark_failed('a')) == ['b', 'd']
+
+    scheduler.mark_succeeded('c')
+    assert names(scheduler.pop_ready()) == ['e']
+
+    scheduler.mark_succeeded('e')
+    assert scheduler.finished
+    assert scheduler.failed == ['a']
+    assert sorted(scheduler.skipped) == ['b', 'd']
+
+
+def test_cancel():
+    scheduler = Scheduler(make_dag()._topological_sort())
+    scheduler.pop_ready()
+
+    assert sorted(scheduler.cancel()) == ['b', 'd', 'e']
+
+    scheduler.mark_succeeded('a')
+    scheduler.mark_succeeded('c')
+    assert scheduler.pop_ready() == []
+    assert scheduler.finished
+
+
+def test_done_tasks_are_not_scheduled():
+    scheduler = Scheduler(make_dag()._topological_sort(), done=['a', 'c'])
+
+    assert names(scheduler.pop_ready()) == ['b', 'e']
+
+
+def test_ready_tasks_are_returned_by_priority():
+    scheduler = Scheduler(make_dag()._topological_sort(),
+                          priority={'c': 10, 'a': 1, 'e': 20, 'b': 5})
+
+    assert names(scheduler.pop_ready()) == ['c', 'a']
+
+    scheduler.mark_succeeded('a')
+    scheduler.mark_succeeded('c')
+    assert names(scheduler.pop_ready()) == ['e', 'b']
+
+
+def test_pop_ready_limit():
+    scheduler = Scheduler(make_dag()._topological_sort())
+
+    assert names(scheduler.pop_ready(limit=1)) == ['a']
+    assert names(scheduler.pop_ready(limit=0)) == []
+    assert not scheduler.finished
+    assert names(scheduler.pop_ready()) == ['c']
+
+
+def test_tasks_wait_for_resources():
+    dag = make_dag()
+    dag['a'].resources = {'memory': 6}
+    dag['c'].resources = {'memory': 6}
+    dag['e'].resources = {'memory': 2}
+    scheduler = Scheduler(dag._topological_sort(),
+                          capacity={'memory': 8})
+
+    assert names(scheduler.pop_ready()) == ['a']
+
+    # c is ready but there is not enough memory
+    scheduler.mark_succeeded('a')
+    assert names(scheduler.pop_ready()) == ['c', 'b']
+
+    # e fits once c finishes
+    assert scheduler.pop_ready() == []
+    scheduler.mark_succeeded('c')
+    assert names(scheduler.pop_ready()) == ['e']
+
+
+def test_lower_priority_tasks_that_fit_start_first():
+    dag = DAG()
+
+    for name, memory in [('big1', 6), ('big2', 6), ('small', 4)]:
+        task = BashCommand('touch {{product}}', File(name), dag, name)
+        task.resources = {'memory': memory}
+
+    scheduler = Scheduler(dag._topological_sort(), capacity={'memory': 10})
+
+    assert names(scheduler.pop_ready()) == ['big1', 'small']
+
+    scheduler.mark_succeeded('big1')
+    assert names(scheduler.pop_ready()) == ['big2']
+
+
+def test_resources_not_in_capacity_are_not_limited():
+    dag = make_dag()
+    dag['a'].resources = {'gpus': 100}
+
+    scheduler = Scheduler(dag._topological_sort())
+
+    assert names(scheduler.pop_ready()) == ['a', 'c']
+
+
+def test_error_if_task_requires_more_than_available():
+    dag = make_dag()
+    dag['a'].resources = {'memory': 16}
+
+    with pytest.raises(ValueError) as excinfo:
+        Scheduler(dag._topological_sort(), capacity={'memory': 8})
+
+    assert 'Task "a" requires 16' in str(excinfo.value)
+
+
+def test_client_max_concurrency():
+    dag = DAG()
+    client = ShellClient(max_concurrency=2)
+
+    for name in ['a', 'b', 'c']:
+        ShellScript('touch {{product}}', File(name), dag, name,
+                    client=client)
+
+    scheduler = Scheduler(dag._topological_sort())
+
+    assert names(scheduler.pop_ready()) == ['a', 'b']
+
+    scheduler.mark_succeeded('b')
+    assert names(scheduler.pop_ready()) == ['c']
+
+
+def test_chain_runs_as_a_unit():
+    scheduler = Scheduler(make_dag()._topological_sort(),
+                          chains=[['a', 'b']])
+
+    assert names(scheduler.pop_ready()) == ['a', 'c']
+    assert scheduler.running == {'a', 'b', 'c'}
+    assert scheduler.busy == 2
+
+    scheduler.mark_succeeded('a')
+    # b is already running
+    assert names(scheduler.pop_ready()) == []
+    assert scheduler.busy == 2
+
+
+def test_failed_task_in_chain_skips_the_rest():
+    scheduler = Scheduler(make_dag()._topological_sort(),
+                          chains=[['a', 'b']])
+    scheduler.pop_ready()
+
+    skipped = scheduler.mark_failed('a')
+
+    assert set(skipped) == {'b', 'd'}
+    assert scheduler.running == {'c'}
+
+
+def test_pop_ready_select():
+    scheduler = Scheduler(make_dag()._topological_sort())
+
+    assert names(scheduler.pop_ready(select=lambda t: t.name == 'c')) == ['c']
+    assert names(scheduler.pop_ready()) == ['a']
+
+
+def test_grouped_tasks_use_one_worker():
+    scheduler = Scheduler(make_dag()._topological_sort())
+    scheduler.pop_ready()
+    scheduler.group(['a', 'c'])
+
+    assert scheduler.busy == 1
+
+
+def test_expand_adds_tasks_before_a_running_one():
+    scheduler = Scheduler(make_dag()._topological_sort())
+    scheduler.pop_ready()
+
+    extra = DAG()
+    new = [BashCommand('touch {{product}}', File(name), extra, name)
+           for name in ['c0', 'c1']]
+
+    scheduler.expand('c', new)
+
+    assert 'c' not in scheduler.running
+    assert names(scheduler.pop_ready()) == ['c0', 'c1']
+
+    scheduler.mark_succeeded('c0')
+    assert scheduler.pop_ready() == []
+
+    scheduler.mark_succeeded('c1')
+    assert names(scheduler.pop_ready()) == ['c']
+
+    scheduler.mark_succeeded('c')
+    assert names(scheduler.pop_ready()) == ['e']
+
+
+def test_failed_expanded_task_skips_the_running_one():
+    scheduler = Scheduler(make_dag()._topological_sort())
+    scheduler.pop_ready()
+
+    extra = DAG()
+    scheduler.expand('c', [BashCommand('touch {{product}}', File('c0'),
+                                       extra, 'c0')])
+    scheduler.pop_ready()
+
+    assert set(scheduler.mark_failed('c0')) == {'c', 'd', 'e'}
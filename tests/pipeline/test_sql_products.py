@@ -86,3 +86,33 @@ def test_sqlite_product_save_metadata(tmp_directory):
     fetched = numbers.fetch_metadata()
 
     assert fetched == numbers.metadata
+
+
+def test_sqlite_exists_many_and_fetch_metadata_many(tmp_directory):
+    tmp = Path(tmp_directory)
+    conn = SQLAlchemyClient('sqlite:///{}'.format(tmp / "database.db"))
+
+    df = pd.DataFrame({'a': np.arange(0, 100), 'b': np.arange(100, 200)})
+    df.to_sql('numbers', conn.engine)
+    df.to_sql('more_numbers', conn.engine)
+
+    numbers = SQLiteRelation((None, 'numbers', 'table'), conn)
+    more_numbers = SQLiteRelation((None, 'more_numbers', 'table'), conn)
+    # exists but it is not a view
+    view = SQLiteRelation((None, 'numbers', 'view'), conn)
+    missing = SQLiteRelation((None, 'missing', 'table'), conn)
+    products = [numbers, more_numbers, view, missing]
+
+    for p in products:
+        p.render({})
+
+    numbers.metadata['timestamp'] = datetime.now().timestamp()
+    numbers.metadata['stored_source_code'] = 'some code'
+    numbers.save_metadata()
+
+    assert SQLiteRelation.exists_many(products) == [True, True, False,
+                                                    False]
+    assert (SQLiteRelation.fetch_metadata_many(products)
+            == [p.fetch_metadata() for p in products])
+    assert (SQLiteRelation.fetch_metadata_many(products)[0]
+            ['stored_source_code'] == 'some code')
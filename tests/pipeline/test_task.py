@@ -1,3 +1,4 @@
+import pickle
 from pathlib import Path
 
 from dstools.exceptions import RenderError
@@ -204,3 +205,41 @@ def test_lineage():
     assert ta._lineage is None
     assert tb._lineage == {'ta'}
     assert tc._lineage == {'ta', 'tb'}
+
+
+def test_payload_size_does_not_depend_on_dag_size():
+    def payload_size(n_tasks):
+        dag = DAG()
+        prev = PythonCallable(touch, File('0'), dag, name='0')
+
+        for i in range(1, n_tasks):
+            t = PythonCallable(my_fn, File(str(i)), dag, name=str(i))
+            prev >> t
+            prev = t
+
+        dag.render()
+        return len(pickle.dumps(dag['1']._payload()))
+
+    assert payload_size(200) == payload_size(3)
+
+
+def test_payload_is_detached_from_the_dag():
+    dag = DAG()
+    t1 = PythonCallable(touch, File('1'), dag, name='1')
+    t2 = PythonCallable(my_fn, File('2'), dag, name='2')
+    t1 >> t2
+    t2.on_finish = on_finish
+    dag.render()
+
+    payload = t2._payload()
+
+    assert payload.dag is not dag
+    assert payload.on_finish is None
+    assert payload.params['product'] is payload.product
+    assert payload.product.task is payload
+    assert str(payload.product) == str(t2.product)
+    assert str(payload.params['upstream']['1']) == str(t1.product)
+    assert payload.params['upstream']['1'].task.dag is payload.dag
+    # the original task is not modified
+    assert t2.product.task is t2
+    assert t2.on_finish is on_finish
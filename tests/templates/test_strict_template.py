@@ -114,3 +114,15 @@ def test_string_identifier_initialized_with_template_from_env():
     si = Placeholder(template).render(params=dict(key='things'))
 
     assert str(si) == 'things'
+
+
+def test_placeholder_from_str_is_compiled_on_demand():
+    p = Placeholder('SELECT * FROM {{table}}')
+
+    assert p._template is None
+    assert p.needs_render
+    assert p.declared == {'table'}
+
+    p.render(dict(table='t'))
+
+    assert str(p) == 'SELECT * FROM t'
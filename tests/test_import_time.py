@@ -0,0 +1,64 @@
+"""
+Heavy dependencies must be imported when used, not when importing dstools
+"""
+import sys
+import json
+import subprocess
+
+MODULES = ['dstools', 'dstools.pipeline', 'dstools.pipeline.tasks',
+           'dstools.pipeline.products', 'dstools.pipeline.clients',
+           'dstools.pipeline.io']
+
+HEAVY = ['networkx', 'tqdm', 'mistune', 'pygments', 'yaml', 'numpy',
+         'pandas', 'pyarrow', 'paramiko', 'sqlalchemy', 'psycopg2',
+         'papermill', 'jupytext', 'nbformat', 'nbconvert', 'autopep8',
+         'parso', 'sqlparse', 'numpydoc', 'humanize', 'jinja2']
+
+# the only third-party packages that importing MODULES may import
+THIRD_PARTY = ['tabulate', 'wcwidth', 'dataclasses', 'importlib_resources']
+
+# modules (including the standard library and dstools) imported by MODULES,
+# about 180 on Python 3.7, counting modules instead of measuring time keeps
+# the test stable when the machine is under load
+MAX_MODULES = 250
+
+
+def run_python(code):
+    return subprocess.run([sys.executable, '-c', code],
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                          check=True, universal_newlines=True)
+
+
+def test_heavy_dependencies_are_not_imported():
+    code = ('import sys, json\n'
+            'import {}\n'
+            'print(json.dumps([m for m in {} if m in sys.modules]))'
+            .format(', '.join(MODULES), HEAVY))
+
+    imported = json.loads(run_python(code).stdout)
+
+    assert imported == []
+
+
+def imported_modules():
+    code = ('import sys, json\n'
+            'before = set(sys.modules)\n'
+            'import {}\n'
+            'print(json.dumps({{name: getattr(module, "__file__", None)\n'
+            '                  for name, module in sys.modules.items()\n'
+            '                  if name not in before}}))'
+            .format(', '.join(MODULES)))
+
+    return json.loads(run_python(code).stdout)
+
+
+def test_import_budget():
+    modules = imported_modules()
+
+    third_party = {name.split('.')[0] for name, path in modules.items()
+                   if path and ('site-packages' in path
+                                or 'dist-packages' in path)
+                   and not name.startswith('dstools')}
+
+    assert third_party <= set(THIRD_PARTY)
+    assert len(modules) <= MAX_MODULES